@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+#
+# Syr SafeTech Logger Analytics
+#   Water consumption, leaks, pressure drops and alarms, from the log files of SyrSafeTechLogger.py.
+#   The logs are loaded into NumPy arrays (via the binary format of "--convert"); everything else
+#   works on whole arrays at once, so even a year of logs only takes seconds.
+#
+#
+# https://github.com/FMMT666/SyrSafeTechLogger
+#
+# FMMT666(ASkr) 10/2026
+#
+
+
+import os
+import sys
+import glob
+import json
+import time
+import tempfile
+
+import numpy
+
+import SyrSafeTechLogger as syr
+
+
+#############################################################################################################
+ANA_HOURLY    = False             # consumption per hour instead of per day (set by "--hourly")
+ANA_LEAKFLOW  = 60                # L/h; consumptions with a lower mean flow are leaks ... (set by "--leakflow=n")
+ANA_LEAKTIME  = 1800              # ... if they last at least this many seconds (set by "--leaktime=n")
+ANA_DROP      = 1000              # mbar; pressure this much below the median is a drop (set by "--drop=n")
+ANA_LIMITS    = ( 300, 1800, 3500 )   # volume (L), time (s) and flow (L/h) level of the profile (set by "--limits=v,t,f")
+ANA_TOP       = 10                # number of longest consumptions to list (set by "--top=n")
+ANA_GAP       = 3                 # a time step longer than this many periods is a gap, e.g. the device was down
+
+
+#############################################################################################################
+## LoadLog
+#############################################################################################################
+def LoadLog( fileName ):
+    """Load a log file as numpy structured array; the fields are those of SYR_BIN_FIELDS.
+    Binary files are memory-mapped. Text files are converted once, into a binary file next to them
+    (see BinLogName()), which is used from then on, as long as it is newer than the text file.
+    If that cannot be written, the text file is converted into a temporary file each time.
+    """
+    if fileName.endswith( ".bin" ):
+        binName = fileName
+    else:
+        binName = syr.BinLogName( fileName )
+        try:
+            fresh = os.path.getmtime( binName ) >= os.path.getmtime( fileName )
+        except OSError:
+            fresh = False
+        if not fresh:
+            try:
+                syr.ConvertLogFile( fileName, binName )
+            except PermissionError:
+                with tempfile.TemporaryDirectory( prefix = "syrana" ) as tempDir:
+                    tempName = os.path.join( tempDir, "log.bin" )
+                    syr.ConvertLogFile( fileName, tempName )
+                    with syr.SyrBinLog_class( tempName ) as log:
+                        return log.Records().copy()
+
+    with syr.SyrBinLog_class( binName ) as log:
+        return log.Records()
+
+
+#############################################################################################################
+## LoadLogs
+#############################################################################################################
+def LoadLogs( fileNames ):
+    """Load several log files, e.g. the rotated parts of one, into a single array, sorted by time.
+    """
+    records = [ LoadLog( fileName ) for fileName in fileNames ]
+    records = records[0] if len( records ) == 1 else numpy.concatenate( records )
+    if len( records ) > 1 and numpy.any( numpy.diff( records[ "time" ] ) < 0 ):
+        records = records[ numpy.argsort( records[ "time" ], kind = "stable" ) ]
+    return records
+
+
+#############################################################################################################
+## Helpers
+#############################################################################################################
+def Valid( column ):
+    """Returns: boolean array; False for values that were not logged or "ERROR"
+    """
+    return column != syr.SYR_BIN_MISSING
+
+
+def FillMissing( column ):
+    """Returns: the column with missing values replaced by the last valid one before them (or 0)
+    """
+    valid   = Valid( column )
+    indices = numpy.maximum.accumulate( numpy.where( valid, numpy.arange( len( column ) ), 0 ) )
+    return numpy.where( valid[ indices ], column[ indices ], 0 ).astype( numpy.int64 )
+
+
+def LocalTime( epochs ):
+    """Returns: the epoch seconds shifted by the local UTC offset, DST included; "// 86400" is then the local day.
+    The offset is looked up once per hour; epochs must be sorted.
+    """
+    hours  = epochs // 3600
+    starts = numpy.concatenate( ( [ 0 ], numpy.flatnonzero( numpy.diff( hours ) ) + 1 ) )
+    offset = [ time.localtime( int( epochs[ start ] ) ).tm_gmtoff for start in starts ]
+    return epochs + numpy.repeat( offset, numpy.diff( numpy.append( starts, len( epochs ) ) ) )
+
+
+def Steps( records ):
+    """Returns: a tuple ( seconds since the previous record, True where a gap was before a record, period );
+    the seconds are limited to a single period across gaps
+    """
+    epochs = records[ "time" ]
+    steps  = numpy.diff( epochs, prepend = epochs[:1] )
+    period = max( 1, int( numpy.median( steps[1:] ) ) ) if len( epochs ) > 1 else 1
+    gaps   = ( steps > ANA_GAP * period ) | ( ( records[ "flags" ] & syr.SYR_BIN_GAP ) != 0 )
+    gaps[:1] = True
+    return ( numpy.where( gaps, period, steps ), gaps, period )
+
+
+def Runs( mask, gaps ):
+    """Find runs of True in mask; a gap ends a run.
+
+    Returns: a tuple ( array of first indices, array of last indices )
+    """
+    before = numpy.concatenate( ( [ False ], mask[:-1] ) )
+    after  = numpy.concatenate( ( mask[1:], [ False ] ) )
+    gapEnd = numpy.concatenate( ( gaps[1:], [ True ] ) )
+    return ( numpy.flatnonzero( mask & ( ~before | gaps ) ), numpy.flatnonzero( mask & ( ~after | gapEnd ) ) )
+
+
+def RunMax( values, starts, ends ):
+    """Returns: the maximum of values within each run, see Runs()
+    """
+    if len( starts ) == 0:
+        return numpy.zeros( 0, values.dtype )
+    # reduceat() over [ start, end + 1 ) pairs; every second result is between two runs
+    bounds = numpy.column_stack( ( starts, ends + 1 ) ).ravel()
+    return numpy.maximum.reduceat( numpy.append( values, values[-1:] ), bounds )[ ::2 ]
+
+
+def TimeString( epoch ):
+    return time.strftime( "%Y-%m-%d %H:%M:%S", time.localtime( int( epoch ) ) )
+
+
+#############################################################################################################
+## Consumption
+#############################################################################################################
+def Consumption( records, hourly = None ):
+    """Water consumption per day (or hour), local time.
+    "volume" sums up the increments of AVO (mL of the ongoing consumption; it starts at 0 again after
+    each one), "flow" integrates FLO (L/h, only in steps of 60 or so) over time and "last" sums up LTV
+    (L, rounded) of each consumption that ended.
+
+    Returns: a list of dicts, one per day (or hour) with any data
+    """
+    hourly  = ANA_HOURLY if hourly is None else hourly
+    steps, gaps, period = Steps( records )
+    length  = 3600 if hourly else 86400
+    keys    = LocalTime( records[ "time" ] ) // length
+    bins    = keys - keys[0]
+
+    volume  = FillMissing( records[ "volume" ] )
+    delta   = numpy.diff( volume, prepend = volume[:1] )
+    ended   = delta < 0
+    delta   = numpy.where( ended, volume, delta )
+    flow    = numpy.where( Valid( records[ "flow" ] ), records[ "flow" ], 0 ) * steps / 3600.0
+    last    = numpy.where( ended & Valid( records[ "lastvolume" ] ), records[ "lastvolume" ], 0 )
+
+    samples = numpy.bincount( bins )
+    sums    = [ numpy.bincount( bins, weights ) for weights in ( delta / 1000.0, flow, ended, last ) ]
+
+    result = []
+    for num in numpy.flatnonzero( samples ):
+        # keys are local time already
+        result.append( { "start": time.strftime( "%Y-%m-%d %H:00" if hourly else "%Y-%m-%d      ", time.gmtime( int( ( keys[0] + num ) * length ) ) ),
+                         "samples": int( samples[ num ] ), "volume": round( float( sums[0][ num ] ), 3 ),
+                         "flow": round( float( sums[1][ num ] ), 3 ), "consumptions": int( sums[2][ num ] ),
+                         "last": int( sums[3][ num ] ) } )
+    return result
+
+
+#############################################################################################################
+## Consumptions
+#############################################################################################################
+def Consumptions( records ):
+    """Single consumptions: runs of polls with water flowing (FLO > 0) or an ongoing consumption (AVO > 0).
+    A dripping tap hardly shows any flow, but AVO keeps growing.
+
+    Returns: a dict with arrays: start, end (epochs), seconds, volume (L), mean and max flow (L/h)
+    """
+    steps, gaps, period = Steps( records )
+    volume = FillMissing( records[ "volume" ] )
+    flow   = FillMissing( records[ "flow" ] )
+    starts, ends = Runs( ( volume > 0 ) | ( flow > 0 ), gaps )
+
+    seconds = ( records[ "time" ][ ends ] - records[ "time" ][ starts ] + period ).astype( numpy.int64 )
+    liters  = RunMax( volume, starts, ends ) / 1000.0
+    return { "start": records[ "time" ][ starts ], "end": records[ "time" ][ ends ], "seconds": seconds, "volume": liters,
+             "meanflow": liters * 3600.0 / numpy.maximum( seconds, 1 ), "maxflow": RunMax( flow, starts, ends ) }
+
+
+def RunList( runs, indices, extra = None ):
+    """Returns: the runs at indices as list of dicts, for printing; extra( index ) can add more entries
+    """
+    result = []
+    for num in indices:
+        entry = { "start": TimeString( runs[ "start" ][ num ] ), "end": TimeString( runs[ "end" ][ num ] ),
+                  "seconds": int( runs[ "seconds" ][ num ] ), "volume": round( float( runs[ "volume" ][ num ] ), 3 ),
+                  "meanflow": round( float( runs[ "meanflow" ][ num ] ), 1 ), "maxflow": int( runs[ "maxflow" ][ num ] ) }
+        if extra is not None:
+            entry.update( extra( num ) )
+        result.append( entry )
+    return result
+
+
+#############################################################################################################
+## Leaks
+#############################################################################################################
+def Leaks( runs ):
+    """Micro leaks: consumptions with a mean flow below ANA_LEAKFLOW that last at least ANA_LEAKTIME seconds.
+
+    runs: from Consumptions()
+    """
+    return RunList( runs, numpy.flatnonzero( ( runs[ "seconds" ] >= ANA_LEAKTIME ) & ( runs[ "meanflow" ] < ANA_LEAKFLOW ) ) )
+
+
+#############################################################################################################
+## Longest
+#############################################################################################################
+def Longest( runs, limits = None ):
+    """The ANA_TOP longest consumptions, compared with the volume, time and flow level of a profile;
+    the device closes the valve as soon as one of them is exceeded.
+
+    runs  : from Consumptions()
+    limits: tuple ( L, s, L/h ); None = ANA_LIMITS
+    """
+    volume, seconds, flow = ANA_LIMITS if limits is None else limits
+    order = numpy.argsort( -runs[ "seconds" ], kind = "stable" )[ :ANA_TOP ]
+
+    def Exceeded( num ):
+        levels = [ name for name, over in [ ( "volume", runs[ "volume" ][ num ] > volume ), ( "time", runs[ "seconds" ][ num ] > seconds ),
+                                            ( "flow", runs[ "maxflow" ][ num ] > flow ) ] if over ]
+        return { "time%": round( 100.0 * float( runs[ "seconds" ][ num ] ) / seconds, 1 ), "exceeded": levels }
+
+    return RunList( runs, order, Exceeded )
+
+
+#############################################################################################################
+## Pressure
+#############################################################################################################
+def Pressure( records ):
+    """Pressure per day (min, mean, max) and drops: runs of at least ANA_DROP mbar below the median.
+
+    Returns: a dict with "median", "days" and "drops"
+    """
+    steps, gaps, period = Steps( records )
+    valid    = Valid( records[ "pressure" ] )
+    pressure = records[ "pressure" ][ valid ].astype( numpy.int64 )
+    if len( pressure ) == 0:
+        return { "median": None, "days": [], "drops": [] }
+    median   = int( numpy.median( pressure ) )
+
+    keys   = ( LocalTime( records[ "time" ] ) // 86400 )[ valid ]
+    bounds = numpy.concatenate( ( [ 0 ], numpy.flatnonzero( numpy.diff( keys ) ) + 1 ) )
+    counts = numpy.diff( numpy.append( bounds, len( pressure ) ) )
+    mins   = numpy.minimum.reduceat( pressure, bounds )
+    maxs   = numpy.maximum.reduceat( pressure, bounds )
+    means  = numpy.add.reduceat( pressure, bounds ) / counts
+    days   = [ { "day": time.strftime( "%Y-%m-%d", time.gmtime( int( keys[ bound ] ) * 86400 ) ),
+                 "min": int( mins[ num ] ), "mean": int( round( means[ num ] ) ), "max": int( maxs[ num ] ) }
+               for num, bound in enumerate( bounds ) ]
+
+    filled = FillMissing( records[ "pressure" ] )
+    starts, ends = Runs( filled <= median - ANA_DROP, gaps )
+    lowest = -RunMax( -filled, starts, ends )
+    drops  = [ { "start": TimeString( records[ "time" ][ start ] ), "seconds": int( records[ "time" ][ end ] - records[ "time" ][ start ] + period ),
+                 "min": int( low ), "valve": int( records[ "valve" ][ start ] ) }
+               for start, end, low in zip( starts, ends, lowest ) ]
+    return { "median": median, "days": days, "drops": drops }
+
+
+#############################################################################################################
+## Alarms
+#############################################################################################################
+def Alarms( records ):
+    """Alarm timeline: when which alarm was on, and for how long.
+    """
+    steps, gaps, period = Steps( records )
+    codes  = records[ "alarm" ]
+    bounds = numpy.flatnonzero( ( numpy.diff( codes ) != 0 ) | gaps[1:] ) + 1
+    starts = numpy.concatenate( ( [ 0 ], bounds ) )
+    ends   = numpy.concatenate( ( bounds - 1, [ len( codes ) - 1 ] ) )
+    active = ( codes[ starts ] != 0xFF ) & ( codes[ starts ] != 0 )
+    result = []
+    for start, end in zip( starts[ active ], ends[ active ] ):
+        code = "{:02X}".format( codes[ start ] )
+        result.append( { "start": TimeString( records[ "time" ][ start ] ),
+                         "seconds": int( records[ "time" ][ end ] - records[ "time" ][ start ] + period ),
+                         "code": code, "alarm": syr.SYR_ALARM_CODES.get( code, "UNKNOWN ERROR" ) } )
+    return result
+
+
+#############################################################################################################
+## Analyze
+#############################################################################################################
+def Analyze( records ):
+    """Run all of the above.
+
+    Returns: a dict with the results; ready for json.dumps()
+    """
+    steps, gaps, period = Steps( records )
+    runs = Consumptions( records )
+    return { "records": len( records ), "from": TimeString( records[ "time" ][0] ), "to": TimeString( records[ "time" ][-1] ),
+             "period": period, "gaps": int( numpy.count_nonzero( gaps[1:] ) ),
+             "consumption": Consumption( records ), "leaks": Leaks( runs ), "longest": Longest( runs ),
+             "pressure": Pressure( records ), "alarms": Alarms( records ) }
+
+
+#############################################################################################################
+## PrintReport
+#############################################################################################################
+def PrintReport( report ):
+    """Print the results of Analyze() in human readable form.
+    """
+    print( "Records: " + str( report[ "records" ] ) + ", " + report[ "from" ] + " .. " + report[ "to" ] +
+           ", every " + str( report[ "period" ] ) + "s, " + str( report[ "gaps" ] ) + " gap(s)" )
+
+    print( "Consumption per " + ( "hour" if ANA_HOURLY else "day" ) + " (L; from AVO, FLO and LTV):" )
+    for entry in report[ "consumption" ]:
+        print( "  {start}  {volume:10.1f}  {flow:10.1f}  {last:7d}   {consumptions:5d} consumption(s)".format( **entry ) )
+
+    print( "Leaks (mean flow below " + str( ANA_LEAKFLOW ) + " L/h for at least " + str( ANA_LEAKTIME ) + "s):" )
+    for entry in report[ "leaks" ]:
+        print( "  {start} .. {end}  {seconds:6d}s  {volume:8.1f} L  {meanflow:7.1f} L/h".format( **entry ) )
+    if not report[ "leaks" ]:
+        print( "  none" )
+
+    print( "Longest consumptions (levels: {} L, {} s, {} L/h):".format( *ANA_LIMITS ) )
+    for entry in report[ "longest" ]:
+        print( "  {start} .. {end}  {seconds:6d}s ({time%:5.1f}%)  {volume:8.1f} L  max {maxflow:5d} L/h  ".format( **entry ) +
+               ( "EXCEEDED: " + ", ".join( entry[ "exceeded" ] ) if entry[ "exceeded" ] else "" ) )
+
+    pressure = report[ "pressure" ]
+    print( "Pressure (median " + str( pressure[ "median" ] ) + " mbar; min/mean/max per day):" )
+    for entry in pressure[ "days" ]:
+        print( "  {day}  {min:5d}  {mean:5d}  {max:5d}".format( **entry ) )
+    print( "Pressure drops (at least " + str( ANA_DROP ) + " mbar below the median):" )
+    for entry in pressure[ "drops" ]:
+        print( "  {start}  {seconds:6d}s  min {min:5d} mbar  valve {valve}".format( **entry ) )
+    if not pressure[ "drops" ]:
+        print( "  none" )
+
+    print( "Alarms:" )
+    for entry in report[ "alarms" ]:
+        print( "  {start}  {seconds:6d}s  {code}  {alarm}".format( **entry ) )
+    if not report[ "alarms" ]:
+        print( "  none" )
+
+
+#############################################################################################################
+## PrintUsage
+#############################################################################################################
+def PrintUsage():
+    """Prints the usage and command line options to stdout.
+    """
+    print( "Usage: SyrSafeTechAnalytics.py [options] logfile [logfile ...]" )
+    print( "  log files can be text (also .gz, .xz) or binary (.bin, see SyrSafeTechLogger.py --convert);" )
+    print( "  text files are converted into a .bin file next to them, once" )
+    print( "Options:" )
+    print( "  --help          : print this help" )
+    print( "  --hourly        : consumption per hour instead of per day" )
+    print( "  --leakflow=n    : consumptions with a mean flow below n L/h are leaks ...; default 60" )
+    print( "  --leaktime=n    : ... if they last at least n seconds; default 1800" )
+    print( "  --drop=n        : pressure n mbar below the median is a drop; default 1000" )
+    print( "  --limits=v,t,f  : volume (L), time (s) and flow (L/h) level of the profile; default 300,1800,3500" )
+    print( "  --top=n         : number of longest consumptions to list; default 10" )
+    print( "  --json          : print the results as JSON" )
+    print( "  --logcond, --logtemp, --logprofile, --logall: the text files have these columns, as with the logger" )
+
+
+#############################################################################################################
+if __name__ == "__main__":
+
+    fileNames = []
+    printJSON = False
+
+    for args in sys.argv[1:]:
+        try:
+            if args == "--help" or args == "-h":
+                PrintUsage()
+                sys.exit( 0 )
+            elif args == "--hourly":
+                ANA_HOURLY = True
+            elif "--leakflow=" in args:
+                ANA_LEAKFLOW = abs( float( args[11:] ) )
+            elif "--leaktime=" in args:
+                ANA_LEAKTIME = abs( float( args[11:] ) )
+            elif "--drop=" in args:
+                ANA_DROP = abs( int( args[7:] ) )
+            elif "--limits=" in args:
+                ANA_LIMITS = tuple( float( value ) for value in args[9:].split( "," ) )
+                if len( ANA_LIMITS ) != 3 or min( ANA_LIMITS ) <= 0:
+                    raise ValueError
+            elif "--top=" in args:
+                ANA_TOP = max( 1, int( args[6:] ) )
+            elif args == "--json":
+                printJSON = True
+            elif args == "--logcond":
+                syr.APP_LOGCONDUCTIVITY = True
+            elif args == "--logtemp":
+                syr.APP_LOGTEMPERATURE = True
+            elif args == "--logprofile":
+                syr.APP_LOGPROFILE = True
+            elif args == "--logall":
+                syr.APP_LOGCONDUCTIVITY = syr.APP_LOGTEMPERATURE = syr.APP_LOGPROFILE = True
+            elif args.startswith( "--" ):
+                raise ValueError
+            else:
+                fileNames.extend( sorted( glob.glob( args ) ) or [ args ] )
+        except ValueError:
+            print( "ERROR: invalid option: " + args, file=sys.stderr, flush=True )
+            PrintUsage()
+            sys.exit( 1 )
+
+    if not fileNames:
+        print( "ERROR: no log file", file=sys.stderr, flush=True )
+        PrintUsage()
+        sys.exit( 1 )
+
+    try:
+        records = LoadLogs( fileNames )
+    except ( OSError, ValueError, EOFError ) as e:
+        print( "ERROR: cannot load " + str( e ), file=sys.stderr, flush=True )
+        sys.exit( 1 )
+    if len( records ) == 0:
+        print( "ERROR: no records; wrong --logcond, --logtemp or --logprofile?", file=sys.stderr, flush=True )
+        sys.exit( 1 )
+
+    report = Analyze( records )
+    if printJSON:
+        print( json.dumps( report, indent = 2 ) )
+    else:
+        PrintReport( report )
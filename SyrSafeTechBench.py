@@ -0,0 +1,1313 @@
+#!/usr/bin/env python3
+#
+# Syr SafeTech Logger Benchmarks
+#   Measures the performance of SyrSafeTechLogger.py against the simulator in SyrSafeTechSim.py,
+#   after a few checks of its behaviour. No real device is required (or touched).
+#
+#
+# https://github.com/FMMT666/SyrSafeTechLogger
+#
+
+
+import os
+import re
+import sys
+import time
+import math
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import importlib.util
+import tracemalloc
+import subprocess
+import multiprocessing
+
+import SyrSafeTechLogger as syr
+import SyrSafeTechSim as sim
+
+
+#############################################################################################################
+BENCH_REQUESTS     = 300         # number of requests per transport benchmark run (set by "--requests=n")
+BENCH_POLLS        = 50          # number of polls per poll, commands and logger run (set by "--polls=n")
+BENCH_RUNS         = 5           # number of runs of "--status" and "--showprofiles" (set by "--runs=n")
+BENCH_DAYS         = 365         # days of 2s polls for the analytics benchmark (set by "--days=n")
+BENCH_SCRAPES      = 1000        # number of scrapes of the HTTP exporter (set by "--scrapes=n")
+
+BENCH_ALL          = [ "checks", "transport", "poll", "commands", "outage", "writer", "sinks", "alarmwatch", "mqtt", "history", "changeonly", "binary", "query", "replay", "analytics", "database", "exporter", "logger", "status", "showprofiles", "startup", "devices" ]
+
+BENCH_COMMANDS     = [ "VLV", "BAR", "FLO", "AVO", "LTV", "ALA" ]   # one poll of the logger's main loop
+BENCH_LOGGER       = os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), "SyrSafeTechLogger.py" )
+
+
+
+#############################################################################################################
+## StartDevice
+#############################################################################################################
+def StartDevice( latency = None ):
+    """Start a simulated device on a free local port. The logger then talks to it by default.
+
+    latency: seconds to answer a request; None = sim.SIM_LATENCY
+
+    Returns: the server object; its address for the logger is in "server.addr"; stop it with shutdown()
+    """
+    server = sim.StartSim( latency = latency )
+
+    syr.SYR_IPADDR = "127.0.0.1"
+    syr.SYR_PORT   = server.server_address[1]
+
+    return server
+
+
+
+#############################################################################################################
+## Percentile
+#############################################################################################################
+def Percentile( values, pct ):
+    """Return the 'pct' percentile (0..100) of a list of numbers; nearest rank method.
+    """
+    if not values:
+        return 0.0
+    values = sorted( values )
+    idx = max( 0, min( len(values) - 1, math.ceil( pct / 100.0 * len(values) ) - 1 ) )
+    return values[idx]
+
+
+
+#############################################################################################################
+## BenchTransport
+#############################################################################################################
+def BenchTransport( keepAlive, stats = False, transport = "requests" ):
+    """Send BENCH_REQUESTS "get" requests through GetDataRaw(), cycling through BENCH_COMMANDS.
+
+    keepAlive: use the pooled keep-alive session (True) or a new connection per request (False)
+    stats    : collect request statistics ("--stats") while doing so
+    transport: "requests" or "stdlib" ("--transport=...")
+
+    Returns: a tuple ( requests/s, p50 latency in ms, p99 latency in ms, number of errors )
+    """
+    syr.SYR_KEEPALIVE     = keepAlive
+    syr.SYR_TRANSPORT     = transport
+    syr._syrStats.enabled = stats
+
+    latencies = []
+    errors    = 0
+    tStart    = time.perf_counter()
+    for i in range( BENCH_REQUESTS ):
+        t0 = time.perf_counter()
+        if syr.GetDataRaw( BENCH_COMMANDS[ i % len( BENCH_COMMANDS ) ] ) == syr.SYR_ERROR_STRING:
+            errors += 1
+        latencies.append( ( time.perf_counter() - t0 ) * 1000.0 )
+    tTotal = time.perf_counter() - tStart
+
+    syr._syrStats.enabled = False
+    syr.SYR_TRANSPORT     = None
+
+    return ( BENCH_REQUESTS / tTotal, Percentile( latencies, 50 ), Percentile( latencies, 99 ), errors )
+
+
+
+#############################################################################################################
+## BenchPoll
+#############################################################################################################
+def BenchPoll( parallel ):
+    """Fetch BENCH_POLLS complete polls (all of BENCH_COMMANDS) through GetDataMulti().
+
+    parallel: send the requests of a poll at once (True) or one after another (False)
+
+    Returns: a tuple ( polls/s, p50 poll latency in ms, p99 poll latency in ms, number of errors )
+    """
+    syr.SYR_KEEPALIVE = True
+
+    latencies = []
+    errors    = 0
+    tStart    = time.perf_counter()
+    for i in range( BENCH_POLLS ):
+        t0 = time.perf_counter()
+        data = syr.GetDataMulti( BENCH_COMMANDS, parallel = parallel )
+        latencies.append( ( time.perf_counter() - t0 ) * 1000.0 )
+        errors += list( data.values() ).count( syr.SYR_ERROR_STRING )
+    tTotal = time.perf_counter() - tStart
+
+    return ( BENCH_POLLS / tTotal, Percentile( latencies, 50 ), Percentile( latencies, 99 ), errors )
+
+
+
+#############################################################################################################
+## BenchCommands
+#############################################################################################################
+def BenchCommands( commands ):
+    """Read each of 'commands' BENCH_POLLS times through GetDataRaw(), one after another.
+
+    Returns: a dictionary command -> ( p50, p90, p99 latency in ms, number of errors )
+    """
+    syr.SYR_KEEPALIVE = True
+
+    results = {}
+    for command in commands:
+        latencies = []
+        errors    = 0
+        for i in range( BENCH_POLLS ):
+            t0 = time.perf_counter()
+            if syr.GetDataRaw( command ) == syr.SYR_ERROR_STRING:
+                errors += 1
+            latencies.append( ( time.perf_counter() - t0 ) * 1000.0 )
+        results[command] = ( Percentile( latencies, 50 ), Percentile( latencies, 90 ), Percentile( latencies, 99 ), errors )
+
+    return results
+
+
+
+#############################################################################################################
+## BenchOutage
+#############################################################################################################
+def BenchOutage( server, polls = 10 ):
+    """Let the simulated device stop answering (hang) after a few polls, then come back.
+
+    Returns: a tuple ( seconds for the first poll of the outage, mean seconds for the following 'polls' polls,
+             seconds until the device is back after it answers again )
+    """
+    for i in range( 20 ):
+        syr.GetDataMulti( BENCH_COMMANDS )
+
+    server.latency = 30.0
+    t0 = time.perf_counter()
+    syr.GetDataMulti( BENCH_COMMANDS )
+    first = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for i in range( polls ):
+        syr.GetDataMulti( BENCH_COMMANDS )
+    following = ( time.perf_counter() - t0 ) / polls
+
+    server.latency = None
+    t0 = time.perf_counter()
+    while syr.GetDataRaw( BENCH_COMMANDS[0] ) == syr.SYR_ERROR_STRING:
+        time.sleep( 0.1 )
+    back = time.perf_counter() - t0
+
+    return ( first, following, back )
+
+
+
+#############################################################################################################
+## SlowFile_class
+#############################################################################################################
+class SlowFile_class:
+    # A file on a slow disk, e.g. a worn SD card: each flush takes 'delay' seconds, one in twenty ten times as long.
+    def __init__( self, fileName, delay ) -> None:
+        self.fout  = open( fileName, "wt" )
+        self.delay = delay
+
+    def write( self, data ):
+        return self.fout.write( data )
+
+    def flush( self ):
+        self.fout.flush()
+        time.sleep( self.delay * ( 10 if random.random() < 0.05 else 1 ) )
+
+    def fileno( self ):
+        return self.fout.fileno()
+
+    def close( self ):
+        self.fout.close()
+
+
+
+#############################################################################################################
+## BenchWriter
+#############################################################################################################
+def BenchWriter( useWriter, period = 0.1, delay = 0.02, polls = 100 ):
+    """Poll at a fixed rate and log to a slow disk (SlowFile_class), like the logger's main loop does.
+    Measures the sampling jitter: how much the time between two polls differs from 'period'.
+
+    useWriter: write through SyrLogWriter_class (True) or write and flush in the polling loop (False)
+    period   : seconds between two polls
+    delay    : seconds a flush takes; see SlowFile_class
+
+    Returns: a tuple ( p50, p99 and max jitter in ms, number of overruns )
+    """
+    workDir = tempfile.mkdtemp( prefix = "syrbench" )
+    fout    = SlowFile_class( os.path.join( workDir, "bench.log" ), delay )
+    writer  = syr.SyrLogWriter_class( fout ) if useWriter else None
+
+    starts    = []
+    scheduler = syr.SyrScheduler_class( period )
+    for i in range( polls ):
+        starts.append( time.monotonic() )
+        data = syr.GetDataMulti( BENCH_COMMANDS, parallel = True )
+        lineStdout, lineFile = syr.FormatLogLines( data, time.asctime(), time.strftime("%Y;%m;%d; %H;%M;%S") )
+        if writer is not None:
+            writer.Write( lineFile )
+        else:
+            fout.write( lineFile + "\n" )
+            fout.flush()
+        scheduler.Wait()
+
+    if writer is not None:
+        writer.Close()
+    else:
+        fout.close()
+    shutil.rmtree( workDir, ignore_errors = True )
+
+    jitter = [ abs( b - a - period ) * 1000.0 for a, b in zip( starts, starts[1:] ) ]
+    return ( Percentile( jitter, 50 ), Percentile( jitter, 99 ), max( jitter ), scheduler.overruns )
+
+
+
+#############################################################################################################
+## SlowTerminal_class
+#############################################################################################################
+class SlowTerminal_class:
+    # A terminal that stalls now and then, e.g. paused with CTRL-S or a pipe nobody reads for a while:
+    # every 'every'th write takes 'pause' seconds. Nothing is printed for real.
+    def __init__( self, pause = 0.5, every = 20 ) -> None:
+        self.pause  = pause
+        self.every  = every
+        self.writes = 0
+
+    def write( self, data ):
+        self.writes += 1
+        if self.writes % self.every == 0:
+            time.sleep( self.pause )
+        return len( data )
+
+    def flush( self ):
+        pass
+
+
+
+#############################################################################################################
+## BenchSinks
+#############################################################################################################
+def BenchSinks( policy, period = 0.05, polls = 100, maxQueue = 5 ):
+    """Poll at a fixed rate, print to a stalling terminal (SlowTerminal_class) and log to a slow disk
+    (SlowFile_class), like the logger's main loop does. Measures the sampling jitter, see BenchWriter().
+
+    policy  : None = print, write and flush in the polling loop; "drop" or "block" = through the sinks,
+              each with a queue of 'maxQueue' items
+    period  : seconds between two polls
+
+    Returns: a tuple ( p50, p99 and max jitter in ms, number of overruns, items dropped, lines in the log file )
+    """
+    workDir  = tempfile.mkdtemp( prefix = "syrbench" )
+    fout     = SlowFile_class( os.path.join( workDir, "bench.log" ), 0.02 )
+    terminal = SlowTerminal_class()
+    pipeline = syr.SyrPipeline_class()
+    if policy is not None:
+        pipeline.Add( syr.SyrStdoutSink_class( fout = terminal, maxQueue = maxQueue, policy = policy ) )
+        writer = pipeline.Add( syr.SyrLogWriter_class( fout, maxQueue = maxQueue, policy = policy, changeOnly = False ) )
+
+    starts    = []
+    scheduler = syr.SyrScheduler_class( period )
+    for i in range( polls ):
+        starts.append( time.monotonic() )
+        record = syr.SyrRecord_class( syr.SyrRecord_class.POLL, syr.SYR_IPADDR )
+        record.Parse( syr.GetDataMulti( BENCH_COMMANDS, parallel = True ) )
+        if policy is not None:
+            pipeline.Put( record )
+        else:
+            lineStdout, lineFile = syr.FormatLogLines( record.data, record.timeHuman, record.timeMachine )
+            terminal.write( lineStdout + "\n" )
+            terminal.flush()
+            fout.write( lineFile + "\n" )
+            fout.flush()
+        scheduler.Wait()
+
+    if policy is not None:
+        pipeline.Close()
+        dropped = sum( sink[ "dropped" ] for sink in pipeline.Status() )
+        lines   = writer.lines
+    else:
+        fout.close()
+        dropped = 0
+        lines   = polls
+    shutil.rmtree( workDir, ignore_errors = True )
+
+    jitter = [ abs( b - a - period ) * 1000.0 for a, b in zip( starts, starts[1:] ) ]
+    return ( Percentile( jitter, 50 ), Percentile( jitter, 99 ), max( jitter ), scheduler.overruns, dropped, lines )
+
+
+
+#############################################################################################################
+## BenchAlarmWatch
+#############################################################################################################
+def BenchAlarmWatch( server, watch, hookDelay, period = 1.0, alarms = 5 ):
+    """Poll every 'period' seconds, like the logger's main loop, and raise an alarm in the simulated device
+    now and then, at a random point between two polls. A Python hook notes when it was called.
+
+    watch    : None = the polls detect the alarm and call the hook, in the polling loop;
+               n = seconds between the reads of SyrAlarmWatch_class ("--alarmwatch=n"), hook in the hook threads
+    hookDelay: seconds the hook takes, e.g. a slow webhook
+
+    Returns: a tuple ( mean and max seconds from the alarm to the hook call, polls missed, see SyrScheduler_class )
+    """
+    called = []
+    def Hook( event ):
+        if event[ "kind" ] == "alarm" and event[ "new" ] != "FF":
+            called.append( time.monotonic() )
+        time.sleep( hookDelay )
+
+    if watch is not None:
+        watcher = syr.SyrAlarmWatch_class( syr.SYR_IPADDR, watch, [ Hook ] )
+        watcher.Start()
+    commands  = [ command for command in BENCH_COMMANDS if watch is None or command not in syr.SYR_ALARMWATCH_COMMANDS ]
+    scheduler = syr.SyrScheduler_class( period )
+    random.seed( 1 )
+
+    raised = []
+    alarm  = "FF"
+    polls  = 0
+    due    = None               # poll after which the next alarm is raised
+    while len( raised ) < alarms or len( called ) < alarms:
+        data   = syr.GetDataMulti( commands )
+        polls += 1
+        if watch is None and ( value := data[ syr.SYR_CMD_ALARM ] ) != alarm:
+            Hook( { "kind": "alarm", "old": alarm, "new": value } )
+            alarm = value
+        # once the last alarm was reported, clear it; a few polls later, the next one
+        if len( raised ) == len( called ) and len( raised ) < alarms:
+            if due is None:
+                server.sim.alarm = "FF"
+                due = polls + 3
+            elif polls >= due:
+                time.sleep( random.uniform( 0.0, period * 0.9 ) )
+                server.sim.Alarm( "A3" )
+                raised.append( time.monotonic() )
+                due = None
+        scheduler.Wait()
+
+    if watch is not None:
+        watcher.Close()
+    server.sim.alarm = "FF"
+
+    latency = [ b - a for a, b in zip( raised, called ) ]
+    return ( sum( latency ) / len( latency ), max( latency ), scheduler.skipped )
+
+
+
+#############################################################################################################
+## BenchMqtt
+#############################################################################################################
+def BenchMqtt( alarms = 5, seconds = 10 ):
+    """A simulated device that also publishes via MQTT (SyrSafeTechSim.py "--mqttport"), with its built-in broker.
+    First, alarms are raised at random times, and the time until SyrMqttSource_class has them is measured.
+    Then the logger runs for 'seconds' seconds with "--delay=1 --logall", as separate process, polling, with "--mqtt"
+    and with "--mqtt --tiered".
+
+    Returns: a tuple ( mean and max seconds until an alarm arrived, ( lines, requests ) of each logger run )
+             or None without paho-mqtt
+    """
+    # only whether it is installed; SyrMqttSource_class imports it itself
+    if importlib.util.find_spec( "paho" ) is None or importlib.util.find_spec( "paho.mqtt.client" ) is None:
+        return None
+
+    server  = sim.StartSim( mqttPort = 0 )
+    source  = syr.SyrMqttSource_class( server.mqttAddr, "safetec/#", server.addr )
+    source.Start()
+    latency = []
+    random.seed( 1 )
+    for i in range( alarms ):
+        server.sim.alarm = "FF"
+        while source.Latest().get( syr.SYR_CMD_ALARM ) != "FF":
+            time.sleep( 0.01 )
+        time.sleep( random.uniform( 0.0, 1.0 ) )
+        server.sim.Alarm( "A3" )
+        t0 = time.monotonic()
+        while source.Latest().get( syr.SYR_CMD_ALARM ) != "A3":
+            source.Wait( 1.0 )
+        latency.append( time.monotonic() - t0 )
+    source.Close()
+    server.sim.alarm = "FF"
+
+    results = []
+    workDir = tempfile.mkdtemp( prefix = "syrbench" )
+    try:
+        for args in [ [], [ "--mqtt=" + server.mqttAddr ], [ "--mqtt=" + server.mqttAddr, "--tiered" ] ]:
+            process = subprocess.Popen( [ sys.executable, BENCH_LOGGER, "--ipaddr=" + server.addr, "--delay=1", "--logall",
+                                          "--nofile" ] + args, cwd = workDir, stdout = subprocess.PIPE, stderr = subprocess.DEVNULL, text = True )
+            # not counting the startup
+            process.stdout.readline()
+            requests0 = server.requests
+            time.sleep( seconds )
+            requests  = server.requests - requests0
+            process.terminate()
+            lines = len( process.communicate()[0].splitlines() )
+            results.append( ( lines, requests ) )
+    finally:
+        shutil.rmtree( workDir, ignore_errors = True )
+        server.shutdown()
+
+    return ( sum( latency ) / len( latency ), max( latency ), *results )
+
+
+
+#############################################################################################################
+## SimulateLog
+#############################################################################################################
+def SimulateLog( noise = None, period = 1.0, hours = 24.0 ):
+    """Log a simulated device, offline and without any waiting.
+
+    noise : random error of the pressure in mbar, see SIM_NOISE; None = the simulator's default
+    period: simulated seconds between polls
+    hours : simulated hours
+
+    Returns: a list of tuples ( simulated time, log file line )
+    """
+    noise, sim.SIM_NOISE = sim.SIM_NOISE, sim.SIM_NOISE if noise is None else noise
+    device = sim.SyrSimDevice_class( seed = 1 )
+    polls  = []
+    try:
+        for _ in range( int( hours * 3600 / period ) ):
+            device.Step( period )
+            data      = { command: device.Get( command ) for command in BENCH_COMMANDS }
+            timeStamp = time.strftime( "%Y;%m;%d; %H;%M;%S", time.localtime( device.simTime ) )
+            polls.append( ( device.simTime, syr.FormatLogLines( data, "", timeStamp )[1] ) )
+    finally:
+        sim.SIM_NOISE = noise
+    return polls
+
+
+
+#############################################################################################################
+## BenchHistory
+#############################################################################################################
+def BenchHistory( hours = 6.0, period = 1.0 ):
+    """Parse simulated polls into SyrSample_class objects and keep them in a SyrHistory_class, asking for
+    the mean flow of the last 10 min and the volume since the valve's last change after each poll.
+    Compared with a plain list of all samples, the mean flow computed from its end each time.
+
+    Returns: a tuple ( polls, µs per poll to parse, µs per poll with the ring buffer, µs per poll with the list,
+    bytes of the ring buffer, bytes of the list )
+    """
+    device = sim.SyrSimDevice_class( seed = 1 )
+    polls  = []
+    for _ in range( int( hours * 3600 / period ) ):
+        device.Step( period )
+        polls.append( ( device.simTime, { command: device.Get( command ) for command in BENCH_COMMANDS } ) )
+
+    t0      = time.perf_counter()
+    samples = [ syr.SyrSample_class( data, simTime ) for simTime, data in polls ]
+    parse   = time.perf_counter() - t0
+
+    history = syr.SyrHistory_class( hours = hours, period = period )
+    t0      = time.perf_counter()
+    for sample in samples:
+        history.Append( sample )
+        history.FlowMean()
+        history.VolumeSinceValve()
+    ring = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for num, sample in enumerate( samples ):
+        flows = []
+        for old in reversed( samples[ max( 0, num - 2 * syr.SYR_HISTORY_WINDOW ) : num + 1 ] ):
+            if old.time <= sample.time - syr.SYR_HISTORY_WINDOW:
+                break
+            if old.flow is not None:
+                flows.append( old.flow )
+        sum( flows ) / len( flows ) if flows else None
+    naive = time.perf_counter() - t0
+
+    # what the list of all samples takes
+    tracemalloc.start()
+    kept      = [ syr.SyrSample_class( data, simTime ) for simTime, data in polls ]
+    listBytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+
+    num = len( samples )
+    return ( num, parse / num * 1e6, ring / num * 1e6, naive / num * 1e6, history.Status()[ "bytes" ], listBytes )
+
+
+
+#############################################################################################################
+## BenchChangeOnly
+#############################################################################################################
+def BenchChangeOnly( noise, band ):
+    """Log a simulated day with and without "--changeonly".
+    The "--changeonly" lines are expanded again and compared against the full log; exactly for band 0,
+    otherwise the pressure within the band.
+
+    noise: random error of the pressure in mbar, see SIM_NOISE
+    band : see "--pressureband"
+
+    Returns: a tuple ( full bytes, changeonly lines, changeonly bytes, reduction factor, expanded lines, mismatches )
+    """
+    runLength = syr.SyrRunLength_class( pressureBand = band )
+    full      = []
+    lines     = []
+    for simTime, lineFile in SimulateLog( noise ):
+        full.append( lineFile )
+        lines.extend( runLength.Update( lineFile, simTime ) )
+    lines.extend( runLength.End() )
+
+    # the time stamps only have a resolution of a second; compare the values, with a band the pressure (column 3) within it
+    def Same( a, b ):
+        if band == 0:
+            return a[20:] == b[20:]
+        a, b = a.split( "; " )[2:], b.split( "; " )[2:]
+        return a[:1] + a[2:] == b[:1] + b[2:] and abs( int( a[1] ) - int( b[1] ) ) <= band
+
+    expanded   = list( syr.ExpandLogLines( lines ) )
+    mismatches = sum( 1 for a, b in zip( full, expanded ) if not Same( a, b ) ) + abs( len( full ) - len( expanded ) )
+    fullBytes  = sum( len( line ) + 1 for line in full )
+    lineBytes  = sum( len( line ) + 1 for line in lines )
+
+    return ( fullBytes, len( lines ), lineBytes, fullBytes / lineBytes, len( expanded ), mismatches )
+
+
+
+#############################################################################################################
+## BenchBinary
+#############################################################################################################
+def BenchBinary():
+    """Log a simulated day, convert it into a binary file, then sum up the flow column, once by parsing
+    the text file and once from the memory-mapped binary one, with and without numpy.
+
+    Returns: a tuple ( text bytes, binary bytes, conversion s, text s, binary/struct s, binary/numpy s or None )
+    """
+    workDir = tempfile.mkdtemp( prefix = "syrbench" )
+    try:
+        textName = os.path.join( workDir, "bench_SyrSafeTech.log" )
+        with open( textName, "w" ) as fout:
+            for simTime, lineFile in SimulateLog():
+                fout.write( lineFile + "\n" )
+
+        t0 = time.perf_counter()
+        binName, records, skipped = syr.ConvertLogFile( textName )
+        tConvert = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        with open( textName ) as fin:
+            flowText = sum( int( line.split( "; " )[4] ) for line in fin )
+        tText = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        with syr.SyrBinLog_class( binName ) as log:
+            flowStruct = sum( record[2] for record in log )
+        tStruct = time.perf_counter() - t0
+
+        # not the import of numpy
+        with syr.SyrBinLog_class( binName ) as log:
+            log.Records()
+        tNumpy = None
+        t0 = time.perf_counter()
+        with syr.SyrBinLog_class( binName ) as log:
+            if log.Records() is not None:
+                flowNumpy = int( log.Column( "flow" ).sum() )
+                tNumpy    = time.perf_counter() - t0
+                if flowNumpy != flowText:
+                    print( "WARNING: numpy sum differs", file=sys.stderr, flush=True )
+
+        if flowStruct != flowText or skipped > 0:
+            print( "WARNING: binary file differs from the text file", file=sys.stderr, flush=True )
+
+        return ( os.path.getsize( textName ), os.path.getsize( binName ), tConvert, tText, tStruct, tNumpy )
+    finally:
+        shutil.rmtree( workDir, ignore_errors = True )
+
+
+
+#############################################################################################################
+## BenchQuery
+#############################################################################################################
+def BenchQuery( days = 7 ):
+    """Log a few simulated days, then query an hour of the last day, once by reading the complete file
+    and once with the index; the latter once while the index is created and once with the index file.
+
+    Returns: a tuple ( bytes, lines found, full scan s, indexed s with new index, indexed s )
+    """
+    workDir = tempfile.mkdtemp( prefix = "syrbench" )
+    try:
+        textName = os.path.join( workDir, "bench_SyrSafeTech.log" )
+        with open( textName, "w" ) as fout:
+            for simTime, lineFile in SimulateLog( hours = days * 24 ):
+                fout.write( lineFile + "\n" )
+                lastTime = simTime
+        tFrom = lastTime - 12 * 3600
+        tTo   = tFrom + 3600
+
+        t0 = time.perf_counter()
+        with open( textName ) as fin:
+            found = sum( 1 for result in syr.QueryLogLines( fin, tFrom, tTo ) )
+        tFull = time.perf_counter() - t0
+
+        times = []
+        for _ in range( 2 ):
+            t0 = time.perf_counter()
+            if sum( 1 for result in syr.QueryLogLines( syr.ReadLogRange( textName, tFrom, tTo ), tFrom, tTo ) ) != found:
+                print( "WARNING: indexed query differs", file=sys.stderr, flush=True )
+            times.append( time.perf_counter() - t0 )
+
+        return ( os.path.getsize( textName ), found, tFull, *times )
+    finally:
+        shutil.rmtree( workDir, ignore_errors = True )
+
+
+
+#############################################################################################################
+## BenchReplay
+#############################################################################################################
+def BenchReplay( args, hours = 24.0, speed = 0 ):
+    """Replay a simulated log, a poll every second, through the logger's sinks ("--replay"), as separate process.
+
+    args : list with extra command line options, e.g. [ "--nofile" ]; stdout goes nowhere
+    speed: "--speed"; 0 = as fast as possible
+
+    Returns: a tuple ( records, wall time in s, records/s, times faster than real time ), as the logger reports them
+    """
+    workDir = tempfile.mkdtemp( prefix = "syrbench" )
+    try:
+        textName = os.path.join( workDir, "bench_SyrSafeTech.log" )
+        with open( textName, "w" ) as fout:
+            for simTime, lineFile in SimulateLog( hours = hours ):
+                fout.write( lineFile + "\n" )
+        result = subprocess.run( [ sys.executable, BENCH_LOGGER, "--replay=" + textName, "--speed=" + str( speed ) ] + args,
+                                 cwd = workDir, stdout = subprocess.DEVNULL, stderr = subprocess.PIPE, text = True, check = False )
+    finally:
+        shutil.rmtree( workDir, ignore_errors = True )
+
+    if ( match := re.search( r"(\d+) poll\(s\).* in ([\d.]+)s: (\d+) records/s, (\d+)x real time", result.stderr ) ) is None:
+        print( "WARNING: replay failed: " + result.stderr.strip(), file=sys.stderr, flush=True )
+        return ( 0, 0.0, 0.0, 0.0 )
+    return ( int( match.group(1) ), float( match.group(2) ), float( match.group(3) ), float( match.group(4) ) )
+
+
+
+#############################################################################################################
+## BenchAnalytics
+#############################################################################################################
+def BenchAnalytics():
+    """Analyze BENCH_DAYS days of polls every 2s with SyrSafeTechAnalytics.py; a simulated day, repeated.
+    Loading is not included; binary files are memory-mapped anyway.
+
+    Returns: a tuple ( records, seconds ) or None without numpy
+    """
+    try:
+        import numpy
+        import SyrSafeTechAnalytics as ana
+    except ImportError:
+        return None
+
+    dtype   = numpy.dtype( [ ( name, "<" + code ) for name, code in syr.SYR_BIN_FIELDS ] )
+    day     = numpy.array( [ syr.LogLineToRecord( lineFile ) for simTime, lineFile in SimulateLog( period = 2.0 ) ], dtype )
+    records = numpy.tile( day, BENCH_DAYS )
+    records[ "time" ] += numpy.repeat( numpy.arange( BENCH_DAYS, dtype = numpy.int64 ) * 86400, len( day ) )
+
+    t0 = time.perf_counter()
+    ana.Analyze( records )
+    return ( len( records ), time.perf_counter() - t0 )
+
+
+
+#############################################################################################################
+## BenchDatabase
+#############################################################################################################
+def BenchDatabase( flushLines = None, rows = 3000 ):
+    """Write rows into a SQLite database, once with SyrDbWriter_class ("--db"), once the straightforward
+    way: a commit per row, in the polling loop, default journal.
+
+    flushLines: rows per transaction with SyrDbWriter_class; None = the straightforward way
+
+    Returns: a tuple ( µs per row in the polling loop, rows/s in total )
+    """
+    workDir = tempfile.mkdtemp( prefix = "syrbench" )
+    try:
+        dbName  = os.path.join( workDir, "bench.db" )
+        record  = syr.LogLineToRecord( "2026;10;17; 10;00;00; 20; 5000; 0; 0; 7; FF" )
+        inLoop  = 0.0
+        t0      = time.perf_counter()
+        if flushLines is None:
+            db = sqlite3.connect( dbName )
+            db.executescript( syr.SYR_DB_SCHEMA )
+            for num in range( rows ):
+                t1 = time.perf_counter()
+                db.execute( syr.SYR_DB_INSERT, syr.RecordToRow( "123456789", ( record[0] + num, ) + record[1:] ) )
+                db.commit()
+                inLoop += time.perf_counter() - t1
+            db.close()
+        else:
+            db = syr.SyrDbWriter_class( dbName, flushLines = flushLines, flushSecs = None )
+            for num in range( rows ):
+                t1 = time.perf_counter()
+                db.Write( syr.RecordToRow( "123456789", ( record[0] + num, ) + record[1:] ) )
+                inLoop += time.perf_counter() - t1
+            db.Close()
+        total = time.perf_counter() - t0
+    finally:
+        shutil.rmtree( workDir, ignore_errors = True )
+
+    return ( inLoop / rows * 1e6, rows / total )
+
+
+
+#############################################################################################################
+## BenchExporter
+#############################################################################################################
+def BenchExporter( server, path, polls = 10 ):
+    """Poll the simulated device a few times, then scrape the HTTP exporter ("--httpport") BENCH_SCRAPES times.
+
+    path: "/metrics" or "/json"
+
+    Returns: a tuple ( scrapes/s, p50 in ms, p99 in ms, requests to the device during the scrapes, bytes per scrape )
+    """
+    enabled = syr._syrStats.enabled
+    syr._syrStats.enabled = True
+    exporter = syr.StartExporter( 0 )
+    try:
+        for num in range( polls ):
+            data = syr.GetDataMulti( BENCH_COMMANDS )
+            syr._syrMetrics.Update( syr.SYR_IPADDR, data, num + 1, 0, True, "123456789", "Safe-Tech V4.04" )
+
+        url       = "http://127.0.0.1:" + str( exporter.server_address[1] ) + path
+        import requests
+        session   = requests.Session()
+        latencies = []
+        requests0 = server.requests
+        t0        = time.perf_counter()
+        for i in range( BENCH_SCRAPES ):
+            t1   = time.perf_counter()
+            size = len( session.get( url, timeout = 5 ).content )
+            latencies.append( ( time.perf_counter() - t1 ) * 1000.0 )
+        total = time.perf_counter() - t0
+        session.close()
+    finally:
+        exporter.shutdown()
+        exporter.server_close()
+        syr._syrStats.enabled = enabled
+
+    return ( BENCH_SCRAPES / total, Percentile( latencies, 50 ), Percentile( latencies, 99 ), server.requests - requests0, size )
+
+
+
+#############################################################################################################
+## RunLogger
+#############################################################################################################
+def RunLogger( server, args, workDir ):
+    """Run SyrSafeTechLogger.py once, as a separate process, against the simulated device.
+
+    server : the simulated device, from StartDevice()
+    args   : list with extra command line options
+    workDir: working directory; log files end up here
+
+    Returns: a tuple ( wall time in s, CPU time of the process in s, number of requests it sent )
+    """
+    requests0 = server.requests
+    cpu0      = os.times()
+    t0        = time.perf_counter()
+    subprocess.run( [ sys.executable, BENCH_LOGGER, "--ipaddr=" + server.addr ] + args, cwd = workDir,
+                    stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL, check = False )
+    wall      = time.perf_counter() - t0
+    cpu1      = os.times()
+    cpu       = ( cpu1.children_user + cpu1.children_system ) - ( cpu0.children_user + cpu0.children_system )
+
+    return ( wall, cpu, server.requests - requests0 )
+
+
+
+#############################################################################################################
+## BenchLogger
+#############################################################################################################
+def BenchLogger( server, args ):
+    """Run the logger's main loop for BENCH_POLLS polls, as fast as possible ("--delay=0").
+    The process' startup is measured with a single poll and subtracted.
+
+    args: list with extra command line options, e.g. [ "--parallel" ]
+
+    Returns: a tuple ( polls/s, CPU time per poll in ms, requests per poll )
+    """
+    workDir = tempfile.mkdtemp( prefix = "syrbench" )
+    try:
+        base = [ "--delay=0", "--nostdout" ] + args
+        wall1, cpu1, req1 = RunLogger( server, base + [ "--maxpolls=1" ], workDir )
+        wallN, cpuN, reqN = RunLogger( server, base + [ "--maxpolls=" + str( BENCH_POLLS ) ], workDir )
+    finally:
+        shutil.rmtree( workDir, ignore_errors = True )
+
+    polls = BENCH_POLLS - 1
+    return ( polls / max( 1e-9, wallN - wall1 ), ( cpuN - cpu1 ) / polls * 1000.0, ( reqN - req1 ) / polls )
+
+
+
+#############################################################################################################
+## BenchCommand
+#############################################################################################################
+def BenchCommand( server, args ):
+    """Run a one-shot command of the logger, e.g. "--status", BENCH_RUNS times, including the process' startup.
+
+    Returns: a tuple ( p50 wall time in ms, p99 wall time in ms, CPU time per run in ms, requests per run )
+    """
+    walls    = []
+    cpu      = 0.0
+    requests = 0
+    workDir  = tempfile.mkdtemp( prefix = "syrbench" )
+    try:
+        for i in range( BENCH_RUNS ):
+            wall, c, r = RunLogger( server, args, workDir )
+            walls.append( wall * 1000.0 )
+            cpu      += c
+            requests += r
+    finally:
+        shutil.rmtree( workDir, ignore_errors = True )
+
+    return ( Percentile( walls, 50 ), Percentile( walls, 99 ), cpu / BENCH_RUNS * 1000.0, requests / BENCH_RUNS )
+
+
+
+#############################################################################################################
+## BenchStartup
+#############################################################################################################
+def BenchStartup( server, args, module = False ):
+    """Run a command of the logger BENCH_RUNS times, as separate process; the wall time is mostly startup.
+
+    args  : list with the command line options, e.g. [ "--henlo", "--transport=stdlib" ]; None = just "python -c pass"
+    module: start it as "python -m SyrSafeTechLogger", which uses the cached bytecode, instead of the script
+
+    Returns: a tuple ( p50 wall time in ms, p99 wall time in ms, requests per run )
+    """
+    if args is None:
+        command = [ sys.executable, "-c", "pass" ]
+    elif module:
+        command = [ sys.executable, "-m", "SyrSafeTechLogger", "--ipaddr=" + server.addr ] + args
+    else:
+        command = [ sys.executable, BENCH_LOGGER, "--ipaddr=" + server.addr ] + args
+    walls     = []
+    requests0 = server.requests
+    for i in range( BENCH_RUNS ):
+        t0 = time.perf_counter()
+        subprocess.run( command, cwd = os.path.dirname( BENCH_LOGGER ), stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL, check = False )
+        walls.append( ( time.perf_counter() - t0 ) * 1000.0 )
+
+    return ( Percentile( walls, 50 ), Percentile( walls, 99 ), ( server.requests - requests0 ) / BENCH_RUNS )
+
+
+
+#############################################################################################################
+## SimProcess
+#############################################################################################################
+def SimProcess( conn, numDevices, numHanging, options ):
+    """Child process main; runs 'numDevices' simulated devices and sends their addresses through 'conn'.
+    Runs until 'conn' is closed by the parent.
+
+    options: the parent's simulator settings; dictionary "SIM_..." name -> value
+    """
+    for name, value in options.items():
+        setattr( sim, name, value )
+    servers = [ sim.StartSim( latency = 10.0 if i < numHanging else None ) for i in range( numDevices ) ]
+    conn.send( [ server.addr for server in servers ] )
+    try:
+        conn.recv()
+    except EOFError:
+        pass
+
+
+
+#############################################################################################################
+## BenchDevices
+#############################################################################################################
+def BenchDevices( numDevices, numHanging = 0, delay = 1.0, duration = 6.0 ):
+    """Log 'numDevices' simulated devices at once with RunDevices(), for 'duration' seconds, without any output.
+
+    numHanging: how many of them never answer in time (requests time out)
+    delay     : poll period of each device in seconds
+
+    Returns: a tuple ( polls/s of all healthy devices, target polls/s, worst healthy device in percent of its
+             target rate, CPU time per poll in ms )
+    """
+    # the simulators run in their own process; they would compete with the logger for the GIL otherwise
+    options = { name: getattr( sim, name ) for name in dir( sim ) if name.startswith( "SIM_" ) }
+    conn, childConn = multiprocessing.Pipe()
+    child = multiprocessing.Process( target = SimProcess, args = ( childConn, numDevices, numHanging, options ), daemon = True )
+    child.start()
+    addrs = conn.recv()
+
+    syr.APP_NOSTDOUT = True
+    syr.APP_NOFILE   = True
+    devices = [ syr.SyrDevice_class( addr, delay ) for addr in addrs ]
+
+    cpu0 = time.process_time()
+    syr.RunDevices( devices, duration = duration )
+    cpu  = time.process_time() - cpu0
+
+    conn.close()
+    child.terminate()
+    child.join()
+
+    healthy = devices[ numHanging: ]
+    polls   = sum( device.polls for device in healthy )
+    target  = len( healthy ) * duration / delay
+    worst   = min( device.polls for device in healthy ) / ( duration / delay ) * 100.0
+
+    return ( polls / duration, target / duration, worst, cpu / max( 1, polls ) * 1000.0 )
+
+
+
+#############################################################################################################
+## CheckBreaker
+#############################################################################################################
+def CheckBreaker():
+    """The circuit breaker of SyrLink_class: closed -> open -> half-open -> open -> half-open -> closed.
+    The first probe fails with an "error"; the breaker must still recover.
+    """
+    link = syr.SyrLink_class()
+    for _ in range( syr.SYR_BREAKER_FAILURES * 2 ):
+        link.Failure( "FLO", "http" )
+    assert link.state == "closed" and link.failures == 0, "HTTP errors must not open the breaker"
+    for _ in range( syr.SYR_BREAKER_FAILURES ):
+        assert link.Allow()
+        link.Failure( "FLO", "timeout" )
+    assert link.state == "open" and not link.Allow(), "not open after " + str( syr.SYR_BREAKER_FAILURES ) + " timeouts"
+
+    # cooldown over; a single probe, which fails with an error
+    link.openTill = 0.0
+    assert [ link.Allow(), link.Allow(), link.Allow() ] == [ True, False, False ], "not exactly one probe"
+    assert link.state == "half-open"
+    link.Failure( "FLO", "error" )
+    assert link.state == "open", "a failed probe must open the breaker again, not leave it " + link.state
+    assert link.cooldown == min( syr.SYR_BREAKER_COOLDOWN * 2, syr.SYR_BREAKER_MAXCOOLDOWN ), "cooldown not doubled"
+    assert not link.Allow()
+
+    # the next probe is answered
+    link.openTill = 0.0
+    assert link.Allow() and link.state == "half-open"
+    link.Success( "FLO", 0.01 )
+    assert link.state == "closed" and link.Allow() and link.Allow(), "not closed after an answered probe"
+    assert link.cooldown == syr.SYR_BREAKER_COOLDOWN
+
+
+
+#############################################################################################################
+## CheckChangeOnly
+#############################################################################################################
+def CheckChangeOnly():
+    """"--changeonly" and ExpandLogLines() are lossless at the default pressure band of 0, with pressure
+    noise and without.
+    """
+    assert syr.APP_PRESSUREBAND == 0, "the default must be exact"
+    for noise in [ 100, 0 ]:
+        full      = SimulateLog( noise, hours = 3.0 )
+        runLength = syr.SyrRunLength_class()
+        lines     = []
+        for simTime, lineFile in full:
+            lines.extend( runLength.Update( lineFile, simTime ) )
+        lines.extend( runLength.End() )
+        expanded = list( syr.ExpandLogLines( lines ) )
+        assert len( lines ) < len( full ), "nothing saved"
+        assert len( expanded ) == len( full ), "{:d} lines instead of {:d}".format( len( expanded ), len( full ) )
+        for ( simTime, lineFile ), line in zip( full, expanded ):
+            assert line == lineFile, "expanded " + repr( line ) + " instead of " + repr( lineFile )
+
+
+
+#############################################################################################################
+## CheckBinary
+#############################################################################################################
+def CheckBinary():
+    """ConvertLogFile() -> SyrBinLog_class: the same values as in the text file; a "--changeonly" one,
+    with a "# GAP" in the middle.
+    """
+    full      = [ lineFile for simTime, lineFile in SimulateLog( hours = 1.0 ) ]
+    half      = len( full ) // 2
+    runLength = syr.SyrRunLength_class()
+    lines     = []
+    for num, lineFile in enumerate( full ):
+        if num == half:
+            lines.extend( runLength.End() + [ "# GAP 10s" ] )
+        lines.extend( runLength.Update( lineFile, float( num ) ) )
+    lines.extend( runLength.End() )
+
+    workDir = tempfile.mkdtemp( prefix = "syrcheck" )
+    try:
+        textName = os.path.join( workDir, "check_SyrSafeTech.log" )
+        with open( textName, "w" ) as fout:
+            fout.write( "".join( line + "\n" for line in lines ) )
+        binName, records, skipped = syr.ConvertLogFile( textName )
+        assert ( records, skipped ) == ( len( full ), 0 ), "{:d} records, {:d} skipped".format( records, skipped )
+
+        with syr.SyrBinLog_class( binName ) as log:
+            assert len( log ) == len( full )
+            for num, ( lineFile, record ) in enumerate( zip( full, log ) ):
+                fields = lineFile.split( "; " )
+                epoch  = int( time.mktime( time.strptime( lineFile[:20], "%Y;%m;%d; %H;%M;%S" ) ) )
+                expect = ( int( fields[3] ), int( fields[4] ), int( fields[5] ), int( fields[6] ),
+                           syr.SYR_BIN_MISSING, syr.SYR_BIN_MISSING, int( fields[2] ), int( fields[7], 16 ), 0,
+                           syr.SYR_BIN_GAP if num == half else 0 )
+                # the times of expanded runs are spread evenly; they can be off by a second
+                assert abs( record[0] - epoch ) <= 1 and record[1:] == expect, \
+                       "record " + str( num ) + " is " + repr( record ) + " for " + repr( lineFile )
+            if log.Records() is not None:
+                assert int( log.Column( "flow" ).sum() ) == sum( int( line.split( "; " )[4] ) for line in full )
+    finally:
+        shutil.rmtree( workDir, ignore_errors = True )
+
+
+
+#############################################################################################################
+## CheckSinkFailure
+#############################################################################################################
+def CheckSinkFailure():
+    """A sink that cannot write (a full disk) keeps running, counts the lines as dropped and closes in time.
+    """
+    class FullDisk_class( syr.SyrSink_class ):
+        def __init__( self ) -> None:
+            super().__init__( "full disk", maxQueue = 5, policy = "block" )
+            self.Start()
+
+        def Output( self, lines ):
+            raise OSError( 28, "No space left on device" )
+
+    sink = FullDisk_class()
+    for num in range( 50 ):
+        sink.Write( "line " + str( num ) )
+    closer = threading.Thread( target = sink.Close, daemon = True )
+    closer.start()
+    closer.join( 5.0 )
+    assert not closer.is_alive(), "Close() hangs"
+    status = sink.Status()
+    assert status[ "dropped" ] == 50 and status[ "lines" ] == 0 and status[ "errors" ] > 0, repr( status )
+
+
+
+#############################################################################################################
+## BenchChecks
+#############################################################################################################
+def BenchChecks():
+    """Run the Check...() functions; they raise AssertionError if something is wrong.
+
+    Returns: a list of tuples ( name, None if it passed, the error otherwise )
+    """
+    results = []
+    for name, check in [ ( "breaker", CheckBreaker ), ( "changeonly", CheckChangeOnly ), ( "binary", CheckBinary ),
+                         ( "sink failure", CheckSinkFailure ) ]:
+        try:
+            check()
+            results.append( ( name, None ) )
+        except AssertionError as e:
+            results.append( ( name, str( e ) or "assertion failed" ) )
+    return results
+
+
+
+#############################################################################################################
+## PrintResult
+#############################################################################################################
+def PrintResult( name, result, unit = "req/s" ):
+    """Print a single result line of a benchmark run.
+    """
+    print( "  {:<22s} {:8.1f} {:<7s} p50 {:7.2f} ms   p99 {:7.2f} ms   errors {:d}".format( name, result[0], unit, *result[1:] ) )
+
+
+
+#############################################################################################################
+## PrintUsage
+#############################################################################################################
+def PrintUsage():
+    """Prints the usage and command line options to stdout.
+    """
+    print( "Usage: SyrSafeTechBench.py [options]" )
+    print( "Options:" )
+    print( "  --help          : print this help" )
+    print( "  --only=a,b,...  : run only some of the benchmarks: " + ", ".join( BENCH_ALL ) )
+    print( "  --requests=n    : number of requests per transport run; default 300" )
+    print( "  --polls=n       : number of polls per poll, commands and logger run; default 50" )
+    print( "  --runs=n        : number of runs of --status and --showprofiles; default 5" )
+    print( "  --days=n        : days of 2s polls for the analytics benchmark; default 365" )
+    print( "  --scrapes=n     : number of scrapes of the HTTP exporter; default 1000" )
+    print( "  --latency=n     : seconds the simulator needs to answer a request; default 0.001" )
+    print( "  --jitter=n      : random extra seconds, 0..n, to answer a request; default 0" )
+    print( "  --acceptdelay=n : seconds the simulator needs to accept a new connection; default 0.005" )
+    print( "  --errorrate=n   : fraction (0..1) of requests answered with HTTP 500; default 0" )
+    print( "  --droprate=n    : fraction (0..1) of requests where the connection is just closed; default 0" )
+
+
+
+#############################################################################################################
+if __name__ == "__main__":
+
+    benchmarks = BENCH_ALL
+
+    # the real device is slow to accept connections; the defaults of the former stand-in
+    sim.SIM_LATENCY     = 0.001
+    sim.SIM_ACCEPTDELAY = 0.005
+
+    for args in sys.argv[1:]:
+        try:
+            if args == "--help" or args == "-h":
+                PrintUsage()
+                sys.exit( 0 )
+            elif "--only=" in args:
+                benchmarks = args[7:].split( "," )
+                if not set( benchmarks ) <= set( BENCH_ALL ):
+                    raise ValueError
+            elif "--requests=" in args:
+                BENCH_REQUESTS = max( 1, int( args[11:] ) )
+            elif "--polls=" in args:
+                BENCH_POLLS = max( 2, int( args[8:] ) )
+            elif "--runs=" in args:
+                BENCH_RUNS = max( 1, int( args[7:] ) )
+            elif "--days=" in args:
+                BENCH_DAYS = max( 1, int( args[7:] ) )
+            elif "--scrapes=" in args:
+                BENCH_SCRAPES = max( 1, int( args[10:] ) )
+            elif "--latency=" in args:
+                sim.SIM_LATENCY = abs( float( args[10:] ) )
+            elif "--jitter=" in args:
+                sim.SIM_JITTER = abs( float( args[9:] ) )
+            elif "--acceptdelay=" in args:
+                sim.SIM_ACCEPTDELAY = abs( float( args[14:] ) )
+            elif "--errorrate=" in args:
+                sim.SIM_ERRORRATE = min( 1.0, abs( float( args[12:] ) ) )
+            elif "--droprate=" in args:
+                sim.SIM_DROPRATE = min( 1.0, abs( float( args[11:] ) ) )
+            else:
+                raise ValueError
+        except ValueError:
+            print( "ERROR: invalid option: " + args, file=sys.stderr, flush=True )
+            PrintUsage()
+            sys.exit( 1 )
+
+    server = StartDevice()
+
+    print( "Simulator: latency " + str( sim.SIM_LATENCY ) + "s, jitter " + str( sim.SIM_JITTER ) + "s, accept delay " +
+           str( sim.SIM_ACCEPTDELAY ) + "s, error rate " + str( sim.SIM_ERRORRATE ) + ", drop rate " + str( sim.SIM_DROPRATE ) )
+
+    failed = 0
+    if "checks" in benchmarks:
+        print( "Checks: breaker, --changeonly, binary files, sinks; offline, with assertions" )
+        for name, error in BenchChecks():
+            print( "  {:<22s} {:s}".format( name, "ok" if error is None else "FAILED: " + error ) )
+            failed += error is not None
+
+    if "transport" in benchmarks:
+        print( "Transport: " + str( BENCH_REQUESTS ) + " requests" )
+        PrintResult( "new connection/request", BenchTransport( keepAlive = False ) )
+        PrintResult( "pooled keep-alive",      BenchTransport( keepAlive = True  ) )
+        PrintResult( "keep-alive, --stats",    BenchTransport( keepAlive = True, stats = True ) )
+        PrintResult( "stdlib, new connection", BenchTransport( keepAlive = False, transport = "stdlib" ) )
+        PrintResult( "stdlib, keep-alive",     BenchTransport( keepAlive = True,  transport = "stdlib" ) )
+
+    if "poll" in benchmarks:
+        print( "Poll: " + str( len( BENCH_COMMANDS ) ) + " commands per poll, " + str( syr.APP_INFLIGHT ) + " in flight" )
+        PrintResult( "sequential",             BenchPoll( parallel = False ), "polls/s" )
+        PrintResult( "parallel",               BenchPoll( parallel = True  ), "polls/s" )
+
+    if "commands" in benchmarks:
+        print( "Commands: latency per command, " + str( BENCH_POLLS ) + " requests each" )
+        for command, result in BenchCommands( BENCH_COMMANDS + [ "CEL", "CND", "PRF" ] ).items():
+            print( "  {:<5s} p50 {:7.2f} ms   p90 {:7.2f} ms   p99 {:7.2f} ms   errors {:d}".format( command, *result ) )
+
+    if "outage" in benchmarks:
+        print( "Outage: device stops answering, " + str( len( BENCH_COMMANDS ) ) + " commands per poll" )
+        print( "  first poll {:6.2f}s   following polls {:6.3f}s   back after {:6.2f}s".format( *BenchOutage( server ) ) )
+
+    if "writer" in benchmarks:
+        print( "Writer: 100 polls every 0.1s, slow disk with 20ms per flush (200ms for one in twenty); sampling jitter" )
+        for name, useWriter in [ ( "write+flush in loop", False ), ( "background writer", True ) ]:
+            print( "  {:<22s} p50 {:7.2f} ms   p99 {:7.2f} ms   max {:7.2f} ms   overruns {:d}".format( name, *BenchWriter( useWriter ) ) )
+
+    if "sinks" in benchmarks:
+        print( "Sinks: 100 polls every 0.05s, a terminal stalling 0.5s every 20 lines, the slow disk; queues of 5 items" )
+        for name, policy in [ ( "print+write in loop", None ), ( "sinks, drop", "drop" ), ( "sinks, block", "block" ) ]:
+            print( "  {:<22s} p50 {:7.2f} ms   p99 {:7.2f} ms   max {:7.2f} ms   overruns {:d}   dropped {:3d}   "
+                   "lines in log {:3d}".format( name, *BenchSinks( policy ) ) )
+
+    if "alarmwatch" in benchmarks:
+        print( "Alarm watch: polls every second, 5 alarms at random times; from the alarm to the call of a Python hook" )
+        for name, watch, hookDelay in [ ( "polls, hook in loop", None, 0.0 ), ( "polls, slow hook", None, 1.5 ),
+                                        ( "--alarmwatch=0.1", 0.1, 0.0 ), ( "--alarmwatch=0.1, slow", 0.1, 1.5 ) ]:
+            print( "  {:<24s} mean {:5.2f}s   max {:5.2f}s   polls missed {:d}".format( name, *BenchAlarmWatch( server, watch, hookDelay ) ) )
+
+    if "mqtt" in benchmarks:
+        print( "MQTT: a device that also publishes its values; alarms at random times, then the logger for 10s" )
+        if ( result := BenchMqtt() ) is None:
+            print( "  skipped; needs paho-mqtt" )
+        else:
+            print( "  alarm arrived after: mean {:5.3f}s   max {:5.3f}s".format( *result[:2] ) )
+            for name, ( lines, requests ) in zip( [ "polling, --delay=1", "--mqtt", "--mqtt --tiered" ], result[2:] ):
+                print( "  {:<22s} {:4d} lines   {:4d} requests   {:5.2f} requests/line".format( name, lines, requests, requests / max( 1, lines ) ) )
+
+    if "history" in benchmarks:
+        print( "History: 6 simulated hours, a poll every second, 10 min mean flow and volume since the valve changed, each poll" )
+        result = BenchHistory()
+        print( "  {:d} polls: parsing {:5.2f} µs/poll   ring buffer {:5.2f} µs/poll, {:8d} bytes   "
+               "list {:7.2f} µs/poll, {:8d} bytes".format( *result[:3], result[4], result[3], result[5] ) )
+
+    if "changeonly" in benchmarks:
+        print( "Change-only: one simulated day, a poll every second (86400 lines), offline; expanded again and compared,\n"
+               "  exactly for band 0, otherwise the pressure within the band (\"--pressureband\" is lossy)" )
+        for noise, band in [ ( 100, 0 ), ( 100, 200 ), ( 0, 0 ) ]:
+            print( "  pressure noise {:3d} mbar, band {:3d} mbar: full {:8d} bytes   --changeonly {:6d} lines {:8d} bytes, "
+                   "{:5.1f}x smaller   expanded {:6d} lines, {:d} mismatch(es)".format( noise, band, *BenchChangeOnly( noise, band ) ) )
+
+    if "binary" in benchmarks:
+        print( "Binary: one simulated day, a poll every second (86400 lines), converted, then the flow summed up" )
+        result = BenchBinary()
+        print( "  text {:d} bytes   binary {:d} bytes   conversion {:6.2f}s".format( *result[:3] ) )
+        print( "  sum from text {:7.1f} ms   binary/struct {:7.1f} ms   binary/numpy {}".format(
+               result[3] * 1000.0, result[4] * 1000.0, "n/a" if result[5] is None else "{:7.1f} ms".format( result[5] * 1000.0 ) ) )
+
+    if "query" in benchmarks:
+        print( "Query: one hour out of 7 simulated days, a poll every second" )
+        result = BenchQuery()
+        print( "  {:d} bytes, {:d} lines found: full scan {:7.1f} ms   creating index {:7.1f} ms   indexed {:7.1f} ms".format(
+               *result[:2], *( seconds * 1000.0 for seconds in result[2:] ) ) )
+
+    if "replay" in benchmarks:
+        print( "Replay: one simulated day, a poll every second (86400 lines), through the sinks (--replay), separate process" )
+        for args in [ [ "--nofile", "--nostdout" ], [ "--nofile" ], [], [ "--changeonly" ], [ "--nostdout", "--db=bench.db" ],
+                      [ "--alarmwatch=1" ] ]:
+            print( "  {:<30s} {:6d} records in {:6.2f}s   {:8.0f} records/s".format( " ".join( args ) or "default", *BenchReplay( args )[:3] ) )
+        result = BenchReplay( [ "--nofile", "--nostdout" ], hours = 1.0, speed = 1800 )
+        print( "  {:<30s} {:6d} records in {:6.2f}s (expected {:.2f}s)".format( "one hour, --speed=1800", *result[:2], 3600 / 1800 ) )
+
+    if "analytics" in benchmarks:
+        print( "Analytics: " + str( BENCH_DAYS ) + " simulated days, a poll every 2s, all analyses" )
+        if ( result := BenchAnalytics() ) is None:
+            print( "  skipped; needs numpy" )
+        else:
+            print( "  {:d} records   {:6.2f}s   {:6.2f} M records/s".format( result[0], result[1], result[0] / result[1] / 1e6 ) )
+
+    if "database" in benchmarks:
+        print( "Database: 3000 rows into SQLite" )
+        for name, flushLines in [ ( "commit per row, in loop", None ), ( "--db, commit per row", 1 ), ( "--db --flushlines=30", 30 ) ]:
+            print( "  {:<24s} {:8.1f} µs/row in the polling loop   {:8.0f} rows/s".format( name, *BenchDatabase( flushLines ) ) )
+
+    if "exporter" in benchmarks:
+        print( "Exporter: " + str( BENCH_SCRAPES ) + " scrapes of the HTTP exporter (--httpport), one after another" )
+        for path in [ "/metrics", "/json" ]:
+            print( "  {:<9s} {:8.1f} scrapes/s   p50 {:7.2f} ms   p99 {:7.2f} ms   device requests {:d}   {:6d} bytes".format(
+                   path, *BenchExporter( server, path ) ) )
+
+    if "logger" in benchmarks:
+        print( "Logger: main loop, " + str( BENCH_POLLS ) + " polls, --delay=0, separate process" )
+        for args in [ [], [ "--parallel" ], [ "--logall" ], [ "--logall", "--parallel" ], [ "--logall", "--tiered" ] ]:
+            print( "  {:<22s} {:7.1f} polls/s   CPU {:6.2f} ms/poll   {:5.2f} requests/poll".format(
+                   " ".join( args ) or "default", *BenchLogger( server, args ) ) )
+
+    if "status" in benchmarks or "showprofiles" in benchmarks:
+        print( "One-shot commands: " + str( BENCH_RUNS ) + " runs each, separate process, including startup" )
+        for name in [ "status", "showprofiles" ]:
+            if name in benchmarks:
+                print( "  {:<22s} p50 {:7.1f} ms   p99 {:7.1f} ms   CPU {:6.1f} ms/run   {:5.1f} requests/run".format(
+                       "--" + name, *BenchCommand( server, [ "--" + name ] ) ) )
+
+    if "startup" in benchmarks:
+        print( "Startup: one-shot commands, " + str( BENCH_RUNS ) + " runs each, separate process; wall time" )
+        print( "  {:<40s} p50 {:7.1f} ms   p99 {:7.1f} ms".format( "python -c pass", *BenchStartup( server, None )[:2] ) )
+        runs = [ ( [ "--alarmcodes" ], False ), ( [ "--alarmcodes" ], True ) ]
+        for command in [ "--henlo", "--profile", "--status" ]:
+            runs += [ ( [ command, "--transport=requests" ], False ), ( [ command ], False ), ( [ command ], True ) ]
+        for args, module in runs:
+            print( "  {:<40s} p50 {:7.1f} ms   p99 {:7.1f} ms   {:5.1f} requests/run".format(
+                   ( "-m SyrSafeTechLogger " if module else "" ) + " ".join( args ), *BenchStartup( server, args, module ) ) )
+
+    if "devices" in benchmarks:
+        print( "Devices: one process, 1s period per device, 6s each run" )
+        for numDevices, numHanging in [ ( 1, 0 ), ( 10, 0 ), ( 25, 0 ), ( 50, 0 ), ( 50, 5 ) ]:
+            print( "  {:3d} devices, {:d} hanging:  {:7.1f} polls/s (target {:7.1f}), slowest device {:5.1f}%, "
+                   "CPU {:5.2f} ms/poll".format( numDevices, numHanging, *BenchDevices( numDevices, numHanging ) ) )
+
+    server.shutdown()
+    sys.exit( 1 if failed else 0 )
@@ -13,15 +13,53 @@
 
 import sys
 import time
+import math
 import re
+import os
+import json
+import random
+import atexit
+import signal
+import queue
+import bisect
+import glob
+import array
+import struct
+import importlib
+import importlib.util
 import datetime
-import requests
+import threading
+
+# requests, http.client, http.server, asyncio, concurrent.futures and subprocess take long to import,
+# longer than most one-shot commands need to run; they are imported where they are used, only then.
+# So are sqlite3 ("--db"), gzip, lzma and shutil, which imports lzma (compressed log files), and mmap (binary log files).
 
 
 #############################################################################################################
 SYR_IPADDR = "0.0.0.0"             # IP address of Syr (set by command line option "--ipaddr=addr")
 SYR_UNITS  = "metric"              # unused yet; only metric so far (°C, bar, Liter)
 SYR_DELAY  = 2                     # delay between a set of requests in seconds
+SYR_PORT   = 5333                  # TCP port of the Syr's REST API
+
+SYR_CACHE_TTL  = 3600             # seconds configuration values (profiles, buzzer, ...) are cached ("--cachettl=n")
+SYR_CACHE_FILE = None              # file to keep the cached configuration between runs ("--cachefile=path")
+
+SYR_KEEPALIVE = True               # reuse pooled keep-alive connections (disable with "--nokeepalive")
+SYR_POOLSIZE  = 10                 # max. number of pooled connections per device
+SYR_POOLDEVICES = 1                # number of devices to keep connection pools for
+SYR_TRANSPORT = None               # "requests", "stdlib" (http.client); None = stdlib for one-shot commands ("--transport=...")
+
+SYR_TIMEOUT_MIN   = 1.0            # adaptive timeouts never go below this, in seconds
+SYR_TIMEOUT_MAX   = 5.0            # ... and never above this; also the timeout before the first answer ("--timeout=n")
+SYR_RETRIES       = 2              # max. number of retries of a single "get" request
+SYR_RETRY_RATIO   = 0.1            # retries may add at most 10% to the number of requests (retry budget)
+SYR_RETRY_BACKOFF = 0.1            # seconds; the n-th retry waits a random time of 0..SYR_RETRY_BACKOFF * 2^n
+SYR_BREAKER_FAILURES    = 3        # failed requests in a row until a device is considered to be down
+SYR_BREAKER_COOLDOWN    = 2.0      # seconds until a device that is down is probed again; doubled after each failed probe
+SYR_BREAKER_MAXCOOLDOWN = 30.0     # ... up to this
+
+SYR_STATS_BUCKETS = [ 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000 ]   # latency histogram; upper bounds in ms
+SYR_STATS_RESULTS = [ "ok", "timeout", "connection", "http", "json", "error" ]  # outcomes of a request, see SyrStats_class
 
 #############################################################################################################
 SYR_CMD_SHUTOFF          = "AB"         # valve state; 1 = opened, 2 = closed (according to the manual; but that's wrong, as it seems)
@@ -63,6 +101,30 @@ SYR_CMD_RTC              = "RTC"        # linux epoch time; 0-4294967295
 SYR_CMD_ADMIN            = "ADM"        # service = "(1)", admin = "(2)f"; reset with "clr" instead of "set" (".../clr/ADM")
 
 
+# configuration values that rarely change and may be cached for SYR_CACHE_TTL seconds; see SyrConfigCache_class
+SYR_CACHE_PROFILE_X = re.compile( r"^(PA|PN|PV|PT|PF|PM|PR|PB|PW)[1-8]$" )
+SYR_CACHE_COMMANDS  = [ SYR_CMD_PROFILENUMS, SYR_CMD_BUZZER, SYR_CMD_CONDUCT_LIMIT, SYR_CMD_CONDUCT_FACTOR,
+                        SYR_CMD_LEAKAGE_WARNING, SYR_CMD_FLOOR_SENSOR, SYR_CMD_LANGUAGE, SYR_CMD_UNITS ]
+
+# writing one of these changes more than just its own value
+SYR_CACHE_RELATED   = {
+    SYR_CMD_PROFILE_X_AVAIL : [ SYR_CMD_PROFILENUMS ]     # enabling/disabling a profile changes the number of profiles
+}
+
+# seconds between two reads of a field with "--tiered"; 0 = every poll, fields not listed here are read every poll, too
+SYR_POLL_INTERVALS = {
+    SYR_CMD_FLOW         : 0,           # fast; these tell when something happens
+    SYR_CMD_VOLUME       : 0,
+    SYR_CMD_VALVE        : 0,
+    SYR_CMD_ALARM        : 0,
+    SYR_CMD_PRESSURE     : 10,          # slow; changes rather slowly
+    SYR_CMD_TEMP         : 10,
+    SYR_CMD_CONDUCTIVITY : 10,
+    SYR_CMD_PROFILE      : 60,          # rare; changes only if somebody does something
+    SYR_CMD_VOLUME_LAST  : 60           # also re-read right after a water consumption ended
+}
+
+
 SYR_ERROR_STRING    = "ERROR"      # error string to be returned if something went wrong; maybe "-1" would be better?
 
 SYR_UNITS_REPL      = [ " mbar", "mL", "Vol[L]" ]  # for text/data replacement; imperial yet unknown; my device always puts out " mbar"
@@ -113,6 +175,57 @@ APP_RAW              = False        # by default, everything is printed in a hum
 APP_LOGCONDUCTIVITY  = False        # by default, conductivity is not logged
 APP_LOGTEMPERATURE   = False        # by default, temperature is not logged
 APP_LOGPROFILE       = False        # by default, the currently activated profile is not logged
+APP_PARALLEL         = False        # by default, the commands of a poll are sent one after another
+APP_INFLIGHT         = 4            # max. number of requests in flight at once, if APP_PARALLEL is set
+APP_FIXEDRATE        = True         # by default, polls start at a fixed rate of SYR_DELAY, no matter how long they take
+APP_IDLEDELAY        = None         # if set, poll every APP_IDLEDELAY seconds while nothing happens ("--idledelay=n")
+APP_IDLEHOLD         = 30           # seconds without any activity before switching to APP_IDLEDELAY
+APP_REFRESH          = False        # by default, cached configuration values are used; see SyrConfigCache_class
+APP_DEVICES          = []           # all IP addresses given by "--ipaddr=addr"; more than one = multi-device logging
+APP_DEVICEFILE       = None         # file with a list of devices to be logged ("--devices=file"); see LoadDeviceList()
+APP_JSON             = False        # by default, "--status", "--showprofiles", ... print human readable text
+APP_TIERED           = False        # by default, all fields are read in every poll; see SYR_POLL_INTERVALS
+APP_FLUSHLINES       = 1            # flush the log file after this many lines ("--flushlines=n")
+APP_FLUSHSECS        = None         # if set, flush the log file at least every n seconds ("--flushsecs=n")
+APP_FSYNC            = False        # if set, also fsync() the log file after each flush ("--fsync")
+APP_ROTATESIZE       = None         # if set, start a new log file when it reaches this many bytes ("--rotatesize=n")
+APP_ROTATEDAILY      = False        # if set, start a new log file at midnight ("--rotatedaily")
+APP_COMPRESS         = "gz"         # compression of rotated log files: "gz", "xz" or None ("--compress=...")
+APP_KEEP             = None         # if set, keep only this many rotated log files ("--keep=n")
+APP_KEEPDAYS         = None         # if set, delete rotated log files older than this many days ("--keepdays=n")
+APP_WRITERQUEUE      = 10000        # max. number of items waiting in each sink's queue, e.g. for a slow disk ("--sinkqueue=n")
+APP_ALARMWATCH       = None         # if set, read alarm and valve every n seconds, apart from the polls ("--alarmwatch=n")
+APP_HOOKS            = []           # run on each alarm or valve change, see MakeHook() ("--onalarm=action", more than once)
+APP_HOOKWORKERS      = 4            # max. number of hooks running at once
+APP_HOOKTIMEOUT      = 60           # seconds a shell command hook may take
+APP_MQTT             = None         # if set, MQTT broker "host[:port]" the device publishes to; see SyrMqttSource_class ("--mqtt=...")
+APP_MQTTTOPIC        = "safetec/#"  # topic filter of the device's messages ("--mqtttopic=filter")
+APP_HISTORY          = 1            # hours of polls kept in memory per device, for live statistics; 0 = none ("--history=n")
+APP_SINKPOLICY       = None         # what a sink does if its queue is full: "drop" or "block" the sampler; None = "drop",
+                                    # "block" for "--replay" ("--sinkpolicy=...")
+APP_STOP             = False        # set by SIGTERM or SIGINT (CTRL-C); see StopHandler()
+APP_CHANGEONLY       = False        # if set, only write a line to the log file if a value changed ("--changeonly")
+APP_HEARTBEAT        = 300          # with APP_CHANGEONLY, write a line at least every n seconds ("--heartbeat=n")
+APP_PRESSUREBAND     = 0            # with APP_CHANGEONLY, mbar the pressure may differ and still count as unchanged; lossy ("--pressureband=n")
+APP_EXPANDFILE       = None         # if set, print the expanded "--changeonly" log file and quit ("--expand=file")
+APP_CONVERTFILES     = []           # text log files to be converted into binary ones ("--convert=file", more than once)
+APP_QUERYFILES       = []           # log files to be searched ("--query=file", more than once, wildcards allowed)
+APP_QUERYFROM        = None         # epoch seconds; only lines from this time on ("--from=time")
+APP_QUERYTO          = None         # epoch seconds; only lines before this time ("--to=time")
+APP_QUERYALARMS      = None         # list of alarm codes; only lines with one of these ("--alarm=A3,A4" or "--alarm=any")
+APP_QUERYVALVES      = None         # list of valve states; only lines with one of these ("--valve=10,11")
+APP_QUERYMINFLOW     = None         # L/h; only lines with at least this flow ("--minflow=n")
+APP_DBFILE           = None         # if set, also write all polls into this SQLite database ("--db=path")
+APP_DBIMPORTS        = []           # log files to be imported into the database ("--dbimport=file", more than once)
+APP_SERIAL           = "unknown"    # serial number for imported or replayed log files ("--serial=s")
+APP_REPLAYFILES      = []           # log files to be replayed through the sinks ("--replay=file", more than once, wildcards allowed)
+APP_REPLAYSPEED      = 0            # pace of "--replay": 1 = real time, n = n times faster, 0 = as fast as possible ("--speed=n")
+APP_CSV              = False        # if set, print the results of "--query" as CSV ("--csv")
+APP_STATS            = False        # if set, print request statistics on exit ("--stats")
+APP_STATSINTERVAL    = None         # if set, write a "# STATS" line to the log every n seconds ("--statsinterval=n")
+APP_STATSFILE        = None         # if set, dump the request statistics as JSON to this file ("--statsfile=path")
+APP_HTTPPORT         = None         # if set, serve the latest values and statistics via HTTP on this port ("--httpport=n")
+APP_HTTPHOST         = "127.0.0.1"  # address the HTTP exporter listens on ("--httphost=addr")
 
 APP_CMD_HENLO        = 1            # typos and enums sock
 APP_CMD_STATUS       = 2
@@ -185,6 +298,19 @@ class SyrProfile_class:
         self.leakagewarning = 0
 
 
+# the settings of a profile, as CollectProfileX() returns them and "--json" prints them; key -> command (+ 1..8)
+SYR_PROFILE_FIELDS = {
+    "name"          : SYR_CMD_PROFILE_X_NAME,
+    "volume"        : SYR_CMD_PROFILE_X_VOL,        # L
+    "time"          : SYR_CMD_PROFILE_X_TIME,       # s
+    "flow"          : SYR_CMD_PROFILE_X_FLOW,       # L/h
+    "microleakage"  : SYR_CMD_PROFILE_X_MLEAK,      # "1" = on
+    "returntime"    : SYR_CMD_PROFILE_X_RTIME,      # h; "0" = never
+    "buzzer"        : SYR_CMD_PROFILE_X_BUZZ,       # "1" = on
+    "leakagewarning": SYR_CMD_PROFILE_X_LEAKW       # "1" = on
+}
+
+
 
 
 
@@ -210,12 +336,56 @@ def PrintUsage():
     print( "Usage: SyrSafeTechLogger.py [options]" )
     print( "Options:" )
     print( "  --help          : print this help" )
-    print( "  --ipaddr=addr   : set the IP address of the Syr SafeTech Connect device" )
+    print( "  --ipaddr=addr   : set the IP address of the Syr SafeTech Connect device; optionally with \":port\"" )
+    print( "                    can be given more than once, to log several devices from a single process" )
+    print( "  --devices=file  : log all devices listed in file; one \"ipaddr[:port] [delay] [logfile]\" per line" )
     print( "  --henlo         : test presence of the device, print serial number, SW version and then quit" )
     print( "  --nofile        : do not write to a file" )
     print( "  --nostdout      : do not print to stdout (useful when used with nohup)" )
     print( "  --maxpolls=n    : stop after n polls" )
     print( "  --delay=n       : delay between set of polls in seconds; floating point allowed, e.g. --delay=1.5" )
+    print( "  --nofixedrate   : sleep --delay seconds after each poll, instead of polling at a fixed rate" )
+    print( "  --json          : print the output of --henlo, --status, --showprofiles and --showprofile as JSON" )
+    print( "  --cachettl=n    : cache configuration values (profiles, buzzer, ...) for n seconds; default 3600, 0 = off" )
+    print( "  --cachefile=path: keep cached configuration values in a file, between runs" )
+    print( "  --refresh       : ignore cached configuration values and read them again" )
+    print( "  --tiered        : read slowly changing fields (pressure, temperature, ...) less often; cached in between" )
+    print( "  --idledelay=n   : poll only every n seconds while the water is not flowing and nothing happens;" )
+    print( "                    switches back to --delay as soon as water flows, the valve moves or an alarm is on" )
+    print( "  --flushlines=n  : flush the log file after n lines; default 1; alarms are always flushed right away" )
+    print( "  --flushsecs=n   : flush the log file at least every n seconds, no matter how many lines" )
+    print( "  --fsync         : also force the log file to disk (fsync) after each flush; for SD cards and power cuts" )
+    print( "  --rotatesize=n  : start a new log file when the current one reaches n bytes; e.g. 10M, 500k" )
+    print( "  --rotatedaily   : start a new log file every day, at midnight" )
+    print( "  --compress=m    : compress old log files after rotation with m = gz (default), xz or none" )
+    print( "  --keep=n        : keep only the n newest old log files; older ones are deleted" )
+    print( "  --keepdays=n    : delete old log files older than n days" )
+    print( "  --history=n     : keep the polls of the last n hours in memory, for live statistics; default 1, 0 = off" )
+    print( "  --sinkqueue=n   : max. number of lines waiting for stdout, the log file or --db each; default 10000" )
+    print( "  --sinkpolicy=p  : if one of them is full, \"drop\" new lines (default) or \"block\" polling until there is room" )
+    print( "  --changeonly    : write a line to the log file only if a value changed; \"# RUN\" lines tell the rest" )
+    print( "  --heartbeat=n   : with --changeonly, write a line at least every n seconds; default 300" )
+    print( "  --pressureband=n: with --changeonly, pressure changes of up to n mbar do not count as a change;" )
+    print( "                    lossy: --expand then repeats a run's first pressure; default 0 = exact" )
+    print( "  --expand=file   : print a --changeonly log file with all polls, one line each, then quit; needs no device" )
+    print( "  --convert=file  : convert a log file into a compact binary one (file.bin), then quit; needs no device;" )
+    print( "                    can be given more than once; add --logcond, --logtemp, ... if the file has these columns" )
+    print( "  --query=file    : print the lines of log files matching --from, --to, --alarm, --valve and --minflow," )
+    print( "                    then quit; needs no device; can be given more than once; wildcards allowed, e.g. \"*.log*\"" )
+    print( "  --from=time     : with --query, lines from this time on; e.g. \"2026-10-26 02:00\" or \"2026-10-26\"" )
+    print( "  --to=time       : with --query, lines before this time" )
+    print( "  --alarm=codes   : with --query, lines with one of these alarms, e.g. \"A3,A4\"; \"any\" = all but FF" )
+    print( "  --valve=states  : with --query, lines with one of these valve states, e.g. \"10,11\"" )
+    print( "  --minflow=n     : with --query, lines with a flow of at least n L/h" )
+    print( "  --csv           : with --query, print CSV instead of log file lines; --json prints JSON" )
+    print( "  --db=path       : also write all polls into a SQLite database; all devices, all runs" )
+    print( "  --dbimport=file : import log files into the --db database, then quit; needs no device;" )
+    print( "                    can be given more than once; wildcards allowed" )
+    print( "  --serial=s      : with --dbimport or --replay, the serial number of the device the log files are from" )
+    print( "  --replay=file   : feed log files through stdout, the log file, --db, --httpport and --onalarm as if they" )
+    print( "                    were polled, then quit and print the records/s; needs no device; can be given more" )
+    print( "                    than once; wildcards allowed; --sinkpolicy is \"block\" by default, nothing is dropped" )
+    print( "  --speed=n       : with --replay, 1 = real time, n = n times faster; default 0 = as fast as possible" )
     print( "  --raw           : print raw data; units 'mbar', 'mL', etc. are not removed" )
     print( "  --status        : print the current status and settings of the Syr, then quit" )
     print( "  --profile       : print name and number of active profile, then quit" )
@@ -228,6 +398,28 @@ def PrintUsage():
     print( "  --logtemp       : measure and log temperature too, off by default" )
     print( "  --logprofile    : log currently activated profile" )
     print( "  --logall        : log all optional log options: conductivity, temperature, profile" )
+    print( "  --timeout=n     : max. seconds to wait for an answer; default 5; timeouts adapt to the device's latency," )
+    print( "                    within 1..n seconds; a device that does not answer at all is only probed now and then" )
+    print( "  --nokeepalive   : open a new connection for each request, instead of reusing pooled ones" )
+    print( "  --transport=t   : \"requests\" or \"stdlib\" (http.client, much faster to start); by default, stdlib" )
+    print( "                    for one-shot commands like --henlo or --status and requests for logging" )
+    print( "  --parallel      : send all requests of a poll at once, instead of one after another" )
+    print( "  --inflight=n    : max. number of parallel requests with --parallel; default 4" )
+    print( "  --stats         : print request statistics (latencies, timeouts, errors per command) on exit, to stderr" )
+    print( "  --statsinterval=n: write a \"# STATS\" line with request statistics to the log every n seconds" )
+    print( "  --statsfile=path: write the request statistics as JSON to a file; on exit and every --statsinterval" )
+    print( "  --httpport=n    : serve the latest values, poll counters and request statistics via HTTP on port n;" )
+    print( "                    \"/metrics\" for Prometheus, \"/json\" as JSON; scrapes do not cause any requests to the device" )
+    print( "  --httphost=addr : address the --httpport server listens on; default 127.0.0.1, 0.0.0.0 = all" )
+    print( "  --alarmwatch=n  : read alarm and valve state every n seconds, apart from the other values; changes are" )
+    print( "                    logged right away, with the time it took to detect them" )
+    print( "  --onalarm=action: run this on each alarm or valve change, in the background; more than once is fine;" )
+    print( "                    a shell command (SYR_KIND, SYR_OLD, SYR_NEW, ... in its environment), an http(s) URL" )
+    print( "                    to POST the change to as JSON, or py:module:function; implies --alarmwatch=0.5" )
+    print( "  --mqtt=host[:port]: take the values the device publishes to this MQTT broker (port 1883 by default)," )
+    print( "                    as soon as they arrive; only the others are polled; needs paho-mqtt; --delay is then" )
+    print( "                    the period of the polls, while lines are written as often as values arrive" )
+    print( "  --mqtttopic=filter: topics of the device's messages; default safetec/#" )
 
 
 
@@ -246,24 +438,872 @@ def CheckIPv4( ipaddr ):
     return bool( pattern.match(ipaddr) )
 
 
+#############################################################################################################
+## CheckDeviceAddr
+#############################################################################################################
+def CheckDeviceAddr( addr ):
+    """Check if a string contains a valid IPv4 address, optionally followed by ":port".
+
+    addr: e.g. "192.168.1.123" or "192.168.1.123:5333"
+
+    Returns: True if valid, False if not
+    """
+    ipaddr, _, port = addr.partition( ":" )
+    if port and ( not port.isdigit() or not 0 < int( port ) < 65536 ):
+        return False
+    return CheckIPv4( ipaddr )
+
+
+#############################################################################################################
+## RemoveUnits
+#############################################################################################################
+def RemoveUnits( strData ):
+    """Remove the units the Syr appends to some values, e.g. "100 mbar" -> "100", "4507mL" -> "4507".
+
+    strData: raw value (or several, joined) as string
+
+    Returns: the string without units
+    """
+    for strReplace in SYR_UNITS_REPL:
+        strData = strData.replace( strReplace, "" )
+    return strData
+
+
+#############################################################################################################
+## RawToInt
+#############################################################################################################
+def RawToInt( strData ):
+    """Convert a raw value from the Syr to an integer, units removed.
+
+    strData: raw value as string, e.g. "4507mL"
+
+    Returns: the value as integer or None if it is not a number (e.g. "ERROR")
+    """
+    try:
+        return int( RemoveUnits( strData ) )
+    except ( ValueError, TypeError ):
+        return None
+
+
+#############################################################################################################
+## ParseSize
+#############################################################################################################
+def ParseSize( strData ):
+    """Convert a size to a number of bytes.
+
+    strData: e.g. "1000", "64k", "10M" or "1G"
+
+    Returns: the size as integer; raises ValueError if it's not a size
+    """
+    factor = { "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3 }.get( strData[-1:].upper(), 1 )
+    if factor > 1:
+        strData = strData[:-1]
+    return int( float( strData ) * factor )
+
+
+#############################################################################################################
+## SyrConfigCache_class
+#############################################################################################################
+class SyrConfigCache_class:
+    # Time-to-live cache for configuration values, e.g. the profile settings.
+    # "--showprofiles" alone reads 70+ of them, and they hardly ever change.
+    # Values written by SetDataRaw() or ClrDataRaw() are dropped right away.
+    def __init__( self, ttl = SYR_CACHE_TTL, fileName = None ) -> None:
+        self.ttl      = ttl
+        self.fileName = fileName
+        self.refresh  = False           # if True, never answer from the cache, but still fill it ("--refresh")
+        self.entries  = {}              # ipaddr -> { command -> [ value, expiry time (epoch) ] }
+        self.hits     = 0
+        self.misses   = 0
+        self.lock     = threading.Lock()
+        if fileName is not None:
+            self.Load()
+
+    @staticmethod
+    def IsCacheable( command ):
+        """Returns: True if the command reads a configuration value that may be cached
+        """
+        return command in SYR_CACHE_COMMANDS or bool( SYR_CACHE_PROFILE_X.match( command ) )
+
+    def Get( self, ipaddr, command ):
+        """Returns: the cached raw value or None if there is none or it expired
+        """
+        with self.lock:
+            entry = self.entries.get( ipaddr, {} ).get( command )
+            if self.refresh or entry is None or entry[1] < time.time():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def Put( self, ipaddr, command, value ):
+        """Store a raw value; errors are never cached.
+        """
+        if value == SYR_ERROR_STRING:
+            return
+        with self.lock:
+            self.entries.setdefault( ipaddr, {} )[ command ] = [ value, time.time() + self.ttl ]
+
+    def Invalidate( self, ipaddr, command ):
+        """Drop a value (and the ones depending on it), e.g. after it was written.
+        """
+        related = SYR_CACHE_RELATED.get( command, [] )
+        if SYR_CACHE_PROFILE_X.match( command ):
+            related = related + SYR_CACHE_RELATED.get( command[:2], [] )
+        with self.lock:
+            device = self.entries.get( ipaddr, {} )
+            for cmd in [ command ] + related:
+                device.pop( cmd, None )
+
+    def Load( self ):
+        """Read the cache file; expired entries are skipped. A missing or broken file is no problem.
+        """
+        try:
+            with open( self.fileName, "rt" ) as fin:
+                entries = json.load( fin )
+        except ( OSError, ValueError ):
+            return
+        now = time.time()
+        with self.lock:
+            self.entries = { ipaddr: { cmd: entry for cmd, entry in device.items() if entry[1] >= now }
+                             for ipaddr, device in entries.items() }
+
+    def Save( self ):
+        """Write the cache to its file, if there is one.
+        """
+        if self.fileName is None:
+            return
+        with self.lock:
+            try:
+                with open( self.fileName + ".tmp", "wt" ) as fout:
+                    json.dump( self.entries, fout )
+                os.replace( self.fileName + ".tmp", self.fileName )
+            except OSError as e:
+                print( "ERROR: cannot write cache file: " + str( e ), file=sys.stderr, flush=True )
+
+
+_syrConfigCache = SyrConfigCache_class()
+
+
+#############################################################################################################
+## SyrStats_class
+#############################################################################################################
+class SyrStats_class:
+    # Per-command request statistics: a latency histogram, the outcomes and the last error.
+    # Only counters, no samples; cheap enough for every single request.
+    # Outcomes (SYR_STATS_RESULTS):
+    #   ok         - answered with valid JSON
+    #   timeout    - no answer in time
+    #   connection - refused, reset, unreachable, ...
+    #   http       - answered with an HTTP status other than 200, e.g. 404 for unknown commands
+    #   json       - answered, but not with valid JSON
+    #   error      - anything else
+    # Values answered from the configuration cache are only counted as "cached", requests that were not sent
+    # because the device is down (see SyrLink_class) as "skipped"; "retries" counts the retries of requests.
+    def __init__( self ) -> None:
+        self.enabled = False            # nothing is recorded unless set ("--stats", "--statsinterval", "--statsfile")
+        self.started = time.time()
+        self.entries = {}               # ipaddr -> { command -> entry, see NewEntry() }
+        self.lock    = threading.Lock()
+
+    @staticmethod
+    def NewEntry():
+        entry = { result: 0 for result in SYR_STATS_RESULTS }
+        entry.update( { "requests": 0, "cached": 0, "skipped": 0, "retries": 0, "histogram": [ 0 ] * ( len( SYR_STATS_BUCKETS ) + 1 ),
+                        "sum": 0.0, "max": 0.0, "lastError": None, "lastErrorTime": None } )
+        return entry
+
+    @staticmethod
+    def ResultOf( exception ):
+        """Returns: the outcome for an exception raised by SyrRequest()
+        """
+        # only there if the requests transport was used
+        if ( requests := sys.modules.get( "requests" ) ) is not None:
+            if isinstance( exception, requests.Timeout ):
+                return "timeout"
+            if isinstance( exception, requests.ConnectionError ):
+                return "connection"
+            if isinstance( exception, requests.RequestException ):
+                return "error"
+        # the stdlib transport; see SyrRequestStdlib()
+        if isinstance( exception, TimeoutError ):
+            return "timeout"
+        if isinstance( exception, OSError ) or type( exception ).__module__ == "http.client":
+            return "connection"
+        return "error"
+
+    @staticmethod
+    def ErrorOf( exception ):
+        """Returns: a short description of an exception, e.g. "ConnectionError: [Errno 111] Connection refused"
+        """
+        text = str( exception )
+        if ( reason := re.search( r"\[Errno -?\d+\][^'\")]*", text ) ) is not None:
+            text = reason.group( 0 )
+        return type( exception ).__name__ + ": " + text[:80]
+
+    @staticmethod
+    def Percentile( histogram, maxLatency, pct ):
+        """Returns: the 'pct' percentile (0..100) of a histogram, in ms; the upper bound of its bucket
+        """
+        count = sum( histogram )
+        if count == 0:
+            return 0.0
+        rank = max( 1, math.ceil( pct / 100.0 * count ) )
+        for num, bucket in enumerate( histogram ):
+            rank -= bucket
+            if rank <= 0:
+                return min( SYR_STATS_BUCKETS[num], maxLatency ) if num < len( SYR_STATS_BUCKETS ) else maxLatency
+        return maxLatency
+
+    def Record( self, ipaddr, command, result, seconds, error = None ):
+        """Count a request and its latency; 'error' is a short description of what went wrong.
+        """
+        if not self.enabled:
+            return
+        ms = seconds * 1000.0
+        with self.lock:
+            device = self.entries.setdefault( ipaddr, {} )
+            if ( entry := device.get( command ) ) is None:
+                entry = device[ command ] = self.NewEntry()
+            entry[ "requests" ] += 1
+            entry[ result ]     += 1
+            entry[ "histogram" ][ bisect.bisect_left( SYR_STATS_BUCKETS, ms ) ] += 1
+            entry[ "sum" ]      += ms
+            if ms > entry[ "max" ]:
+                entry[ "max" ] = ms
+            if error is not None:
+                entry[ "lastError" ]     = error
+                entry[ "lastErrorTime" ] = time.time()
+
+    def Count( self, ipaddr, command, counter ):
+        """Count something without a latency: a value answered from the cache ("cached"), a request not sent
+        ("skipped") or a retry ("retries").
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            device = self.entries.setdefault( ipaddr, {} )
+            if ( entry := device.get( command ) ) is None:
+                entry = device[ command ] = self.NewEntry()
+            entry[ counter ] += 1
+
+    def Total( self, ipaddr = None ):
+        """Returns: all commands of a device (or of all devices, if None) added up into a single entry
+        """
+        total = self.NewEntry()
+        with self.lock:
+            for addr, device in self.entries.items():
+                if ipaddr is not None and addr != ipaddr:
+                    continue
+                for entry in device.values():
+                    for key in SYR_STATS_RESULTS + [ "requests", "cached", "skipped", "retries", "sum" ]:
+                        total[ key ] += entry[ key ]
+                    total[ "histogram" ] = [ a + b for a, b in zip( total[ "histogram" ], entry[ "histogram" ] ) ]
+                    total[ "max" ] = max( total[ "max" ], entry[ "max" ] )
+                    if entry[ "lastError" ] is not None and ( total[ "lastErrorTime" ] or 0 ) < entry[ "lastErrorTime" ]:
+                        total[ "lastError" ]     = entry[ "lastError" ]
+                        total[ "lastErrorTime" ] = entry[ "lastErrorTime" ]
+        return total
+
+    def Line( self, ipaddr = None ):
+        """Returns: a single "# STATS ..." line for the log file; counts since the start
+        """
+        total = self.Total( ipaddr )
+        line  = "# STATS " + time.asctime() + "; requests " + str( total[ "requests" ] )
+        for result in SYR_STATS_RESULTS + [ "cached", "skipped", "retries" ]:
+            line += "; " + result + " " + str( total[ result ] )
+        for pct in [ 50, 90, 99 ]:
+            line += "; p" + str( pct ) + " " + "{:.0f}ms".format( self.Percentile( total[ "histogram" ], total[ "max" ], pct ) )
+        return line + "; max " + "{:.1f}ms".format( total[ "max" ] )
+
+    def Snapshot( self ):
+        """Returns: everything as a JSON serializable dictionary, with percentiles and mean latency per command
+        """
+        with self.lock:
+            devices = json.loads( json.dumps( self.entries ) )
+        for device in devices.values():
+            for entry in device.values():
+                for pct in [ 50, 90, 99 ]:
+                    entry[ "p" + str( pct ) ] = self.Percentile( entry[ "histogram" ], entry[ "max" ], pct )
+                entry[ "mean" ] = entry[ "sum" ] / entry[ "requests" ] if entry[ "requests" ] else 0.0
+        return { "started": self.started, "seconds": time.time() - self.started, "buckets": SYR_STATS_BUCKETS,
+                 "devices": devices }
+
+    def Save( self, fileName ):
+        """Dump Snapshot() as JSON into a file.
+        """
+        try:
+            with open( fileName + ".tmp", "wt" ) as fout:
+                json.dump( self.Snapshot(), fout, indent = 2 )
+            os.replace( fileName + ".tmp", fileName )
+        except OSError as e:
+            print( "ERROR: cannot write stats file: " + str( e ), file=sys.stderr, flush=True )
+
+    def Print( self, file = sys.stderr ):
+        """Print a summary table, one line per command; latencies in ms.
+        """
+        snapshot = self.Snapshot()
+        print( "Request statistics, " + "{:.1f}".format( snapshot[ "seconds" ] ) + "s:", file=file )
+        for ipaddr, device in snapshot[ "devices" ].items():
+            print( "  " + ipaddr, file=file )
+            print( "    command  requests      ok timeout  conn  http  json error cached skipped retries    p50    p90    p99    max",
+                   file=file )
+            for command, e in sorted( device.items() ):
+                print( "    {:<8s} {:8d} {:7d} {:7d} {:5d} {:5d} {:5d} {:5d} {:6d} {:7d} {:7d} {:6.0f} {:6.0f} {:6.0f} {:6.1f}".format(
+                       command, e[ "requests" ], e[ "ok" ], e[ "timeout" ], e[ "connection" ], e[ "http" ], e[ "json" ],
+                       e[ "error" ], e[ "cached" ], e[ "skipped" ], e[ "retries" ], e[ "p50" ], e[ "p90" ], e[ "p99" ], e[ "max" ] ),
+                       file=file )
+            for command, e in sorted( device.items() ):
+                if e[ "lastError" ] is not None:
+                    print( "    last error " + command + ", " + time.asctime( time.localtime( e[ "lastErrorTime" ] ) ) + ": " + e[ "lastError" ], file=file )
+        file.flush()
+
+
+_syrStats = SyrStats_class()
+
+
+#############################################################################################################
+## SyrMetrics_class
+#############################################################################################################
+SYR_METRICS = [    # command, metric, factor, help; the values of a poll for "--httpport"
+    ( SYR_CMD_VALVE,        "syr_valve_state",                      1,   "valve state; 10 = closed, 11 = closing, 20 = open, 21 = opening, 30 = undefined" ),
+    ( SYR_CMD_PRESSURE,     "syr_pressure_mbar",                    1,   "water pressure in mbar" ),
+    ( SYR_CMD_FLOW,         "syr_flow_liters_per_hour",             1,   "flow in L/h" ),
+    ( SYR_CMD_VOLUME,       "syr_volume_milliliters",               1,   "volume of the current, single water consumption, in mL" ),
+    ( SYR_CMD_VOLUME_LAST,  "syr_last_volume_liters",               1,   "volume of the last, single water consumption, in L" ),
+    ( SYR_CMD_CONDUCTIVITY, "syr_conductivity_microsiemens_per_cm", 1,   "conductivity in uS/cm" ),
+    ( SYR_CMD_TEMP,         "syr_temperature_celsius",              0.1, "water temperature in degrees Celsius" ),
+    ( SYR_CMD_PROFILE,      "syr_profile",                          1,   "number of the active profile" ) ]
+
+class SyrMetrics_class:
+    # The latest poll of each device, for the HTTP exporter ("--httpport"). The exporter only reads this and
+    # _syrStats, so any number of scrapes cost zero requests to the device; the loggers call Update() after each poll.
+    def __init__( self ) -> None:
+        self.started = time.time()
+        self.devices = {}               # ipaddr -> { "data", "time", "polls", "failed", "up", "serial", "version" }
+        self.scrapes = 0
+        self.lock    = threading.Lock()
+
+    def Update( self, ipaddr, data, polls, failed, up, serial = None, version = None ):
+        """Store a poll; 'data' are its raw values, 'up' is False if the device did not answer at all.
+        The values and their time are only replaced by polls with an answer, so a scrape during an outage
+        still shows the last known ones, with a growing age.
+        """
+        with self.lock:
+            device = self.devices.setdefault( ipaddr, { "data": {}, "time": None, "serial": None, "version": None } )
+            if up:
+                device[ "data" ] = dict( data )
+                device[ "time" ] = time.time()
+            device.update( { "polls": polls, "failed": failed, "up": up } )
+            if serial is not None:
+                device[ "serial" ] = serial
+            if version is not None:
+                device[ "version" ] = version
+
+    def Snapshot( self ):
+        """Returns: all devices as a JSON serializable dictionary, with the values as numbers (None if not
+        answered), the sample's age in seconds and the request statistics per command, if enabled
+        """
+        now   = time.time()
+        stats = _syrStats.Snapshot()[ "devices" ] if _syrStats.enabled else {}
+        with self.lock:
+            self.scrapes += 1
+            devices = { ipaddr: dict( device ) for ipaddr, device in self.devices.items() }
+        for ipaddr, device in devices.items():
+            data = device.pop( "data" )
+            device[ "age" ]    = None if device[ "time" ] is None else now - device[ "time" ]
+            device[ "values" ] = { command: RawToInt( data[ command ] ) for command, *_ in SYR_METRICS if command in data }
+            device[ "alarm" ]  = data.get( SYR_CMD_ALARM )
+            device[ "history" ] = history.Status() if ( history := _syrHistories.get( ipaddr ) ) is not None else None
+            device[ "alarmwatch" ] = watch.Status() if ( watch := _syrAlarmWatches.get( ipaddr ) ) is not None else None
+            device[ "mqtt" ]    = source.Status() if ( source := _syrMqttSources.get( ipaddr ) ) is not None else None
+            device[ "stats" ]  = { command: { key: entry[ key ] for key in SYR_STATS_RESULTS +
+                                             [ "requests", "cached", "skipped", "retries", "p50", "p90", "p99", "mean", "max" ] }
+                                   for command, entry in stats.get( ipaddr, {} ).items() }
+        return { "started": self.started, "time": now, "devices": devices, "sinks": _syrSinks.Status() }
+
+    def Prometheus( self ):
+        """Returns: all devices in the Prometheus text format (version 0.0.4), one "device" label per device
+        """
+        now   = time.time()
+        stats = _syrStats.Snapshot()[ "devices" ] if _syrStats.enabled else {}
+        with self.lock:
+            self.scrapes += 1
+            devices = { ipaddr: dict( device ) for ipaddr, device in self.devices.items() }
+
+        lines = []
+        def Sample( name, labels, value ):
+            label = ",".join( key + "=\"" + str( val ).replace( "\\", "\\\\" ).replace( "\"", "\\\"" ) + "\"" for key, val in labels.items() )
+            lines.append( name + "{" + label + "} " + ( str( value ) if isinstance( value, int ) else repr( float( value ) ) ) )
+
+        def Metric( name, kind, text, samples ):
+            # samples: list of ( labels, value ); metrics without samples are left out completely
+            if not samples:
+                return
+            lines.append( "# HELP " + name + " " + text )
+            lines.append( "# TYPE " + name + " " + kind )
+            for labels, value in samples:
+                Sample( name, labels, value )
+
+        Metric( "syr_up", "gauge", "1 if the device answered the last poll",
+                [ ( { "device": ip }, int( d[ "up" ] ) ) for ip, d in devices.items() ] )
+        Metric( "syr_device_info", "gauge", "serial number and firmware version of the device",
+                [ ( { "device": ip, "serial": d[ "serial" ], "version": d[ "version" ] or "" }, 1 ) for ip, d in devices.items() if d[ "serial" ] is not None ] )
+        Metric( "syr_polls_total", "counter", "polls since the start",
+                [ ( { "device": ip }, d[ "polls" ] ) for ip, d in devices.items() ] )
+        Metric( "syr_polls_failed_total", "counter", "polls without a single answer since the start",
+                [ ( { "device": ip }, d[ "failed" ] ) for ip, d in devices.items() ] )
+        Metric( "syr_sample_timestamp_seconds", "gauge", "time of the latest sample, epoch seconds",
+                [ ( { "device": ip }, d[ "time" ] ) for ip, d in devices.items() if d[ "time" ] is not None ] )
+        Metric( "syr_sample_age_seconds", "gauge", "age of the latest sample",
+                [ ( { "device": ip }, now - d[ "time" ] ) for ip, d in devices.items() if d[ "time" ] is not None ] )
+        for command, name, factor, text in SYR_METRICS:
+            samples = []
+            for ip, d in devices.items():
+                if command in d[ "data" ] and ( value := RawToInt( d[ "data" ][ command ] ) ) is not None:
+                    samples.append( ( { "device": ip }, value if factor == 1 else round( value * factor, 3 ) ) )
+            Metric( name, "gauge", text, samples )
+        alarms = [ ( ip, d[ "data" ][ SYR_CMD_ALARM ] ) for ip, d in devices.items()
+                   if d[ "data" ].get( SYR_CMD_ALARM, SYR_ERROR_STRING ) != SYR_ERROR_STRING ]
+        histories = [ ( ip, history.Status() ) for ip in devices if ( history := _syrHistories.get( ip ) ) is not None ]
+        Metric( "syr_flow_mean_liters_per_hour", "gauge", "mean flow over the last " + str( SYR_HISTORY_WINDOW ) + " seconds",
+                [ ( { "device": ip }, status[ "flowMean" ] ) for ip, status in histories if status[ "flowMean" ] is not None ] )
+        Metric( "syr_volume_since_valve_change_liters", "gauge", "water that flowed since the valve last changed its state",
+                [ ( { "device": ip }, status[ "valveVolume" ] ) for ip, status in histories if status[ "valveTime" ] is not None ] )
+        Metric( "syr_alarm_active", "gauge", "1 if an alarm is active",
+                [ ( { "device": ip }, int( code != "FF" ) ) for ip, code in alarms ] )
+        Metric( "syr_alarm_info", "gauge", "current alarm code; FF = no alarm",
+                [ ( { "device": ip, "code": code, "alarm": SYR_ALARM_CODES.get( code, "UNKNOWN ERROR" ) }, 1 ) for ip, code in alarms ] )
+
+        # "--alarmwatch"; see SyrAlarmWatch_class
+        watches = [ ( ip, watch.Status() ) for ip in devices if ( watch := _syrAlarmWatches.get( ip ) ) is not None ]
+        Metric( "syr_alarmwatch_transitions_total", "counter", "alarm and valve changes the watcher detected",
+                [ ( { "device": ip }, status[ "transitions" ] ) for ip, status in watches ] )
+        if watches:
+            lines.append( "# HELP syr_alarm_detection_seconds time from the last read before an alarm or valve change to the first one after it" )
+            lines.append( "# TYPE syr_alarm_detection_seconds summary" )
+            for ip, status in watches:
+                Sample( "syr_alarm_detection_seconds_sum",   { "device": ip }, status[ "latencySum" ] )
+                Sample( "syr_alarm_detection_seconds_count", { "device": ip }, status[ "transitions" ] )
+        Metric( "syr_alarm_detection_last_seconds", "gauge", "detection latency of the last alarm or valve change",
+                [ ( { "device": ip }, status[ "latencyLast" ] ) for ip, status in watches if status[ "latencyLast" ] is not None ] )
+        Metric( "syr_alarm_detection_max_seconds", "gauge", "highest detection latency of an alarm or valve change",
+                [ ( { "device": ip }, status[ "latencyMax" ] ) for ip, status in watches if status[ "transitions" ] ] )
+        Metric( "syr_alarm_hook_calls_total", "counter", "--onalarm hooks that finished",
+                [ ( { "device": ip }, status[ "hookCalls" ] ) for ip, status in watches ] )
+        Metric( "syr_alarm_hook_errors_total", "counter", "--onalarm hooks that failed",
+                [ ( { "device": ip }, status[ "hookErrors" ] ) for ip, status in watches ] )
+
+        # "--mqtt"; see SyrMqttSource_class
+        sources = [ ( ip, source.Status() ) for ip in devices if ( source := _syrMqttSources.get( ip ) ) is not None ]
+        Metric( "syr_mqtt_connected", "gauge", "1 if connected to the MQTT broker",
+                [ ( { "device": ip, "broker": status[ "broker" ] }, int( status[ "connected" ] ) ) for ip, status in sources ] )
+        Metric( "syr_mqtt_messages_total", "counter", "MQTT messages received from the device",
+                [ ( { "device": ip }, status[ "messages" ] ) for ip, status in sources ] )
+        Metric( "syr_mqtt_pushed_commands", "gauge", "number of commands the device pushes; the others are polled",
+                [ ( { "device": ip }, len( status[ "pushed" ] ) ) for ip, status in sources ] )
+
+        # request statistics; only if enabled, which "--httpport" does
+        Metric( "syr_requests_total", "counter", "requests to the device by command and outcome",
+                [ ( { "device": ip, "command": command, "result": result }, entry[ result ] )
+                  for ip, device in stats.items() for command, entry in sorted( device.items() ) for result in SYR_STATS_RESULTS ] )
+        Metric( "syr_requests_cached_total", "counter", "values answered from the configuration cache, by command",
+                [ ( { "device": ip, "command": command }, entry[ "cached" ] ) for ip, device in stats.items() for command, entry in sorted( device.items() ) ] )
+        if any( stats.values() ):
+            lines.append( "# HELP syr_request_duration_seconds latency of the requests to the device, by command" )
+            lines.append( "# TYPE syr_request_duration_seconds histogram" )
+            for ip, device in stats.items():
+                for command, entry in sorted( device.items() ):
+                    count = 0
+                    for bucket, num in zip( SYR_STATS_BUCKETS + [ None ], entry[ "histogram" ] ):
+                        count += num
+                        Sample( "syr_request_duration_seconds_bucket",
+                                { "device": ip, "command": command, "le": "+Inf" if bucket is None else repr( bucket / 1000.0 ) }, count )
+                    Sample( "syr_request_duration_seconds_sum",   { "device": ip, "command": command }, entry[ "sum" ] / 1000.0 )
+                    Sample( "syr_request_duration_seconds_count", { "device": ip, "command": command }, count )
+
+        # the output pipeline; see SyrSink_class
+        sinks = _syrSinks.Status()
+        Metric( "syr_sink_queued", "gauge", "items waiting in the sink's queue",
+                [ ( { "sink": sink[ "name" ] }, sink[ "queued" ] ) for sink in sinks ] )
+        Metric( "syr_sink_queued_max", "gauge", "most items that were waiting in the sink's queue at once",
+                [ ( { "sink": sink[ "name" ] }, sink[ "maxQueued" ] ) for sink in sinks ] )
+        Metric( "syr_sink_lines_total", "counter", "lines (or rows) the sink wrote",
+                [ ( { "sink": sink[ "name" ] }, sink[ "lines" ] ) for sink in sinks ] )
+        Metric( "syr_sink_dropped_total", "counter", "items the sink dropped because its queue was full",
+                [ ( { "sink": sink[ "name" ] }, sink[ "dropped" ] ) for sink in sinks ] )
+        Metric( "syr_sink_blocked_seconds_total", "counter", "time polling waited for the sink's full queue (--sinkpolicy=block)",
+                [ ( { "sink": sink[ "name" ] }, sink[ "blocked" ] ) for sink in sinks ] )
+        return "\n".join( lines ) + "\n"
+
+
+_syrMetrics = SyrMetrics_class()
+
+
+#############################################################################################################
+## SyrExporterHandler_class
+#############################################################################################################
+class SyrExporterHandler_class:
+    # "/metrics" in the Prometheus text format, "/json" (or "/") as JSON; both from _syrMetrics only.
+    # Mixed into http.server.BaseHTTPRequestHandler by StartExporter(), so http.server is only imported then.
+    protocol_version = "HTTP/1.1"
+    # headers and body are sent separately; without this, Nagle + delayed ACKs add ~40ms per reply
+    disable_nagle_algorithm = True
+
+    def do_GET( self ):
+        path = self.path.split( "?", 1 )[0]
+        if path == "/metrics":
+            self.Send( 200, "text/plain; version=0.0.4; charset=utf-8", _syrMetrics.Prometheus().encode() )
+        elif path in ( "/", "/json" ):
+            self.Send( 200, "application/json", json.dumps( _syrMetrics.Snapshot() ).encode() )
+        else:
+            self.Send( 404, "text/plain; charset=utf-8", b"not found; try /metrics or /json\n" )
+
+    def Send( self, status, contentType, body ):
+        self.send_response( status )
+        self.send_header( "Content-Type", contentType )
+        self.send_header( "Content-Length", str( len( body ) ) )
+        self.end_headers()
+        self.wfile.write( body )
+
+    def log_message( self, format, *args ):
+        pass
+
+
+#############################################################################################################
+## StartExporter
+#############################################################################################################
+def StartExporter( port, host = "127.0.0.1" ):
+    """Serve _syrMetrics via HTTP in a background thread; see SyrExporterHandler_class.
+
+    port: TCP port; 0 = any free port
+    host: address to listen on; "0.0.0.0" for all
+
+    Returns: the server object, its port is "server.server_address[1]"; raises OSError if the port is taken
+    """
+    import http.server
+
+    handler = type( "SyrExporterHandler", ( SyrExporterHandler_class, http.server.BaseHTTPRequestHandler ), {} )
+    server  = http.server.ThreadingHTTPServer( ( host, port ), handler )
+    server.daemon_threads = True
+    threading.Thread( target = server.serve_forever, daemon = True, name = "syrexporter" ).start()
+    return server
+
+
+#############################################################################################################
+## GetSession
+#############################################################################################################
+_syrSession     = None
+_syrSessionLock = threading.Lock()
+
+def GetSession():
+    """Return the shared HTTP session, which keeps the connections to the Syr alive.
+    Created on first use.
+
+    Returns: a requests.Session object
+    """
+    global _syrSession
+    import requests
+
+    with _syrSessionLock:
+        if _syrSession is None:
+            _syrSession = requests.Session()
+            # one pool per device; the pool size caps the number of parallel connections
+            adapter = requests.adapters.HTTPAdapter( pool_connections = max( 4, SYR_POOLDEVICES ), pool_maxsize = SYR_POOLSIZE )
+            _syrSession.mount( "http://", adapter )
+        return _syrSession
+
+
+#############################################################################################################
+## SyrLink_class
+#############################################################################################################
+class SyrLink_class:
+    # The state of the connection to a single device; see SyrRequestGuarded().
+    # - Adaptive timeouts, per command: from the smoothed latency and its variation, like TCP does it (RFC 6298),
+    #   within SYR_TIMEOUT_MIN..SYR_TIMEOUT_MAX. Doubled after each timeout, until the next answer.
+    # - Retry budget: each answer earns SYR_RETRY_RATIO retries, each retry costs one, so retries can never
+    #   add more than that to the load of a device that is in trouble anyway.
+    # - Circuit breaker: after SYR_BREAKER_FAILURES timeouts or connection errors in a row, the device is
+    #   considered to be down ("open") and all requests fail at once. After a cooldown, a single request is
+    #   let through as a probe ("half-open"), with a timeout from the latency seen so far. If it is answered,
+    #   the device is back ("closed"); if not, the cooldown is doubled, up to SYR_BREAKER_MAXCOOLDOWN.
+    def __init__( self ) -> None:
+        self.state    = "closed"
+        self.failures = 0                        # timeouts and connection errors in a row
+        self.cooldown = SYR_BREAKER_COOLDOWN
+        self.openTill = 0.0                      # time.monotonic() of the next probe, if open
+        self.budget   = 1.0                      # retries left; see SYR_RETRY_RATIO
+        self.rtt      = {}                       # command -> [ smoothed latency, latency variation, timeout factor ]
+        self.lock     = threading.Lock()
+
+    def Timeout( self, command ):
+        """Returns: the timeout for the next request of 'command', in seconds
+        """
+        with self.lock:
+            if ( rtt := self.rtt.get( command ) ) is None:
+                return SYR_TIMEOUT_MAX
+            factor = 1 if self.state == "half-open" else rtt[2]
+            return min( SYR_TIMEOUT_MAX, max( SYR_TIMEOUT_MIN, ( rtt[0] + 4 * rtt[1] ) * factor ) )
+
+    def Allow( self ):
+        """Returns: True if a request may be sent; False if the device is down
+        """
+        with self.lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() >= self.openTill:
+                # this one is the probe; all others fail until it's done
+                self.state = "half-open"
+                return True
+            return False
+
+    def Success( self, command, seconds ):
+        """The device answered a request of 'command' within 'seconds'; no matter what it answered.
+        """
+        with self.lock:
+            if ( rtt := self.rtt.get( command ) ) is None:
+                self.rtt[ command ] = [ seconds, seconds / 2, 1 ]
+            else:
+                rtt[1] = 0.75 * rtt[1] + 0.25 * abs( rtt[0] - seconds )
+                rtt[0] = 0.875 * rtt[0] + 0.125 * seconds
+                rtt[2] = 1
+            self.state    = "closed"
+            self.failures = 0
+            self.cooldown = SYR_BREAKER_COOLDOWN
+            self.budget   = min( SYR_RETRIES * 5, self.budget + SYR_RETRY_RATIO )
+
+    def Failure( self, command, result ):
+        """A request of 'command' failed; 'result' as in SyrStats_class, e.g. "timeout".
+        Only timeouts and connection errors count; they mean the device is not reachable.
+        The probe of a "half-open" breaker opens it again, no matter how it failed; otherwise, nothing would.
+        """
+        with self.lock:
+            if self.state == "half-open":
+                self.cooldown = min( self.cooldown * 2, SYR_BREAKER_MAXCOOLDOWN )
+                self.state    = "open"
+                self.openTill = time.monotonic() + self.cooldown
+            if result != "timeout" and result != "connection":
+                return
+            if result == "timeout" and ( rtt := self.rtt.get( command ) ) is not None:
+                rtt[2] = min( rtt[2] * 2, 64 )
+            self.failures += 1
+            if self.state == "closed" and self.failures >= SYR_BREAKER_FAILURES:
+                self.state    = "open"
+                self.openTill = time.monotonic() + self.cooldown
+
+    def RetryDelay( self, attempt ):
+        """Returns: seconds to wait before retry number 'attempt' (0..), or None if there must not be one
+        """
+        with self.lock:
+            if self.state != "closed" or attempt >= SYR_RETRIES or self.budget < 1.0:
+                return None
+            self.budget -= 1.0
+        return random.uniform( 0, SYR_RETRY_BACKOFF * 2 ** attempt )
+
+    def IsDown( self ):
+        """Returns: True if the device is considered to be down; the breaker is not "closed"
+        """
+        return self.state != "closed"
+
+
+_syrLinks     = {}
+_syrLinksLock = threading.Lock()
+
+def GetLink( ipaddr = None ):
+    """Returns: the SyrLink_class object of a device; created on first use
+    """
+    if ipaddr is None:
+        ipaddr = SYR_IPADDR
+    with _syrLinksLock:
+        if ( link := _syrLinks.get( ipaddr ) ) is None:
+            link = _syrLinks[ ipaddr ] = SyrLink_class()
+        return link
+
+
+#############################################################################################################
+## SyrRequest
+#############################################################################################################
+def SyrRequest( path, timeout = 5, ipaddr = None ):
+    """Send a single GET request to the Syr SafeTech's REST API.
+    All communication with the device goes through here.
+
+    path   : the part of the URL after ".../safe-tec/", e.g. "get/FLO", "set/PRF/3" or "clr/ADM"
+    timeout: seconds to wait for a response
+    ipaddr : IP address of the device, optionally with ":port"; None = SYR_IPADDR
+
+    Returns: the requests.Response object, or a SyrResponse_class with SYR_TRANSPORT "stdlib";
+    raises requests.RequestException on errors, OSError or http.client.HTTPException with "stdlib"
+    """
+    if ipaddr is None:
+        ipaddr = SYR_IPADDR
+    if ":" not in ipaddr:
+        ipaddr += ":" + str( SYR_PORT )
+
+    if SYR_TRANSPORT == "stdlib":
+        return SyrRequestStdlib( ipaddr, "/safe-tec/" + path, timeout )
+
+    import requests
+    url = "http://" + ipaddr + "/safe-tec/" + path
+
+    if SYR_KEEPALIVE is False:
+        return requests.get( url, timeout = timeout )
+
+    import urllib3
+    try:
+        return GetSession().get( url, timeout = timeout )
+    except requests.Timeout:
+        raise
+    except requests.ConnectionError as e:
+        # The Syr drops idle connections after a while. A stale pooled socket only fails when
+        # it is used again, so try once more; the pool then opens a fresh connection.
+        # Anything else, e.g. "connection refused", is up to the caller: SyrLink_class and its retry budget.
+        if not isinstance( e.args[0] if e.args else None, ( urllib3.exceptions.ProtocolError, ConnectionResetError, BrokenPipeError ) ):
+            raise
+        return GetSession().get( url, timeout = timeout )
+
+
+#############################################################################################################
+## SyrRequestStdlib
+#############################################################################################################
+class SyrResponse_class:
+    # What SyrRequestStdlib() returns; the part of requests.Response the callers need.
+    __slots__ = ( "status_code", "content" )
+
+    def __init__( self, status_code, content ) -> None:
+        self.status_code = status_code
+        self.content     = content
+
+    @property
+    def text( self ):
+        return self.content.decode( "utf-8", "replace" )
+
+    def json( self ):
+        return json.loads( self.content )
+
+
+_syrConnections     = {}            # "ipaddr:port" -> list of idle http.client.HTTPConnection objects
+_syrConnectionsLock = threading.Lock()
+
+def SyrRequestStdlib( ipaddr, path, timeout ):
+    """Send a GET request with http.client, which takes a fraction of the time "requests" needs to import;
+    for one-shot commands, that is most of their run time ("--transport=stdlib").
+    Idle connections are kept, up to SYR_POOLSIZE per device, unless SYR_KEEPALIVE is off.
+
+    ipaddr : IP address of the device, with ":port"
+    path   : the path of the URL, e.g. "/safe-tec/get/FLO"
+    timeout: seconds to wait for the connection and for the response
+
+    Returns: a SyrResponse_class object; raises TimeoutError, OSError or http.client.HTTPException on errors
+    """
+    import http.client
+
+    host, _, port = ipaddr.rpartition( ":" )
+    with _syrConnectionsLock:
+        idle = _syrConnections.setdefault( ipaddr, [] )
+        conn = idle.pop() if idle and SYR_KEEPALIVE else None
+
+    def Exchange( conn ):
+        try:
+            conn.request( "GET", path, headers = { "Connection": "keep-alive" if SYR_KEEPALIVE else "close" } )
+            response = conn.getresponse()
+            content  = response.read()
+        except BaseException:
+            conn.close()
+            raise
+        if SYR_KEEPALIVE and not response.will_close:
+            with _syrConnectionsLock:
+                if len( idle ) < SYR_POOLSIZE:
+                    idle.append( conn )
+                    conn = None
+        if conn is not None:
+            conn.close()
+        return SyrResponse_class( response.status, content )
+
+    if conn is not None:
+        if conn.sock is not None:
+            conn.sock.settimeout( timeout )
+        try:
+            return Exchange( conn )
+        except ( http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError ):
+            # The Syr drops idle connections after a while; a stale one only fails when it is used again.
+            # The others went idle at about the same time, so they are dropped too; then one fresh attempt.
+            with _syrConnectionsLock:
+                stale = idle[:]
+                idle.clear()
+            for old in stale:
+                old.close()
+
+    return Exchange( http.client.HTTPConnection( host, int( port ), timeout = timeout ) )
+
+
+#############################################################################################################
+## SyrRequestGuarded
+#############################################################################################################
+def SyrRequestGuarded( path, command, timeout = None, ipaddr = None, retry = False ):
+    """Send a request through SyrRequest(), guarded by the device's SyrLink_class: with an adaptive timeout,
+    not at all if the device is down and, if 'retry' is set, with retries as long as the retry budget allows.
+    Failures are counted in the request statistics.
+
+    path   : as for SyrRequest(), e.g. "get/FLO"
+    command: the command, for the statistics and the adaptive timeouts, e.g. "FLO" or "set/PRF"
+    timeout: seconds to wait for a response; None = adaptive
+    ipaddr : IP address of the device, optionally with ":port"; None = SYR_IPADDR
+    retry  : retry after timeouts and connection errors; only for requests that may be sent twice
+
+    Returns: a tuple ( the response object, see SyrRequest(), or None if it failed, start time from time.perf_counter() )
+    """
+    if ipaddr is None:
+        ipaddr = SYR_IPADDR
+    link    = GetLink( ipaddr )
+    tStart  = time.perf_counter()
+    attempt = 0
+
+    while True:
+        if not link.Allow():
+            _syrStats.Count( ipaddr, command, "skipped" )
+            return ( None, tStart )
+        t0 = time.perf_counter()
+        try:
+            response = SyrRequest( path, timeout = link.Timeout( command ) if timeout is None else timeout, ipaddr = ipaddr )
+        except Exception as e:
+            result = SyrStats_class.ResultOf( e )
+            link.Failure( command, result )
+            if retry and result != "error" and ( backoff := link.RetryDelay( attempt ) ) is not None:
+                _syrStats.Count( ipaddr, command, "retries" )
+                time.sleep( backoff )
+                attempt += 1
+                continue
+            _syrStats.Record( ipaddr, command, result, time.perf_counter() - tStart, SyrStats_class.ErrorOf( e ) )
+            return ( None, tStart )
+        link.Success( command, time.perf_counter() - t0 )
+        return ( response, tStart )
+
+
 #############################################################################################################
 ## GetData
 #############################################################################################################
-def GetDataRaw( command, timeout = 5 ):
+def GetDataRaw( command, timeout = None, ipaddr = None ):
     """Read data from Syr SafeTech
     
     command: Command as string in lower or upper case letters. E.g. "AVO", "CEL", ...
-    timeout: seconds to wait for a response
+    timeout: seconds to wait for a response; None = adaptive, see SyrLink_class
+    ipaddr : IP address of the device, optionally with ":port"; None = SYR_IPADDR
 
     Returns: the raw value of the requested command or "ERROR" if no response was received
     """
     command = command.upper()
-    try:
-        response = requests.get( "http://" + SYR_IPADDR + ":5333/safe-tec/get/" + command, timeout = timeout )
-        # DEBUG DOTS
-#        print(".", end="", flush=True)
-    except:
-        # one for all
+    if ipaddr is None:
+        ipaddr = SYR_IPADDR
+
+    cacheable = SyrConfigCache_class.IsCacheable( command )
+    if cacheable and ( cached := _syrConfigCache.Get( ipaddr, command ) ) is not None:
+        _syrStats.Count( ipaddr, command, "cached" )
+        return cached
+
+    response, tStart = SyrRequestGuarded( "get/" + command, command, timeout = timeout, ipaddr = ipaddr, retry = True )
+    # DEBUG DOTS
+#    print(".", end="", flush=True)
+    if response is None:
         return SYR_ERROR_STRING
 
     if response.status_code == 200:
@@ -273,210 +1313,2904 @@ def GetDataRaw( command, timeout = 5 ):
         #     File "SyrSafeTechLogger/./SyrSafeTechLogger.py", line 378, in <module>
         #       dataLine = GetDataRaw( SYR_CMD_VALVE )       + "; " + \
         #   TypeError: can only concatenate str (not "NoneType") to str
-        data = response.json()
-        # quick and dirty fix for the above problem:
-#        return data.get( 'get' + command )
-        return str( data.get( 'get' + command ) )
+        try:
+            data = response.json()
+            # quick and dirty fix for the above problem:
+#            return data.get( 'get' + command )
+            value = str( data.get( 'get' + command ) )
+        except ( ValueError, AttributeError ):
+            _syrStats.Record( ipaddr, command, "json", time.perf_counter() - tStart, "invalid JSON: " + response.text[:40] )
+            return SYR_ERROR_STRING
+        _syrStats.Record( ipaddr, command, "ok", time.perf_counter() - tStart )
+        if cacheable:
+            _syrConfigCache.Put( ipaddr, command, value )
+        return value
 
-    # just in case; unused; will not be reached
+    # e.g. 404 for unknown commands
+    _syrStats.Record( ipaddr, command, "http", time.perf_counter() - tStart, "HTTP " + str( response.status_code ) )
     return SYR_ERROR_STRING
 
 
+#############################################################################################################
+## GetDataMulti
+#############################################################################################################
+_syrPool     = None
+_syrPoolLock = threading.Lock()
+
+def GetDataMulti( commands, parallel = False, timeout = None, ipaddr = None ):
+    """Read several values from the Syr SafeTech.
+
+    commands: list of commands as strings, e.g. [ "VLV", "BAR", "FLO" ]
+    parallel: if True, send the requests at once, but never more than APP_INFLIGHT at a time;
+              one poll then takes about as long as its slowest request.
+              If False, send them one after another, in the given order.
+    timeout : seconds to wait for each response; None = adaptive, see SyrLink_class
+    ipaddr  : IP address of the device, optionally with ":port"; None = SYR_IPADDR
+
+    Returns: a dictionary with the commands as keys and their raw values (or "ERROR") as values
+    """
+    global _syrPool
+
+    if parallel is False or len( commands ) < 2:
+        return { command: GetDataRaw( command, timeout = timeout, ipaddr = ipaddr ) for command in commands }
+
+    with _syrPoolLock:
+        if _syrPool is None:
+            import concurrent.futures
+            _syrPool = concurrent.futures.ThreadPoolExecutor( max_workers = APP_INFLIGHT, thread_name_prefix = "syr" )
+
+    futures = { command: _syrPool.submit( GetDataRaw, command, timeout, ipaddr ) for command in commands }
+    return { command: future.result() for command, future in futures.items() }
+
+
 #############################################################################################################
 ## SetData
 #############################################################################################################
-def SetDataRaw( command, parameter = None, timeout = 5, useCLR = False):
+def SetDataRaw( command, parameter = None, timeout = None, useCLR = False, ipaddr = None ):
     """Write data to the Syr SafeTech
     
     command  : Command as string, in lower or upper case letters. E.g. "PRF", "PN1", "ADM" ...
     parameter: The parameter to be set, as a string. E.g. "0", "1", "(1)", "(2)f" 
-    timeout  : seconds to wait for a response
+    timeout  : seconds to wait for a response; None = adaptive, see SyrLink_class
     useCLR   : if true, use "clr" instead of "set", e.g. for a ".../clr/ADM" command to reset admin rights.
+    ipaddr   : IP address of the device, optionally with ":port"; None = SYR_IPADDR
 
     Returns: the raw value of the requested command or "ERROR" if no response was received
     """
     command = command.upper()
+    if ipaddr is None:
+        ipaddr = SYR_IPADDR
     if parameter is None:
         parameter = ""
     else:
         parameter = "/" + parameter
 
-    strReq = "http://" + SYR_IPADDR + ":5333/safe-tec/" + ( "clr/" if useCLR else "set/" ) + command + parameter
+    strReq = ( "clr/" if useCLR else "set/" ) + command + parameter
 
-    try:
-#        response = requests.get( "http://" + SYR_IPADDR + ":5333/safe-tec/set/" + command + "/" + parameter, timeout = timeout )
-        response = requests.get( strReq, timeout = timeout )
+    # whatever the outcome, a cached value might be outdated now
+    _syrConfigCache.Invalidate( ipaddr, command )
 
-    except:
-        # one for all
+    # never retried; not all of them may be sent twice
+    statsCommand = strReq.split( "/" )[0] + "/" + command
+#    response = requests.get( "http://" + SYR_IPADDR + ":5333/safe-tec/set/" + command + "/" + parameter, timeout = timeout )
+    response, tStart = SyrRequestGuarded( strReq, statsCommand, timeout = timeout, ipaddr = ipaddr )
+    if response is None:
         return SYR_ERROR_STRING
 
     if response.status_code == 200:
-        data = response.json()
+        try:
+            data = response.json()
+        except ValueError:
+            _syrStats.Record( ipaddr, statsCommand, "json", time.perf_counter() - tStart, "invalid JSON: " + response.text[:40] )
+            return SYR_ERROR_STRING
+        _syrStats.Record( ipaddr, statsCommand, "ok", time.perf_counter() - tStart )
         # TODO: the responses are manifold; needs to be checked
         #       set/PRF/3    -->   {"setPRF3":"OK"}
         #       set/ADM(1)   -->   {"setADM(1)":"SERVICE"}
         return data
 #        return data.get( 'set' + command )
 
-    # just in case; unused; will not be reached
+    _syrStats.Record( ipaddr, statsCommand, "http", time.perf_counter() - tStart, "HTTP " + str( response.status_code ) )
     return SYR_ERROR_STRING
 
 
 #############################################################################################################
 ## ClrDataRaw
 #############################################################################################################
-def ClrDataRaw( command, timeout = 5 ):
+def ClrDataRaw( command, timeout = None, ipaddr = None ):
     """Write ("clr") data to the Syr SafeTech
     
     command  : Command as string in lower or upper case letters. E.g. "PRF", "PN1", "ADM" ...
-    timeout  : seconds to wait for a response
+    timeout  : seconds to wait for a response; None = adaptive, see SyrLink_class
+    ipaddr   : IP address of the device, optionally with ":port"; None = SYR_IPADDR
 
     Returns: the raw value of the requested command or "ERROR" if no response was received
     """
 
-    return SetDataRaw( command, parameter=None, timeout=timeout, useCLR=True )
+    return SetDataRaw( command, parameter=None, timeout=timeout, useCLR=True, ipaddr=ipaddr )
 
 
 #############################################################################################################
-## GetAndPrintProfiles
+## SyrScheduler_class
 #############################################################################################################
-# Actually, there should be something like a HAL here and for all the other things.
-# Directly reading the data and printing it in the same function is horseshite.
-# This thing's already a mess :)
-def GetAndPrintProfiles( quiet = False ):
-    """Read the number of available and configured profiles in the Syr.
-    Print them to stdout if 'quiet' is False.
+class SyrScheduler_class:
+    # Fixed-rate ticks on the monotonic clock. Unlike a sleep after each poll, the time spent
+    # polling does not add up to the period, so the samples stay evenly spaced.
+    def __init__( self, period ) -> None:
+        self.period   = period          # seconds between two ticks
+        self.next     = time.monotonic()
+        self.ticks    = 0               # number of ticks so far
+        self.overruns = 0               # number of polls that took longer than a period
+        self.skipped  = 0               # total number of ticks skipped because of overruns
 
-    quiet:  Do not print anything if set to True.
+    def Advance( self ):
+        """Move on to the next tick, without sleeping; self.next then holds its monotonic time.
+        If the last poll took too long, the missed ticks are skipped and the schedule continues
+        on the original grid, instead of shifting it.
 
-    Returns: An array with numbers of available profiles (1..8) or an empty array if no profiles are available.
-    E.g. [ 1, 2, 3 ]
-    """
+        Returns: the number of ticks skipped (0 if everything's fine)
+        """
+        self.ticks += 1
+        self.next  += self.period
 
-    lstProfiles = []
-    print( "  Profiles available ....... " + GetDataRaw( SYR_CMD_PROFILENUMS ) )
-    print( "  Profile numbers .......... ", end = "" )
-    for i in range( 1, 9 ):
-        if ( ret := GetDataRaw( SYR_CMD_PROFILE_X_AVAIL + str(i) ) ) != SYR_ERROR_STRING:
-            if ret == "1":
-                print( str(i), end = " " )
-                lstProfiles.append( i )
-        else:
-            # not nice :-/
-            print( SYR_ERROR_STRING, end = " " )
-    print()
+        if self.period <= 0:
+            self.next = time.monotonic()
+            return 0
 
-    return lstProfiles
+        now     = time.monotonic()
+        skipped = 0
+        if now > self.next:
+            skipped        = int( ( now - self.next ) // self.period ) + 1
+            self.next     += skipped * self.period
+            self.overruns += 1
+            self.skipped  += skipped
 
+        return skipped
+
+    def Wait( self ):
+        """Sleep until the next tick; see Advance().
+
+        Returns: the number of ticks skipped (0 if everything's fine)
+        """
+        skipped = self.Advance()
+        # wakes up early if the logger is told to stop; see StopHandler()
+        _syrStopEvent.wait( max( 0.0, self.next - time.monotonic() ) )
+        return skipped
 
 
 #############################################################################################################
-## GetAndPrintProfileX
+## SyrFieldCache_class
 #############################################################################################################
-# Actually, there should be something like a HAL here and for all the other things.
-# Directly reading the data and printing it in the same function is horseshite.
-# This thing's already a mess :)
-def GetAndPrintProfileX( profNum = None, warnIfNotAvailable = False ):
-    """Read the Syr SafeTech's profile number 'profNum' and print the contents to stdout.
+class SyrFieldCache_class:
+    # The last value of each field and when it was read. Fields that change slowly are only
+    # re-read every SYR_POLL_INTERVALS seconds and are served from here in between.
+    def __init__( self, intervals = SYR_POLL_INTERVALS ) -> None:
+        self.intervals = intervals
+        self.values    = {}             # command -> last raw value
+        self.times     = {}             # command -> monotonic time of the last successful read
 
-    profNum: profile number as integer (1..8); None = active profile
-    """
+    def Due( self, commands, now, slack = 0.0 ):
+        """Select the fields that need to be read now.
 
-    # TODO: This will all fail if profNum is "ERROR" or None
-    if profNum is None:
-        profNum = GetDataRaw( SYR_CMD_PROFILE )
-        print( "  Profile selected ......... " + (profNum:=GetDataRaw( SYR_CMD_PROFILE )) )
+        commands: all commands of a poll
+        now     : monotonic time of this poll
+        slack   : seconds a field may be read early; avoids missing a poll because of some jitter
 
-    # saves a lot of typing
-    profNum = str( profNum )
+        Returns: list with the commands to be read, in the same order as 'commands'
+        """
+        due = []
+        for command in commands:
+            last = self.times.get( command )
+            if last is None or now - last + slack >= self.intervals.get( command, 0 ):
+                due.append( command )
+        return due
+
+    def Update( self, data, now ):
+        """Store freshly read values. Errors are stored too, but the field stays due.
+
+        data: dictionary with the raw values, as returned by GetDataMulti()
+        now : monotonic time of this poll
+        """
+        if SYR_CMD_VOLUME in data:
+            # a water consumption ended (volume was reset), so "last volume" just changed
+            if RawToInt( data[ SYR_CMD_VOLUME ] ) == 0 and ( RawToInt( self.values.get( SYR_CMD_VOLUME, "0" ) ) or 0 ) > 0:
+                self.times.pop( SYR_CMD_VOLUME_LAST, None )
+
+        for command, value in data.items():
+            self.values[ command ] = value
+            if value != SYR_ERROR_STRING:
+                self.times[ command ] = now
+
+    def Get( self, commands ):
+        """Returns: a dictionary with the last values of 'commands'; like GetDataMulti() does
+        """
+        return { command: self.values.get( command, SYR_ERROR_STRING ) for command in commands }
+
+    def Age( self, command, now ):
+        """Returns: seconds since the field was successfully read or None if it never was
+        """
+        last = self.times.get( command )
+        return None if last is None else now - last
 
-    if warnIfNotAvailable:
-        if GetDataRaw( SYR_CMD_PROFILE_X_AVAIL + profNum ) != "1":
-            print( "  Profile " + profNum + " ................ WARNING, NOT CONFIGURED, NOT AVAILABLE!" )
 
-    print( "  Profile " + profNum + " name ........... " + GetDataRaw( SYR_CMD_PROFILE_X_NAME  + profNum )         )
-    print( "  Profile " + profNum + " volume level ... " + GetDataRaw( SYR_CMD_PROFILE_X_VOL   + profNum ) + "L"   )
-    print( "  Profile " + profNum + " time level ..... " + GetDataRaw( SYR_CMD_PROFILE_X_TIME  + profNum ) + "s"   )
-    print( "  Profile " + profNum + " flow level ..... " + GetDataRaw( SYR_CMD_PROFILE_X_FLOW  + profNum ) + "L/h" )
-    print( "  Profile " + profNum + " microleakage ... " + ("on" if GetDataRaw( SYR_CMD_PROFILE_X_MLEAK + profNum ) == "1" else "off"))
-    print( "  Profile " + profNum + " return time .... " + GetDataRaw( SYR_CMD_PROFILE_X_RTIME + profNum ) + "h"   )
-    print( "  Profile " + profNum + " buzzer ......... " + ("on" if GetDataRaw( SYR_CMD_PROFILE_X_BUZZ  + profNum ) == "1" else "off"))    
-    print( "  Profile " + profNum + " leakage warning. " + ("on" if GetDataRaw( SYR_CMD_PROFILE_X_LEAKW + profNum ) == "1" else "off"))
+#############################################################################################################
+## SyrAdaptiveRate_class
+#############################################################################################################
+class SyrAdaptiveRate_class:
+    # Chooses the poll period from the last sample: slow while the water's not flowing and
+    # the valve is stable, fast as soon as something happens.
+    def __init__( self, fastPeriod, idlePeriod, holdTime = APP_IDLEHOLD ) -> None:
+        self.fastPeriod   = fastPeriod
+        self.idlePeriod   = idlePeriod
+        self.holdTime     = holdTime       # stay fast for this many seconds after the last activity
+        self.lastActive   = None           # monotonic time of the last activity; None = never
+        self.lastVolume   = None           # AVO of the previous sample, to detect a growing volume
+        self.fast         = False          # currently polling at the fast rate
+        self.switches     = 0              # number of changes between fast and idle rate
+
+    def IsActive( self, data ):
+        """Check a sample for any activity.
+
+        data: dictionary with the raw values of a poll, as returned by GetDataMulti()
+
+        Returns: True if water is flowing, the volume grows, the valve moves or an alarm is on
+        """
+        flow   = RawToInt( data.get( SYR_CMD_FLOW,   SYR_ERROR_STRING ) )
+        volume = RawToInt( data.get( SYR_CMD_VOLUME, SYR_ERROR_STRING ) )
+        valve  = data.get( SYR_CMD_VALVE, SYR_ERROR_STRING )
+        alarm  = data.get( SYR_CMD_ALARM, SYR_ERROR_STRING )
+
+        active = False
+        if flow is not None and flow > 0:
+            active = True
+        if volume is not None and self.lastVolume is not None and volume > self.lastVolume:
+            active = True
+        if valve == "11" or valve == "21":
+            # closing or opening
+            active = True
+        if alarm != SYR_ERROR_STRING and alarm != "FF":
+            active = True
+
+        if volume is not None:
+            self.lastVolume = volume
+
+        return active
 
+    def Update( self, data ):
+        """Feed the latest sample and get the period until the next poll.
+
+        data: dictionary with the raw values of a poll, as returned by GetDataMulti()
+
+        Returns: the poll period in seconds
+        """
+        now = time.monotonic()
+        if self.IsActive( data ):
+            self.lastActive = now
+
+        isFast = self.lastActive is not None and now - self.lastActive < self.holdTime
+        if isFast != self.fast:
+            self.fast      = isFast
+            self.switches += 1
+
+        return self.fastPeriod if isFast else self.idlePeriod
 
 
 #############################################################################################################
-## GetAndPrintStatus
+## GetLogCommands
 #############################################################################################################
-def GetAndPrintStatus():
-    """Read (almost) all settings the Syr SafeTech and print them to stdout.
+def GetLogCommands():
+    """Returns: the list of commands of a single poll, in the order of the log file's columns;
+    optional ones depending on APP_LOGCONDUCTIVITY, APP_LOGTEMPERATURE and APP_LOGPROFILE
     """
+    logCommands = [ SYR_CMD_VALVE, SYR_CMD_PRESSURE, SYR_CMD_FLOW, SYR_CMD_VOLUME, SYR_CMD_VOLUME_LAST, SYR_CMD_ALARM ]
+    if APP_LOGCONDUCTIVITY:
+        logCommands.append( SYR_CMD_CONDUCTIVITY )
+    if APP_LOGTEMPERATURE:
+        logCommands.append( SYR_CMD_TEMP )
+    if APP_LOGPROFILE:
+        logCommands.append( SYR_CMD_PROFILE )
+    return logCommands
 
-    # print number of available/configured profiles
-    GetAndPrintProfiles()
 
-    # print content of active profile
-    GetAndPrintProfileX()
+#############################################################################################################
+## FormatLogLines
+#############################################################################################################
+def FormatLogLines( data, timeHuman, timeMachine ):
+    """Turn the raw values of a poll into a line for stdout and one for the log file.
 
-    # set admin mode to read some of the data (power supply voltage, alarm history)
-    print( "  Enter admin mode ......... " + str( SetDataRaw( SYR_CMD_ADMIN, "(1)" ) ) )
+    data       : dictionary with the raw values, as returned by GetDataMulti() for GetLogCommands()
+    timeHuman  : time for stdout, e.g. from time.asctime()
+    timeMachine: time for the log file, e.g. from time.strftime("%Y;%m;%d; %H;%M;%S")
 
-    print( "  Leakage temp disable ..... " + GetDataRaw( SYR_CMD_TMP)                        )
-    print( "  Buzzer ................... " + ("on" if GetDataRaw( SYR_CMD_BUZZER) == "1" else "off"))
-    print( "  Conductivity limit ....... " + GetDataRaw( SYR_CMD_CONDUCT_LIMIT)    + "uS/cm" )
-    print( "  Conductivity factor ...... " + GetDataRaw( SYR_CMD_CONDUCT_FACTOR)             )
-    print( "  Leakage warning .......... " + GetDataRaw( SYR_CMD_LEAKAGE_WARNING)  + "%"     )
-    # not supported yet
-    # print( "  Language ................. " + SYR_LANGUAGES.get( GetDataRaw( SYR_CMD_LANGUAGE), "UNKNOWN LANGUAGE" ) )
-    print( "  Floor sensor ............. " + ("on" if GetDataRaw( SYR_CMD_FLOOR_SENSOR) == "1" else "off"))
-    print( "  Next maintenance ......... " + GetDataRaw( SYR_CMD_NEXT_MAINTENANCE)           )
-    print( "  Battery voltage .......... " + GetDataRaw( SYR_CMD_BATTERY)          + "V"     )
-    print( "  Power supply voltage ..... " + GetDataRaw( SYR_CMD_VOLTAGE)          + "V"     )
-    print( "  RTC ...................... " + (strRTC:=GetDataRaw( SYR_CMD_RTC) )             )
-    try:
-        intRTC = int( strRTC )
-    except:
-        intRTC = -1
-    print( "  RTC converted............. " + ( str(datetime.datetime.fromtimestamp( intRTC )) if intRTC > 0 else "ERROR" ) )
-    print( "  Ongoing alarm ............ " + SYR_ALARM_CODES.get( GetDataRaw( SYR_CMD_ALARM ), "UNKNOWN STATE") )
-    print( "  Alarm memory ............. " + GetDataRaw( SYR_CMD_ALARM_MEMORY) )
-    print( "  Last volume consumed ..... " + GetDataRaw( SYR_CMD_VOLUME_LAST)       + "L"    )
+    Returns: a tuple ( stdout line, log file line ), both without a newline
+    """
+    # get the valve state as a number and in human readable form for stdout
+    valveStateCode = data[ SYR_CMD_VALVE ]
+    valveStateStr  = SYR_VALVE_STATES.get( valveStateCode, "UNKNOWN STATE" )
 
-    tmp = GetDataRaw( SYR_CMD_VOLUME_TOTAL )   
-    for strReplace in SYR_UNITS_REPL:
-        tmp = tmp.replace( strReplace, "" )
-    print( "  Total volume consumed .... " + tmp                                    + "L"    )
+    # log everything in its raw form for now
+    dataLine = data[ SYR_CMD_PRESSURE ]    + "; " + \
+               data[ SYR_CMD_FLOW ]        + "; " + \
+               data[ SYR_CMD_VOLUME ]      + "; " + \
+               data[ SYR_CMD_VOLUME_LAST ]
 
-    # reset admin mode
-    print( "  Leave admin mode ......... " + str( ClrDataRaw( SYR_CMD_ADMIN ) ) )
+    # get thealarm state as a number and in human readable form for stdout
+    errorCode = data[ SYR_CMD_ALARM ]
+    errorStr  = SYR_ALARM_CODES.get( errorCode, "UNKNOWN ERROR" )
+
+    dataLine2 = ""
+
+    if APP_LOGCONDUCTIVITY:
+        dataLine2 =  "; " + data[ SYR_CMD_CONDUCTIVITY ]
+
+    if APP_LOGTEMPERATURE:
+        dataLine2 += "; " + data[ SYR_CMD_TEMP ]
+
+    if APP_LOGPROFILE:
+        dataLine2 += "; " + data[ SYR_CMD_PROFILE ]
+
+    if APP_RAW is False:
+        dataLine = RemoveUnits( dataLine )
+
+    return ( timeHuman   + "; " + valveStateStr  + "; " + dataLine + "; " + errorStr  + dataLine2,
+             timeMachine + "; " + valveStateCode + "; " + dataLine + "; " + errorCode + dataLine2 )
 
 
 #############################################################################################################
-if __name__ == "__main__":
+## SyrGap_class
+#############################################################################################################
+class SyrGap_class:
+    # Turns an outage of a device into two lines in the log, instead of a line full of "ERROR"s per poll:
+    #   # GAP START Sat Oct 17 10:00:00 2026; no response from 192.168.1.123
+    #   # GAP END Sat Oct 17 10:05:02 2026; 302s; 151 poll(s) missed
+    # A poll belongs to an outage if nothing was answered and the device is considered to be down (SyrLink_class).
+    def __init__( self, ipaddr = None ) -> None:
+        self.ipaddr = SYR_IPADDR if ipaddr is None else ipaddr
+        self.start  = None                  # time.monotonic() of the outage's start; None = no outage
+        self.polls  = 0                     # polls missed so far
 
-    maxpolls = -1  # -1 = infinite (default); can be overridden by command line option "--maxpolls=<n>"
+    def Update( self, data, timeHuman ):
+        """data: the raw values of a poll, as fetched; values from caches do not count
 
-    # -------------------------------------------------------------------------------------------------------
-    # minimal command line options
-    for args in sys.argv:
-        # ------------------------------
-        if args == sys.argv[0]:
-            continue
-        # ------------------------------
-        if args == "--help" or args == "-h" or args == "-?" or args == "/?":
-            PrintUsage()
-            sys.exit( APP_ERROR_NONE )
-        # ------------------------------
-        elif args == "--nofile":
-            APP_NOFILE = True
-        # ------------------------------
+        Returns: a tuple ( "# GAP ..." line or None, True if the poll's data is to be logged )
+        """
+        if data and all( value == SYR_ERROR_STRING for value in data.values() ) and GetLink( self.ipaddr ).IsDown():
+            self.polls += 1
+            if self.start is None:
+                self.start = time.monotonic()
+                return ( "# GAP START " + timeHuman + "; no response from " + self.ipaddr, False )
+            return ( None, False )
+
+        if self.start is not None:
+            marker = "# GAP END " + timeHuman + "; " + "{:.0f}s".format( time.monotonic() - self.start ) + "; " + \
+                     str( self.polls ) + " poll(s) missed"
+            self.start = None
+            self.polls = 0
+            return ( marker, True )
+
+        return ( None, True )
+
+
+#############################################################################################################
+## LogSegmentName
+#############################################################################################################
+SYR_LOG_COMPRESSED = { ".gz": "gzip", ".xz": "lzma" }    # extensions of compressed log files -> module to open them
+
+def LogSegmentName( fileName, startTime = None ):
+    """Returns: the name of a new log file of a rotated series, started at 'startTime' (epoch; None = now).
+    Names starting with date and time, like the default "20261017120000_SyrSafeTech.log", get the new
+    date and time; others get it appended, e.g. "cellar.log" -> "cellar_20261017120000.log".
+    Existing files are never reused; in doubt, a number is appended.
+    """
+    stamp      = time.strftime( "%Y%m%d%H%M%S", time.localtime( startTime ) )
+    head, tail = os.path.split( fileName )
+    if re.match( r"^\d{14}_", tail ):
+        names = ( stamp + tail[14:], stamp + "_{}" + tail[14:] )
+    else:
+        root, ext = os.path.splitext( tail )
+        names = ( root + "_" + stamp + ext, root + "_" + stamp + "_{}" + ext )
+
+    name, num = names[0], 0
+    while any( os.path.exists( os.path.join( head, name + ext ) ) for ext in [ "" ] + list( SYR_LOG_COMPRESSED ) ):
+        num  += 1
+        name  = names[1].format( num )
+    return os.path.join( head, name )
+
+
+#############################################################################################################
+## LogSegments
+#############################################################################################################
+def LogSegments( fileName ):
+    """Find all log files of a rotated series, compressed or not; see LogSegmentName().
+
+    fileName: any file of the series, e.g. "20261017120000_SyrSafeTech.log" or "cellar.log"
+
+    Returns: a sorted list of file names, oldest first
+    """
+    head, tail = os.path.split( fileName )
+    for ext in SYR_LOG_COMPRESSED:
+        if tail.endswith( ext ):
+            tail = tail[ :-len( ext ) ]
+    if re.match( r"^\d{14}_", tail ):
+        pattern = r"^(\d{14})(_\d+)?" + re.escape( re.sub( r"^\d{14}(_\d+)?(?=_)", "", tail ) )
+    else:
+        root, ext = os.path.splitext( tail )
+        root      = re.sub( r"_\d{14}(_\d+)?$", "", root )
+        pattern   = re.escape( root ) + r"(?:_(\d{14})(_\d+)?)?" + re.escape( ext )
+    pattern = re.compile( pattern + r"(?:" + "|".join( re.escape( ext ) for ext in SYR_LOG_COMPRESSED ) + r")?$" )
+
+    try:
+        matches = [ pattern.match( name ) for name in os.listdir( head or "." ) ]
+    except OSError:
+        return []
+    # by date and time, then by number
+    matches = sorted( ( m for m in matches if m is not None ),
+                      key = lambda m: ( m.group(1) or "", int( m.group(2)[1:] ) if m.group(2) else 0 ) )
+    return [ os.path.join( head, m.group(0) ) for m in matches ]
+
+
+#############################################################################################################
+## ModuleErrors
+#############################################################################################################
+def ModuleErrors( *names ):
+    """Returns: a tuple with the exceptions of those modules that are imported already, for an "except";
+    e.g. ModuleErrors( "lzma.LZMAError" ). A module that was never imported cannot have raised anything.
+    """
+    errors = []
+    for name in names:
+        moduleName, _, errorName = name.rpartition( "." )
+        if ( module := sys.modules.get( moduleName ) ) is not None:
+            errors.append( getattr( module, errorName ) )
+    return tuple( errors )
+
+
+#############################################################################################################
+## OpenLogFile
+#############################################################################################################
+def OpenLogFile( fileName ):
+    """Open a log file for reading, compressed (".gz", ".xz") or not.
+
+    Returns: a file object in text mode
+    """
+    for ext, module in SYR_LOG_COMPRESSED.items():
+        if fileName.endswith( ext ):
+            return importlib.import_module( module ).open( fileName, "rt" )
+    return open( fileName, "rt" )
+
+
+#############################################################################################################
+## CompressLogFile
+#############################################################################################################
+def CompressLogFile( fileName, method = "gz" ):
+    """Compress a log file, streaming, then delete the original. An interrupted run leaves the original untouched.
+
+    method: "gz" or "xz"
+
+    Returns: the name of the compressed file or None if that failed
+    """
+    import shutil
+    target = fileName + "." + method
+    try:
+        with open( fileName, "rb" ) as fin, importlib.import_module( SYR_LOG_COMPRESSED[ "." + method ] ).open( target + ".tmp", "wb" ) as fcomp:
+            shutil.copyfileobj( fin, fcomp, 1024 * 1024 )
+        os.replace( target + ".tmp", target )
+        os.remove( fileName )
+    except OSError as e:
+        print( "ERROR: cannot compress " + fileName + ": " + str( e ), file=sys.stderr, flush=True )
+        return None
+    return target
+
+
+#############################################################################################################
+## SyrSample_class
+#############################################################################################################
+class SyrSample_class:
+    # A poll as numbers, parsed once from the raw values; see SyrRecord_class.sample. Values that were not
+    # read or not answered are None. The valve state and the alarm stay codes: valve 10, 11, 20, 21, 30
+    # (SYR_VALVE_STATES), alarm as a number, 0xFF = no alarm, 0xA3 = "A3" (SYR_ALARM_CODES).
+    __slots__ = ( "time", "valve", "pressure", "flow", "volume", "lastVolume", "alarm", "conductivity", "temperature", "profile" )
+
+    def __init__( self, data, now = None ) -> None:
+        """data: the raw values of a poll, as from GetDataMulti()
+        now : time.time() of the poll; None = now
+        """
+        def Value( command ):
+            return RawToInt( data[ command ] ) if command in data else None
+
+        self.time         = time.time() if now is None else now
+        self.valve        = Value( SYR_CMD_VALVE )
+        self.pressure     = Value( SYR_CMD_PRESSURE )          # mbar
+        self.flow         = Value( SYR_CMD_FLOW )              # L/h
+        self.volume       = Value( SYR_CMD_VOLUME )            # mL of the ongoing consumption
+        self.lastVolume   = Value( SYR_CMD_VOLUME_LAST )       # L of the last consumption
+        self.conductivity = Value( SYR_CMD_CONDUCTIVITY )      # uS/cm
+        self.temperature  = Value( SYR_CMD_TEMP )              # 0..1000 = 0..100.0°C
+        self.profile      = Value( SYR_CMD_PROFILE )           # 1..8
+        try:
+            self.alarm = int( data[ SYR_CMD_ALARM ], 16 )
+        except ( KeyError, ValueError, TypeError ):
+            self.alarm = None
+
+    def Record( self, flags = 0 ):
+        """Returns: the sample as a tuple for SYR_BIN_RECORD, like LogLineToRecord() returns it
+        """
+        def Int( value ):
+            return SYR_BIN_MISSING if value is None else value
+
+        def Byte( value ):
+            return value if value is not None and 0 <= value <= 255 else 0
+
+        return ( int( self.time ), Int( self.pressure ), Int( self.flow ), Int( self.volume ), Int( self.lastVolume ),
+                 Int( self.conductivity ), Int( self.temperature ), Byte( self.valve ), Byte( self.alarm ), Byte( self.profile ), flags )
+
+
+#############################################################################################################
+## SyrRecord_class
+#############################################################################################################
+class SyrRecord_class:
+    # What the sampler hands to the sinks (see SyrPipeline_class): a poll of a device, or a line that is
+    # not a poll, e.g. "# GAP ..." or "# STATS ...". The sinks format it themselves, in their own threads.
+    __slots__ = ( "kind", "ipaddr", "serial", "time", "timeHuman", "timeMachine", "data", "sample", "line" )
+
+    POLL   = 1                          # kinds of records
+    MARKER = 2                          # "# GAP ..."; ends a "--changeonly" run
+    NOTE   = 3                          # "# STATS ..."
+
+    def __init__( self, kind, ipaddr, data = None, line = None, serial = None, now = None ) -> None:
+        self.kind        = kind
+        self.ipaddr      = ipaddr       # IP address of the device, optionally with ":port"
+        self.serial      = serial       # serial number; None = not known (yet)
+        self.time        = time.time() if now is None else now
+        localTime        = time.localtime( self.time )
+        self.timeHuman   = time.asctime( localTime )
+        self.timeMachine = time.strftime( "%Y;%m;%d; %H;%M;%S", localTime )
+        self.data        = data         # the raw values of a poll, as from GetDataMulti(); not changed afterwards
+        self.sample      = None         # ... as numbers, a SyrSample_class; see Parse()
+        self.line        = line         # the line, for anything but a poll
+
+    def Parse( self, data ):
+        """Set the raw values of a poll and parse them, once for all sinks.
+
+        Returns: the SyrSample_class
+        """
+        self.data   = data
+        self.sample = SyrSample_class( data, self.time )
+        return self.sample
+
+
+#############################################################################################################
+## SyrHistory_class
+#############################################################################################################
+SYR_HISTORY_WINDOW = 600            # seconds of the rolling mean flow, see SyrHistory_class.FlowMean()
+
+class SyrHistory_class:
+    # The recent polls of a device, in memory, for live statistics: a ring buffer of arrays, one per value
+    # of SyrSample_class, sized once for 'hours' at the device's rate ('period'); about 44 bytes per poll,
+    # e.g. 1.9MB for 24h of 2s polls, no matter how long the logger runs. Missing values are SYR_BIN_MISSING.
+    # The rolling aggregates are updated with each poll, so asking for them takes no time at all:
+    #   FlowMean()         - mean flow over the last 'window' seconds, in L/h
+    #   VolumeSinceValve() - liters that flowed since the valve changed its state, from the flow
+    # The polling loop appends, sinks and the exporter read; GetHistory() has the one of each device.
+    FIELDS = ( "valve", "pressure", "flow", "volume", "lastVolume", "alarm", "conductivity", "temperature", "profile" )
+
+    def __init__( self, hours = None, period = None, window = None ) -> None:
+        hours            = APP_HISTORY if hours is None else hours
+        period           = SYR_DELAY if period is None else max( 0.1, period )
+        self.window      = SYR_HISTORY_WINDOW if window is None else window
+        self.maxGap      = max( 60.0, 3 * period )   # the flow is not added up over longer gaps, e.g. outages
+        self.capacity    = max( 2, math.ceil( hours * 3600 / period ) )
+        self.times       = array.array( "d", bytes( 8 * self.capacity ) )
+        self.values      = { name: array.array( "i", [ SYR_BIN_MISSING ] ) * self.capacity for name in self.FIELDS }
+        self.head        = 0                # index of the next poll
+        self.count       = 0                # polls in the buffer
+        self.lock        = threading.Lock()
+        # the rolling aggregates
+        self.tail        = 0                # index of the oldest poll in the window
+        self.inWindow    = 0                # polls in the window
+        self.flowSum     = 0                # of the polls in the window, if answered
+        self.flowCount   = 0
+        self.valve       = None             # the valve's state ...
+        self.valveTime   = None             # ... since then, epoch seconds
+        self.valveVolume = 0.0              # liters since then
+        self.last        = None             # the previous poll
+
+    def Append( self, sample ):
+        """Add a SyrSample_class; the oldest poll is overwritten if the buffer is full.
+        """
+        with self.lock:
+            if self.inWindow == self.capacity:
+                self.Evict()
+            num = self.head
+            self.times[ num ] = sample.time
+            for name, values in self.values.items():
+                value = getattr( sample, name )
+                values[ num ] = SYR_BIN_MISSING if value is None else value
+            self.head     = ( num + 1 ) % self.capacity
+            self.count    = min( self.count + 1, self.capacity )
+            self.inWindow += 1
+            if sample.flow is not None:
+                self.flowSum   += sample.flow
+                self.flowCount += 1
+            while self.inWindow > 0 and self.times[ self.tail ] <= sample.time - self.window:
+                self.Evict()
+
+            # the previous poll's flow, for the time until this one
+            if self.last is not None and self.last.flow is not None and 0 < sample.time - self.last.time <= self.maxGap:
+                self.valveVolume += self.last.flow * ( sample.time - self.last.time ) / 3600.0
+            if sample.valve is not None and sample.valve != self.valve:
+                self.valve       = sample.valve
+                self.valveTime   = sample.time
+                self.valveVolume = 0.0
+            self.last = sample
+
+    def Evict( self ):
+        """Drop the oldest poll from the window; with the lock held.
+        """
+        if ( flow := self.values[ "flow" ][ self.tail ] ) != SYR_BIN_MISSING:
+            self.flowSum   -= flow
+            self.flowCount -= 1
+        self.tail      = ( self.tail + 1 ) % self.capacity
+        self.inWindow -= 1
+
+    def FlowMean( self ):
+        """Returns: the mean flow of the last 'window' seconds in L/h, or None without any answered poll
+        """
+        with self.lock:
+            return self.flowSum / self.flowCount if self.flowCount else None
+
+    def VolumeSinceValve( self ):
+        """Returns: a tuple ( liters since the valve changed its state, time of the change or None )
+        """
+        with self.lock:
+            return ( self.valveVolume, self.valveTime )
+
+    def Series( self, name, seconds = None ):
+        """Returns: a tuple of two arrays ( times, values ) of a value (see FIELDS), oldest first; only the last
+        'seconds' seconds, if given; missing values are SYR_BIN_MISSING
+        """
+        with self.lock:
+            first  = ( self.head - self.count ) % self.capacity
+            times  = self.times[ first : first + self.count ] + self.times[ : max( 0, first + self.count - self.capacity ) ]
+            values = self.values[ name ]
+            values = values[ first : first + self.count ] + values[ : max( 0, first + self.count - self.capacity ) ]
+        if seconds is not None and times:
+            start  = bisect.bisect_right( times, times[-1] - seconds )
+            times  = times[ start: ]
+            values = values[ start: ]
+        return ( times, values )
+
+    def Status( self ):
+        """Returns: the aggregates and the buffer's size, as a JSON serializable dictionary
+        """
+        volume, since = self.VolumeSinceValve()
+        return { "polls": self.count, "capacity": self.capacity,
+                 "bytes": self.times.itemsize * self.capacity + sum( values.itemsize * self.capacity for values in self.values.values() ),
+                 "window": self.window, "flowMean": self.FlowMean(), "valve": self.valve, "valveTime": since, "valveVolume": volume }
+
+
+_syrHistories     = {}
+_syrHistoriesLock = threading.Lock()
+
+def GetHistory( ipaddr = None, period = None ):
+    """Returns: the SyrHistory_class object of a device, created on first use with 'period', the device's
+    rate; None if APP_HISTORY is 0
+    """
+    if APP_HISTORY <= 0:
+        return None
+    if ipaddr is None:
+        ipaddr = SYR_IPADDR
+    with _syrHistoriesLock:
+        if ( history := _syrHistories.get( ipaddr ) ) is None:
+            history = _syrHistories[ ipaddr ] = SyrHistory_class( period = period )
+        return history
+
+
+#############################################################################################################
+## SyrSink_class
+#############################################################################################################
+class SyrSink_class:
+    # A stage of the output pipeline (see SyrPipeline_class): takes records from the sampler and writes
+    # them from its own thread, so a slow disk or a blocked terminal never delays a poll. Items are queued;
+    # whatever piled up while the output was busy is formatted and written as a single batch. It is flushed
+    # after 'flushLines' lines, at least every 'flushSecs' seconds and right away after an "urgent" item.
+    # If the queue is full, policy "drop" drops the new item, "block" makes the sampler wait for the sink
+    # (backpressure); both are counted, see Status(). If writing fails (OSError, e.g. a full disk), the lines
+    # are counted as dropped and the first error is printed; the sink keeps going.
+    # Subclasses implement Output() and Flush(), and Format() if they take more than plain lines.
+    def __init__( self, name, flushLines = None, flushSecs = None, maxQueue = None, policy = None ) -> None:
+        self.name       = name
+        self.ipaddr     = None          # only records of this device; None = all; see SyrPipeline_class.Add()
+        self.flushLines = APP_FLUSHLINES if flushLines is None else flushLines
+        self.flushSecs  = APP_FLUSHSECS  if flushSecs  is None else flushSecs
+        self.policy     = ( APP_SINKPOLICY or "drop" ) if policy is None else policy
+        self.queue      = queue.Queue( APP_WRITERQUEUE if maxQueue is None else maxQueue )
+        self.items      = 0             # items handed in
+        self.lines      = 0             # lines (or rows) written so far
+        self.writes     = 0             # number of (batched) writes
+        self.flushes    = 0
+        self.dropped    = 0             # items dropped because the queue was full (or lost otherwise)
+        self.waits      = 0             # times the sampler had to wait for a full queue; policy "block"
+        self.blocked    = 0.0           # ... and how long, in seconds
+        self.maxQueued  = 0             # most items that were waiting at once
+        self.errors     = 0             # failed writes and flushes; see Error()
+        self.lock       = threading.Lock()   # for the counters; the samplers and the sink's thread update them
+        self.thread     = None
+
+    def Start( self ):
+        """Start the sink's thread; at the end of a subclass' __init__().
+        """
+        self.thread = threading.Thread( target = self.Run, name = "syrsink", daemon = True )
+        self.thread.start()
+
+    def Write( self, item, urgent = False ):
+        """Queue an item: a SyrRecord_class or anything Format() takes as it is, e.g. a line.
+        Never blocks, unless the policy is "block" and the queue is full.
+        urgent: flush (and fsync) as soon as it is written, e.g. for alarms
+        """
+        with self.lock:
+            self.items += 1
+        try:
+            self.queue.put_nowait( ( item, urgent ) )
+        except queue.Full:
+            if self.policy != "block":
+                with self.lock:
+                    self.dropped += 1
+                return
+            tStart  = time.perf_counter()
+            dropped = 0
+            while True:
+                try:
+                    self.queue.put( ( item, urgent ), timeout = 1.0 )
+                    break
+                except queue.Full:
+                    # nobody will ever make room
+                    if self.thread is None or not self.thread.is_alive():
+                        dropped = 1
+                        break
+            with self.lock:
+                self.dropped += dropped
+                self.waits   += 1
+                self.blocked += time.perf_counter() - tStart
+        queued = self.queue.qsize()
+        with self.lock:
+            self.maxQueued = max( self.maxQueued, queued )
+
+    def Format( self, item ):
+        """Turn an item into what Output() writes; in the sink's thread.
+
+        Returns: a list; empty if there is nothing to write
+        """
+        return [ item ]
+
+    def Finish( self ):
+        """Returns: a list with what is still to be written on Close(), e.g. the end of a "--changeonly" run
+        """
+        return []
+
+    def Output( self, lines ):
+        """Write a batch; in the sink's thread.
+
+        Returns: True if the batch went to a new file, see SyrLogWriter_class
+        """
+        raise NotImplementedError
+
+    def Flush( self ):
+        """Flush what was written; in the sink's thread.
+        """
+        pass
+
+    def Run( self ):
+        """The sink's thread; runs until Close() is called.
+        """
+        pending   = 0
+        lastFlush = time.monotonic()
+        stop      = False
+        while not stop:
+            timeout = None
+            if pending > 0 and self.flushSecs is not None:
+                timeout = max( 0.0, lastFlush + self.flushSecs - time.monotonic() )
+            try:
+                batch = [ self.queue.get( timeout = timeout ) ]
+            except queue.Empty:
+                batch = []
+            while True:
+                try:
+                    batch.append( self.queue.get_nowait() )
+                except queue.Empty:
+                    break
+
+            urgent = False
+            lines  = []
+            for item, itemUrgent in batch:
+                if item is None:
+                    stop = True
+                    lines.extend( self.Finish() )
+                else:
+                    lines.extend( self.Format( item ) )
+                urgent = urgent or itemUrgent
+
+            if lines:
+                try:
+                    if self.Output( lines ):
+                        pending = 0
+                    with self.lock:
+                        self.lines  += len( lines )
+                        self.writes += 1
+                    pending += len( lines )
+                except OSError as e:
+                    # if this thread died, the queue would fill up and stay full
+                    self.Error( e, len( lines ) )
+
+            now = time.monotonic()
+            if pending > 0 and ( urgent or stop or pending >= self.flushLines or
+                                 ( self.flushSecs is not None and now - lastFlush >= self.flushSecs ) ):
+                try:
+                    self.Flush()
+                    with self.lock:
+                        self.flushes += 1
+                except OSError as e:
+                    # what was not flushed is most likely lost
+                    self.Error( e, pending )
+                pending   = 0
+                lastFlush = now
+
+    def Error( self, e, lines ):
+        """Writing (or flushing) failed; count the lines as dropped. Only the first error is printed.
+        """
+        with self.lock:
+            self.dropped += lines
+            self.errors  += 1
+            first         = self.errors == 1
+        if first:
+            print( "ERROR: " + self.name + ": " + str( e ), file=sys.stderr, flush=True )
+
+    def Status( self ):
+        """Returns: the sink's counters, as a JSON serializable dictionary
+        """
+        with self.lock:
+            return { "name": self.name, "policy": self.policy, "queued": self.queue.qsize(), "maxQueued": self.maxQueued,
+                     "capacity": self.queue.maxsize, "items": self.items, "lines": self.lines, "writes": self.writes,
+                     "flushes": self.flushes, "dropped": self.dropped, "errors": self.errors, "waits": self.waits,
+                     "blocked": self.blocked }
+
+    def Close( self ):
+        """Write and flush everything that is queued, then stop the thread.
+        """
+        if self.thread is None:
+            return
+        # a thread that is gone will never make room in a full queue
+        while self.thread.is_alive():
+            try:
+                self.queue.put( ( None, True ), timeout = 1.0 )
+                break
+            except queue.Full:
+                pass
+        self.thread.join()
+        self.thread = None
+        if self.dropped > 0:
+            print( "WARNING: " + self.name + ": " + str( self.dropped ) + " item(s) dropped; " +
+                   ( str( self.errors ) + " failed write(s)" if self.errors > 0 else "it was too slow" ),
+                   file=sys.stderr, flush=True )
+
+
+#############################################################################################################
+## SyrStdoutSink_class
+#############################################################################################################
+class SyrStdoutSink_class( SyrSink_class ):
+    # Prints the polls in human readable form; with several devices, each line starts with the device's
+    # address. A terminal that is paused (CTRL-S) or a pipe nobody reads only stalls this thread.
+    def __init__( self, prefix = False, fout = None, maxQueue = None, policy = None ) -> None:
+        super().__init__( "stdout", 1, None, maxQueue, policy )
+        self.prefix = prefix            # start each line with the device's address
+        self.fout   = sys.stdout if fout is None else fout
+        self.Start()
+
+    def Format( self, item ):
+        if not isinstance( item, SyrRecord_class ):
+            return [ item ]
+        if item.kind == SyrRecord_class.POLL:
+            line = FormatLogLines( item.data, item.timeHuman, item.timeMachine )[0]
+        else:
+            line = item.line
+        return [ item.ipaddr + "; " + line if self.prefix else line ]
+
+    def Output( self, lines ):
+        try:
+            self.fout.write( "".join( line + "\n" for line in lines ) )
+        except OSError:
+            # e.g. a closed pipe; nothing left to print to
+            with self.lock:
+                self.dropped += len( lines )
+        return False
+
+    def Flush( self ):
+        try:
+            self.fout.flush()
+        except OSError:
+            pass
+
+
+#############################################################################################################
+## SyrLogWriter_class
+#############################################################################################################
+class SyrLogWriter_class( SyrSink_class ):
+    # Writes a log file from its own thread, so a slow disk (SD cards!) never delays a poll; see SyrSink_class.
+    # The file is flushed after APP_FLUSHLINES lines, at least every APP_FLUSHSECS seconds and right away
+    # after an "urgent" line, e.g. an alarm; with APP_FSYNC, it is also fsync'ed.
+    # With APP_CHANGEONLY, polls go through a SyrRunLength_class first.
+    # With APP_ROTATESIZE or APP_ROTATEDAILY, a new file is started when the current one is full or
+    # a new day began (see LogSegmentName()); the old one is compressed (APP_COMPRESS) in yet another
+    # thread, and old files beyond APP_KEEP or APP_KEEPDAYS are deleted.
+    def __init__( self, fout, flushLines = None, flushSecs = None, fsync = None, maxQueue = None, policy = None,
+                  changeOnly = None ) -> None:
+        super().__init__( "log file", flushLines, flushSecs, maxQueue, policy )
+        self.fsync      = APP_FSYNC      if fsync      is None else fsync
+        self.rotateSize = APP_ROTATESIZE
+        self.rotateDay  = APP_ROTATEDAILY
+        self.runLength  = SyrRunLength_class() if ( APP_CHANGEONLY if changeOnly is None else changeOnly ) else None
+        self.rotations  = 0
+        self.helpers    = []            # threads compressing old files
+        self.helperLock = threading.Lock()
+
+        # a file name or a file object; the latter is never rotated
+        if isinstance( fout, str ):
+            self.name     = "log file " + fout
+            self.baseName = fout
+            if self.rotateSize is None and not self.rotateDay:
+                self.fileName = fout
+            else:
+                self.fileName = LogSegmentName( fout )
+            self.fout = open( self.fileName, "w+t" )
+        else:
+            self.baseName   = None
+            self.fileName   = None
+            self.fout       = fout
+            self.rotateSize = None
+            self.rotateDay  = False
+        self.size = 0                   # bytes in the current file
+        self.day  = time.strftime( "%Y%m%d" )
+
+        self.Start()
+
+    def Format( self, item ):
+        """Returns: the log file lines of a record; "--changeonly" often has none
+        """
+        if not isinstance( item, SyrRecord_class ):
+            return [ item ]
+        if item.kind == SyrRecord_class.POLL:
+            lineFile = FormatLogLines( item.data, item.timeHuman, item.timeMachine )[1]
+            return [ lineFile ] if self.runLength is None else self.runLength.Update( lineFile, item.time )
+        if item.kind == SyrRecord_class.MARKER and self.runLength is not None:
+            return self.runLength.End() + [ item.line ]
+        return [ item.line ]
+
+    def Finish( self ):
+        return [] if self.runLength is None else self.runLength.End()
+
+    def Output( self, lines ):
+        """Write a batch of lines; in the writer thread. Starts a new file first, if required.
+
+        Returns: True if a new file was started
+        """
+        rotated = False
+        if ( self.rotateSize is not None and self.size >= self.rotateSize ) or \
+           ( self.rotateDay and self.day != time.strftime( "%Y%m%d" ) ):
+            self.Rotate()
+            rotated = True
+        data = "".join( line + "\n" for line in lines )
+        self.fout.write( data )
+        # bytes, not characters, as they end up in the file; "--rotatesize" counts bytes
+        self.size += len( data.encode( getattr( self.fout, "encoding", None ) or "utf-8", "replace" ) )
+        return rotated
+
+    def Flush( self ):
+        """Flush (and fsync) what was written; in the writer thread.
+        """
+        self.fout.flush()
+        if self.fsync:
+            os.fsync( self.fout.fileno() )
+
+    def Rotate( self ):
+        """Close the current file and start a new one; compress the old one and apply the retention limits
+        in the background.
+        """
+        self.fout.flush()
+        if self.fsync:
+            os.fsync( self.fout.fileno() )
+        self.fout.close()
+        oldName       = self.fileName
+        self.fileName = LogSegmentName( self.baseName )
+        self.fout     = open( self.fileName, "w+t" )
+        self.size     = 0
+        self.day      = time.strftime( "%Y%m%d" )
+        self.rotations += 1
+
+        helper = threading.Thread( target = self.Retire, args = ( oldName, ), name = "syrcompress" )
+        helper.start()
+        self.helpers = [ thread for thread in self.helpers if thread.is_alive() ] + [ helper ]
+
+    def Retire( self, fileName ):
+        """Compress a closed file, then delete the oldest files of the series beyond APP_KEEP or APP_KEEPDAYS.
+        """
+        if APP_COMPRESS is not None:
+            CompressLogFile( fileName, APP_COMPRESS )
+        if APP_KEEP is None and APP_KEEPDAYS is None:
+            return
+
+        with self.helperLock:
+            # one entry per file; compressed or not, it might be both for a moment
+            segments = {}
+            for name in LogSegments( self.baseName ):
+                if name != self.fileName:
+                    segments.setdefault( os.path.splitext( name )[0] if name[-3:] in SYR_LOG_COMPRESSED else name, [] ).append( name )
+            doomed = []
+            if APP_KEEP is not None:
+                doomed += list( segments )[ : max( 0, len( segments ) - APP_KEEP ) ]
+            if APP_KEEPDAYS is not None:
+                limit = time.time() - APP_KEEPDAYS * 86400
+                for segment, names in segments.items():
+                    try:
+                        if max( os.path.getmtime( name ) for name in names ) < limit:
+                            doomed.append( segment )
+                    except OSError:
+                        pass
+            for segment in set( doomed ):
+                for name in segments[ segment ]:
+                    try:
+                        os.remove( name )
+                    except OSError:
+                        pass
+
+    def Close( self ):
+        """Write and flush everything that is queued, then close the file.
+        Waits for old files still being compressed.
+        """
+        if self.thread is None:
+            return
+        super().Close()
+        try:
+            self.fout.close()
+        except OSError as e:
+            self.Error( e, 0 )
+        for helper in self.helpers:
+            helper.join()
+
+
+#############################################################################################################
+## SQLite database
+#############################################################################################################
+# "--db": every poll as a row in a SQLite database, for all devices and runs, with typed values;
+# values that were not logged or were "ERROR" are NULL. "--dbimport" adds old log files.
+SYR_DB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    serial       TEXT    NOT NULL,       -- serial number of the device
+    time         INTEGER NOT NULL,       -- epoch seconds
+    valve        INTEGER,                -- 10, 11, 20, 21, 30
+    pressure     INTEGER,                -- mbar
+    flow         INTEGER,                -- L/h
+    volume       INTEGER,                -- mL of the ongoing consumption
+    lastvolume   INTEGER,                -- L of the last consumption
+    alarm        TEXT,                   -- "FF" = no alarm
+    conductivity INTEGER,                -- uS/cm
+    temperature  INTEGER,                -- raw, as logged
+    profile      INTEGER                 -- 1..8
+);
+CREATE INDEX IF NOT EXISTS samples_serial_time ON samples ( serial, time );
+"""
+SYR_DB_INSERT = "INSERT INTO samples VALUES ( ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ? )"
+
+
+#############################################################################################################
+## RecordToRow
+#############################################################################################################
+def RecordToRow( serial, record ):
+    """Turn a tuple from LogLineToRecord() into a row of the "samples" table.
+    """
+    epoch, pressure, flow, volume, lastVolume, cond, temp, valve, alarm, profile, flags = record
+    return ( serial, epoch, valve or None, *[ None if value == SYR_BIN_MISSING else value for value in ( pressure, flow, volume, lastVolume ) ],
+             "{:02X}".format( alarm ) if alarm else None, *[ None if value == SYR_BIN_MISSING else value for value in ( cond, temp ) ],
+             profile or None )
+
+
+#############################################################################################################
+## OpenDatabase
+#############################################################################################################
+def OpenDatabase( fileName ):
+    """Open (or create) the database; WAL mode, so others can read it while it is written.
+
+    Returns: the sqlite3 connection
+    """
+    import sqlite3
+    db = sqlite3.connect( fileName, timeout = 30 )
+    db.execute( "PRAGMA journal_mode = WAL" )
+    # NORMAL: after a power cut, the last transactions might be gone, but the database is fine
+    db.execute( "PRAGMA synchronous = " + ( "FULL" if APP_FSYNC else "NORMAL" ) )
+    db.executescript( SYR_DB_SCHEMA )
+    db.commit()
+    return db
+
+
+#############################################################################################################
+## SyrDbWriter_class
+#############################################################################################################
+class SyrDbWriter_class( SyrSink_class ):
+    # Writes rows (see RecordToRow()) into the database, like SyrLogWriter_class writes lines into the
+    # log file: from its own thread, in batches, with the same flush rules; a flush is a commit.
+    # A single one for all devices; sqlite3 connections must stay in the thread that opened them.
+    # Polls without a serial number are not written; takes rows as they are, too.
+    def __init__( self, fileName, flushLines = None, flushSecs = None, maxQueue = None, policy = None ) -> None:
+        super().__init__( "database " + fileName, flushLines, flushSecs, maxQueue, policy )
+        self.dbName = fileName
+        self.db     = None
+        # fail early, e.g. for a wrong path; the writer thread opens its own connection
+        OpenDatabase( fileName ).close()
+        self.Start()
+
+    def Format( self, item ):
+        if not isinstance( item, SyrRecord_class ):
+            return [ item ]
+        if item.kind != SyrRecord_class.POLL or item.serial is None:
+            return []
+        return [ RecordToRow( item.serial, item.sample.Record() ) ]
+
+    def Run( self ):
+        self.db = OpenDatabase( self.dbName )
+        try:
+            super().Run()
+        finally:
+            self.db.close()
+
+    def Output( self, rows ):
+        import sqlite3
+        try:
+            self.db.executemany( SYR_DB_INSERT, rows )
+        except sqlite3.Error as e:
+            self.Error( e, len( rows ) )
+        return False
+
+    def Flush( self ):
+        import sqlite3
+        try:
+            self.db.commit()
+        except sqlite3.Error as e:
+            self.Error( e, 0 )
+
+
+#############################################################################################################
+## SyrPipeline_class
+#############################################################################################################
+class SyrPipeline_class:
+    # The output of the loggers: the sampler (the polling loop) only fetches and hands each record to Put();
+    # formatting, printing and writing happen in the sinks (stdout, log files, database), each with its own
+    # queue, thread and policy for a full queue; see SyrSink_class. A log file only gets its own device's records.
+    def __init__( self ) -> None:
+        self.sinks = []
+
+    def Add( self, sink, ipaddr = None ):
+        """Add a sink; 'ipaddr' = only records of this device, None = all.
+
+        Returns: the sink
+        """
+        sink.ipaddr = ipaddr
+        self.sinks  = self.sinks + [ sink ]
+        return sink
+
+    def Put( self, record, urgent = False ):
+        """Hand a SyrRecord_class to all sinks that want it.
+        urgent: flush as soon as it is written, e.g. for alarms and "# GAP" lines
+        """
+        for sink in self.sinks:
+            if sink.ipaddr is None or sink.ipaddr == record.ipaddr:
+                sink.Write( record, urgent )
+
+    def Status( self ):
+        """Returns: a list with the counters of all sinks; see SyrSink_class.Status()
+        """
+        return [ sink.Status() for sink in self.sinks ]
+
+    def Print( self, file = sys.stderr ):
+        """Print a summary table, one line per sink.
+        """
+        status = self.Status()
+        if not status:
+            return
+        print( "Sinks:", file=file )
+        print( "    policy   items   lines  dropped  waits  blocked  queued  max queued  sink", file=file )
+        for s in status:
+            print( "    {:<6s} {:7d} {:7d} {:8d} {:6d} {:7.2f}s {:7d} {:11d}  {}".format(
+                   s[ "policy" ], s[ "items" ], s[ "lines" ], s[ "dropped" ], s[ "waits" ], s[ "blocked" ], s[ "queued" ],
+                   s[ "maxQueued" ], s[ "name" ] ), file=file )
+        file.flush()
+
+    def Close( self ):
+        """Write out and close all sinks; their counters stay available.
+        """
+        for sink in self.sinks:
+            sink.Close()
+
+
+_syrSinks = SyrPipeline_class()
+
+
+#############################################################################################################
+## Alarm hooks
+#############################################################################################################
+_syrHookPool     = None
+_syrHookPoolLock = threading.Lock()
+
+def MakeHook( action ):
+    """Turn an "--onalarm" action into a function that takes an event (see SyrAlarmWatch_class.Fire()):
+
+        http://... or https://...  - POST the event as JSON to this URL, e.g. a local Home Assistant webhook
+        py:module:function         - call a Python function with the event as dictionary
+        anything else              - run it as shell command; the event is in SYR_* environment variables
+                                     (SYR_DEVICE, SYR_KIND, SYR_OLD, SYR_NEW, SYR_TEXT, ...) and as JSON on stdin
+
+    A Python callable is returned as it is. Raises ValueError (or ImportError) if a "py:" function cannot be found.
+    """
+    if callable( action ):
+        return action
+    if action.startswith( ( "http://", "https://" ) ):
+        def Webhook( event ):
+            import requests
+            requests.post( action, json = event, timeout = SYR_TIMEOUT_MAX ).raise_for_status()
+        return Webhook
+    if action.startswith( "py:" ):
+        moduleName, _, functionName = action[3:].rpartition( ":" )
+        function = getattr( importlib.import_module( moduleName ), functionName, None ) if moduleName else None
+        if not callable( function ):
+            raise ValueError( "no such function: " + action[3:] )
+        return function
+    def Command( event ):
+        import subprocess
+        env = dict( os.environ, **{ "SYR_" + key.upper(): "" if value is None else str( value ) for key, value in event.items() } )
+        subprocess.run( action, shell = True, env = env, input = json.dumps( event ), text = True,
+                        timeout = APP_HOOKTIMEOUT, check = True, stdout = subprocess.DEVNULL )
+    return Command
+
+
+def RunHooks( hooks, event ):
+    """Run all hooks with an event, in the hook threads (APP_HOOKWORKERS); returns at once.
+    A hook that fails is reported on stderr; see SyrAlarmWatch_class for the counters.
+    """
+    global _syrHookPool
+
+    with _syrHookPoolLock:
+        if _syrHookPool is None:
+            import concurrent.futures
+            _syrHookPool = concurrent.futures.ThreadPoolExecutor( max_workers = APP_HOOKWORKERS, thread_name_prefix = "syrhook" )
+    return [ _syrHookPool.submit( hook, event ) for hook in hooks ]
+
+
+#############################################################################################################
+## SyrAlarmWatch_class
+#############################################################################################################
+SYR_ALARMWATCH_COMMANDS = [ SYR_CMD_ALARM, SYR_CMD_VALVE ]   # read by the watcher; the alarm first
+
+_syrAlarmWatches = {}               # ipaddr -> SyrAlarmWatch_class, for "--stats" and the exporter
+
+class SyrAlarmWatch_class:
+    # "--alarmwatch=n": reads the alarm (ALA) and the valve state (VLV) every n seconds, in its own thread,
+    # apart from the polls, which take these two from here instead of reading them again (see Latest()).
+    # A change of either is a transition: it is written to the log right away, e.g.
+    #   # ALARM Sat Oct 17 10:00:00 2026; FF -> A3; ALARM VOLUME LEAKAGE; detected within 0.52s
+    # and handed to the hooks ("--onalarm", see MakeHook()), which run in threads of their own, so a slow
+    # hook never delays the next read. The detection latency of a transition is the time from the last read
+    # that still had the old state to the first one with the new state; the change happened in between.
+    def __init__( self, ipaddr = None, period = None, hooks = None, serial = None ) -> None:
+        self.ipaddr      = SYR_IPADDR     if ipaddr is None else ipaddr
+        self.period      = APP_ALARMWATCH if period is None else period
+        self.hooks       = [ MakeHook( action ) for action in ( APP_HOOKS if hooks is None else hooks ) ]
+        self.serial      = serial
+        self.latest      = {}               # the raw values of the last read
+        self.known       = {}               # command -> ( last answered value, time.time() it was last read )
+        self.reads       = 0
+        self.transitions = 0
+        self.latencyLast = None             # detection latency of the last transition, in seconds
+        self.latencySum  = 0.0
+        self.latencyMax  = 0.0
+        self.hookCalls   = 0
+        self.hookErrors  = 0
+        self.lock        = threading.Lock()
+        self.stop        = threading.Event()
+        self.thread      = None
+
+    def Start( self ):
+        """Start reading, in a thread; the first read right away.
+        """
+        _syrAlarmWatches[ self.ipaddr ] = self
+        self.thread = threading.Thread( target = self.Run, name = "syralarmwatch", daemon = True )
+        self.thread.start()
+
+    def Run( self ):
+        scheduler = SyrScheduler_class( self.period )
+        self.Read()
+        while APP_STOP is False:
+            # no need to back off; while the device is down, its SyrLink_class only probes it now and then
+            scheduler.Advance()
+            if self.stop.wait( max( 0.0, scheduler.next - time.monotonic() ) ):
+                break
+            self.Read()
+
+    def Read( self ):
+        """Read the alarm and the valve state once and fire the transitions.
+        """
+        self.Update( GetDataMulti( SYR_ALARMWATCH_COMMANDS, ipaddr = self.ipaddr ), time.time() )
+
+    def Update( self, data, now ):
+        """Take the alarm and the valve state of a read, or of a replayed poll (see ReplayLogFiles()), and
+        fire the transitions.
+        """
+        events = []
+        with self.lock:
+            self.reads  += 1
+            self.latest  = data
+            for command, value in data.items():
+                if value == SYR_ERROR_STRING:
+                    continue
+                if ( known := self.known.get( command ) ) is not None and known[0] != value:
+                    events.append( ( command, known[0], value, now - known[1] ) )
+                self.known[ command ] = ( value, now )
+        for command, old, new, latency in events:
+            self.Fire( command, old, new, latency, now )
+
+    def Fire( self, command, old, new, latency, now ):
+        """Write a transition to the log and hand it to the hooks.
+        """
+        kind = "alarm" if command == SYR_CMD_ALARM else "valve"
+        text = SYR_ALARM_CODES.get( new, "UNKNOWN ERROR" ) if kind == "alarm" else SYR_VALVE_STATES.get( new, "UNKNOWN STATE" )
+        with self.lock:
+            self.transitions += 1
+            self.latencyLast  = latency
+            self.latencySum  += latency
+            self.latencyMax   = max( self.latencyMax, latency )
+
+        marker = SyrRecord_class( SyrRecord_class.MARKER, self.ipaddr, now = now )
+        marker.line = "# " + kind.upper() + " " + marker.timeHuman + "; " + old + " -> " + new + "; " + text + \
+                      "; detected within " + "{:.2f}s".format( latency )
+        _syrSinks.Put( marker, urgent = True )
+
+        event = { "device": self.ipaddr, "serial": self.serial, "kind": kind, "old": old, "new": new, "text": text,
+                  "time": now, "latency": latency }
+        for future in RunHooks( self.hooks, event ):
+            future.add_done_callback( self.HookDone )
+
+    def HookDone( self, future ):
+        with self.lock:
+            self.hookCalls += 1
+            if future.exception() is not None:
+                self.hookErrors += 1
+        if ( e := future.exception() ) is not None:
+            print( "ERROR: --onalarm hook for " + self.ipaddr + " failed: " + type( e ).__name__ + ": " + str( e )[:120],
+                   file=sys.stderr, flush=True )
+
+    def Latest( self ):
+        """Returns: the raw values of the last read, "ERROR" if it was not answered, for the polls;
+        None before the first read
+        """
+        with self.lock:
+            return dict( self.latest ) if self.reads > 0 else None
+
+    def Status( self ):
+        """Returns: the counters and latencies as a JSON serializable dictionary
+        """
+        with self.lock:
+            return { "period": self.period, "reads": self.reads, "transitions": self.transitions,
+                     "latencyLast": self.latencyLast, "latencyMax": self.latencyMax,
+                     "latencyMean": self.latencySum / self.transitions if self.transitions else None,
+                     "latencySum": self.latencySum, "hookCalls": self.hookCalls, "hookErrors": self.hookErrors,
+                     "state": { command: known[0] for command, known in self.known.items() } }
+
+    def Close( self ):
+        """Stop reading; hooks that are still running finish in the background.
+        """
+        self.stop.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+
+def PrintAlarmWatches( file = sys.stderr ):
+    """Print a summary table of all alarm watchers, one line per device ("--stats").
+    """
+    if not _syrAlarmWatches:
+        return
+    print( "Alarm watch:", file=file )
+    print( "    period   reads  transitions  latency mean    max  hooks  failed  device", file=file )
+    for ipaddr, watch in _syrAlarmWatches.items():
+        s = watch.Status()
+        print( "    {:5.2f}s {:7d} {:12d} {:12s} {:6.2f}s {:6d} {:7d}  {}".format(
+               s[ "period" ], s[ "reads" ], s[ "transitions" ],
+               "-" if s[ "latencyMean" ] is None else "{:.2f}s".format( s[ "latencyMean" ] ),
+               s[ "latencyMax" ], s[ "hookCalls" ], s[ "hookErrors" ], ipaddr ), file=file )
+    file.flush()
+
+
+#############################################################################################################
+## SyrMqttSource_class
+#############################################################################################################
+SYR_MQTT_PORT   = 1883              # default TCP port of the MQTT broker
+SYR_MQTT_SETTLE = 0.05              # seconds to wait for more values after a message; a device publishes several at once
+
+_syrMqttSources = {}                # ipaddr -> SyrMqttSource_class, for the exporter
+
+class SyrMqttSource_class:
+    # "--mqtt=host[:port]": takes the values the device publishes via MQTT instead of polling them.
+    # Subscribes to APP_MQTTTOPIC; the last level of a topic is the command, e.g. "safetec/123456789/FLO",
+    # and the payload either the JSON the REST API answers ({"getFLO": "420"}) or just the raw value.
+    # The polls only read what has not been pushed (yet), e.g. temperature or conductivity, and
+    # everything while the broker is not connected; a message ends the wait for the next poll early
+    # (see Wait()), so a change shows up in the log within a fraction of a second.
+    # Needs the paho-mqtt package, which is only imported if "--mqtt" is given.
+    def __init__( self, broker, topic = None, ipaddr = None ) -> None:
+        host, _, port = broker.partition( ":" )
+        self.ipaddr   = SYR_IPADDR if ipaddr is None else ipaddr
+        self.host     = host
+        self.port     = int( port ) if port else SYR_MQTT_PORT
+        self.topic    = APP_MQTTTOPIC if topic is None else topic
+        self.values   = {}              # command -> raw value, as pushed; cleared while not connected
+        self.connected = False
+        self.messages = 0               # messages received
+        self.invalid  = 0               # ... that were not understood
+        self.connects = 0               # connections to the broker, including reconnects
+        self.lastMessage = None         # time.time() of the last message
+        self.lock     = threading.Lock()
+        self.pushed   = threading.Event()
+        self.client   = None
+
+    def Start( self ):
+        """Connect to the broker, in the background; it reconnects on its own.
+        Raises ImportError without paho-mqtt.
+        """
+        import paho.mqtt.client as mqtt
+
+        if hasattr( mqtt, "CallbackAPIVersion" ):
+            # paho-mqtt 2.x
+            self.client = mqtt.Client( mqtt.CallbackAPIVersion.VERSION2 )
+        else:
+            self.client = mqtt.Client()
+        self.client.on_connect    = self.OnConnect
+        self.client.on_disconnect = self.OnDisconnect
+        self.client.on_message    = self.OnMessage
+        self.client.reconnect_delay_set( 1, 30 )
+        self.client.connect_async( self.host, self.port, keepalive = 30 )
+        self.client.loop_start()
+        _syrMqttSources[ self.ipaddr ] = self
+
+    def OnConnect( self, client, userdata, flags, result, properties = None ):
+        # "result" is an int in paho-mqtt 1.x, a ReasonCode in 2.x
+        if getattr( result, "value", result ) != 0:
+            return
+        with self.lock:
+            self.connected = True
+            self.connects += 1
+        client.subscribe( self.topic )
+
+    def OnDisconnect( self, client, userdata, *args ):
+        # until it is back, everything is polled again
+        with self.lock:
+            self.connected = False
+            self.values    = {}
+
+    def OnMessage( self, client, userdata, message ):
+        command = message.topic.rpartition( "/" )[2].upper()
+        try:
+            payload = message.payload.decode()
+            if payload.startswith( "{" ):
+                values = { key[3:].upper(): str( value ) for key, value in json.loads( payload ).items() if key.startswith( "get" ) }
+            else:
+                values = { command[3:] if command.startswith( "GET" ) else command: payload.strip() }
+        except ( ValueError, AttributeError ):
+            values = {}
+        with self.lock:
+            self.messages   += 1
+            self.lastMessage = time.time()
+            if not values:
+                self.invalid += 1
+                return
+            self.values.update( values )
+        self.pushed.set()
+
+    def Latest( self ):
+        """Returns: a dictionary with the raw values pushed so far, for the polls; empty while not connected
+        """
+        with self.lock:
+            return dict( self.values ) if self.connected else {}
+
+    def Wait( self, timeout ):
+        """Wait up to 'timeout' seconds for a message, and then a little longer for the rest of them.
+
+        Returns: True if a message came in
+        """
+        deadline = time.monotonic() + timeout
+        while APP_STOP is False and ( remaining := deadline - time.monotonic() ) > 0:
+            # wakes up now and then, to check for CTRL-C
+            if self.pushed.wait( min( remaining, 0.5 ) ):
+                _syrStopEvent.wait( SYR_MQTT_SETTLE )
+                self.pushed.clear()
+                return True
+        return False
+
+    def Status( self ):
+        """Returns: the counters as a JSON serializable dictionary
+        """
+        with self.lock:
+            return { "broker": self.host + ":" + str( self.port ), "topic": self.topic, "connected": self.connected,
+                     "connects": self.connects, "messages": self.messages, "invalid": self.invalid,
+                     "lastMessage": self.lastMessage, "pushed": sorted( self.values ) }
+
+    def Close( self ):
+        if self.client is not None:
+            self.client.disconnect()
+            self.client.loop_stop()
+            self.client = None
+
+
+#############################################################################################################
+## ImportLogFile
+#############################################################################################################
+def ImportLogFile( db, fileName, serial ):
+    """Import a text log file into the database, in a single transaction.
+    A file whose first poll is in there already (same serial, same time) is skipped.
+
+    db    : from OpenDatabase()
+    serial: serial number of the device; the log files do not have it
+
+    Returns: a tuple ( rows imported, lines skipped ) or None if it was imported before
+    """
+    rows    = []
+    count   = skipped = 0
+    with OpenLogFile( fileName ) as fin, db:
+        for line in ExpandLogLines( fin ):
+            if line.startswith( "#" ):
+                continue
+            if ( record := LogLineToRecord( line ) ) is None:
+                skipped += 1
+                continue
+            if count == 0 and not rows and \
+               db.execute( "SELECT 1 FROM samples WHERE serial = ? AND time = ? LIMIT 1", ( serial, record[0] ) ).fetchone() is not None:
+                return None
+            rows.append( RecordToRow( serial, record ) )
+            if len( rows ) >= 10000:
+                db.executemany( SYR_DB_INSERT, rows )
+                count += len( rows )
+                rows   = []
+        db.executemany( SYR_DB_INSERT, rows )
+        count += len( rows )
+    return ( count, skipped )
+
+
+#############################################################################################################
+## StopHandler
+#############################################################################################################
+_syrStopEvent = threading.Event()
+
+def StopHandler( signum = None, frame = None ):
+    """Signal handler for SIGTERM and SIGINT (CTRL-C). The loggers stop after the current poll, instead of
+    somewhere in between, so everything that was polled ends up in the log file.
+    """
+    global APP_STOP
+    APP_STOP = True
+    _syrStopEvent.set()
+
+
+#############################################################################################################
+## SyrRunLength_class
+#############################################################################################################
+class SyrRunLength_class:
+    # "--changeonly": a line is only written to the log file if any of its values changed, or at least
+    # every APP_HEARTBEAT seconds. When a run of identical lines ends, a marker tells how many polls it
+    # covered and how long it lasted, from the first to the last poll:
+    #   2026;10;17; 10;00;00; 20; 5000; 0; 0; 7; FF
+    #   # RUN 150 polls; 298.0s
+    # ExpandLogLines() turns this back into all 150 lines, with the polls evenly spaced in time.
+    # The pressure sensor flickers by a step or two all the time. Optionally, pressure changes of up to
+    # APP_PRESSUREBAND mbar against the run's first line do not end a run. That is lossy: the expanded lines
+    # then all have the first line's pressure. By default (0), runs are exact.
+    def __init__( self, heartbeat = None, pressureBand = None ) -> None:
+        self.heartbeat   = APP_HEARTBEAT    if heartbeat    is None else heartbeat
+        self.band        = APP_PRESSUREBAND if pressureBand is None else pressureBand
+        self.values      = None             # values of the current run, but the pressure; None = no run
+        self.pressure    = None             # pressure of the current run in mbar; None = not a number
+        self.pressureRaw = None             # ... as logged
+        self.count       = 0                # polls in the current run
+        self.first       = 0.0              # time.time() of the first poll of the run
+        self.last        = 0.0              # ... and of the last one
+
+    def Update( self, lineFile, now = None ):
+        """lineFile: a log file line, as from FormatLogLines()
+        now     : time.time() of the poll; None = now
+
+        Returns: a list with the lines to be written to the log file; often empty
+        """
+        now   = time.time() if now is None else now
+        # "valve; pressure; flow; ..."
+        valve, pressureRaw, rest = ( lineFile.split( "; ", 2 )[2].split( "; ", 2 ) + [ "", "" ] )[:3]
+        values   = valve + "; " + rest
+        pressure = RawToInt( pressureRaw )
+        if values == self.values and now - self.first < self.heartbeat and \
+           ( ( pressure is not None and self.pressure is not None and abs( pressure - self.pressure ) <= self.band ) or
+             ( pressure is None and self.pressure is None and pressureRaw == self.pressureRaw ) ):
+            self.count += 1
+            self.last   = now
+            return []
+        lines            = self.End() + [ lineFile ]
+        self.values      = values
+        self.pressure    = pressure
+        self.pressureRaw = pressureRaw
+        self.count       = 1
+        self.first       = self.last = now
+        return lines
+
+    def End( self ):
+        """End the current run, e.g. before a gap or on exit.
+
+        Returns: a list with the "# RUN" line, if the run has more than a single poll
+        """
+        lines = []
+        if self.count > 1:
+            lines.append( "# RUN " + str( self.count ) + " polls; " + "{:.1f}s".format( self.last - self.first ) )
+        self.values = None
+        self.count  = 0
+        return lines
+
+
+#############################################################################################################
+## ExpandLogLines
+#############################################################################################################
+def ExpandLogLines( lines ):
+    """Expand the lines of a "--changeonly" log file to the full series, one line per poll; see SyrRunLength_class.
+    Other lines, e.g. of normal log files, are passed through unchanged.
+
+    lines: iterable with the lines of a log file, e.g. a file object
+
+    Returns: a generator with the expanded lines, without "\n"
+    """
+    last = None
+    for line in lines:
+        line = line.rstrip( "\n" )
+        if ( run := re.match( r"^# RUN (\d+) polls; ([\d.]+)s$", line ) ) is None:
+            if not line.startswith( "#" ):
+                last = line
+            yield line
+            continue
+        if last is None:
+            continue
+        count, seconds = int( run.group(1) ), float( run.group(2) )
+        start          = time.mktime( time.strptime( last[:20], "%Y;%m;%d; %H;%M;%S" ) )
+        for num in range( 1, count ):
+            stamp = time.strftime( "%Y;%m;%d; %H;%M;%S", time.localtime( start + seconds * num / ( count - 1 ) ) )
+            yield stamp + last[20:]
+        last = None
+
+
+#############################################################################################################
+## Binary log files
+#############################################################################################################
+# "--convert": a compact binary form of the text log, for tools that read months of it.
+# A 16 byte header (SYR_BIN_HEADER: magic, version, size of a record), then fixed-width little-endian
+# records, one per poll, without any padding. Values that were not logged or were "ERROR" are SYR_BIN_MISSING
+# (0 for the valve, alarm and profile codes). The alarm is stored as its hex code, e.g. "A3" -> 0xA3.
+SYR_BIN_MAGIC   = b"SYRLOG\0\0"
+SYR_BIN_VERSION = 1
+SYR_BIN_HEADER  = struct.Struct( "<8sII" )
+SYR_BIN_FIELDS  = [ ( "time",         "q" ),       # epoch seconds
+                    ( "pressure",     "i" ),       # mbar
+                    ( "flow",         "i" ),       # L/h
+                    ( "volume",       "i" ),       # mL of the ongoing consumption
+                    ( "lastvolume",   "i" ),       # L of the last consumption
+                    ( "conductivity", "i" ),       # uS/cm
+                    ( "temperature",  "i" ),       # raw, as logged
+                    ( "valve",        "B" ),       # 10, 11, 20, 21, 30
+                    ( "alarm",        "B" ),       # 0xFF = no alarm
+                    ( "profile",      "B" ),       # 1..8
+                    ( "flags",        "B" ) ]      # SYR_BIN_GAP
+SYR_BIN_RECORD  = struct.Struct( "<" + "".join( code for name, code in SYR_BIN_FIELDS ) )
+SYR_BIN_MISSING = -2**31
+SYR_BIN_GAP     = 0x01                             # flag: first record after a "# GAP"
+
+
+#############################################################################################################
+## LogLineEpoch
+#############################################################################################################
+_syrEpochCache = {}
+
+def LogLineEpoch( line ):
+    """Returns: the time of a log file line ("2026;10;17; 10;00;00; ...") as epoch seconds
+
+    Raises ValueError if there is no time stamp.
+    """
+    # mktime() is slow; a minute always has 60 seconds, though
+    minute = line[:17]
+    if ( epoch := _syrEpochCache.get( minute ) ) is None:
+        if len( _syrEpochCache ) > 10000:
+            _syrEpochCache.clear()
+        epoch = _syrEpochCache[ minute ] = int( time.mktime( time.strptime( minute, "%Y;%m;%d; %H;%M" ) ) )
+    if line[17:18] != ";":
+        raise ValueError( "no time stamp" )
+    return epoch + int( line[18:20] )
+
+
+#############################################################################################################
+## LogLineToRecord
+#############################################################################################################
+def LogLineToRecord( line, flags = 0 ):
+    """Turn a line of a text log file into a tuple for SYR_BIN_RECORD.
+    The optional columns must match APP_LOGCONDUCTIVITY, APP_LOGTEMPERATURE and APP_LOGPROFILE.
+
+    Returns: the tuple, in the order of SYR_BIN_FIELDS, or None if the line cannot be parsed
+    """
+    fields = line.rstrip( "\n" ).split( "; " )
+    if len( fields ) == 7:
+        # before 03/2024, there was no alarm column
+        fields.append( SYR_ERROR_STRING )
+    elif len( fields ) != 8 + APP_LOGCONDUCTIVITY + APP_LOGTEMPERATURE + APP_LOGPROFILE:
+        return None
+
+    def Number( value ):
+        try:
+            return int( value )
+        except ValueError:
+            # "--raw" files still have units, e.g. "5000 mbar"
+            match = re.match( r"-?\d+", value )
+            return int( match.group() ) if match is not None else SYR_BIN_MISSING
+
+    try:
+        epoch = LogLineEpoch( line )
+        valve = int( fields[2] ) if fields[2].isdigit() else 0
+        alarm = int( fields[7], 16 ) if fields[7] != SYR_ERROR_STRING else 0
+        extra = fields[8:]
+        cond  = Number( extra.pop( 0 ) ) if APP_LOGCONDUCTIVITY else SYR_BIN_MISSING
+        temp  = Number( extra.pop( 0 ) ) if APP_LOGTEMPERATURE  else SYR_BIN_MISSING
+        prof  = Number( extra.pop( 0 ) ) if APP_LOGPROFILE      else 0
+        return ( epoch, Number( fields[3] ), Number( fields[4] ), Number( fields[5] ), Number( fields[6] ),
+                 cond, temp, valve, alarm, max( 0, min( 255, prof ) ), flags )
+    except ( ValueError, OverflowError, IndexError ):
+        return None
+
+
+#############################################################################################################
+## LogLineToData
+#############################################################################################################
+def LogLineToData( line ):
+    """Turn a line of a text log file back into the raw values of its poll, as GetDataMulti() returned them
+    for GetLogCommands(); values are as logged, so without units unless the file was written with "--raw".
+    The optional columns must match APP_LOGCONDUCTIVITY, APP_LOGTEMPERATURE and APP_LOGPROFILE.
+
+    Returns: a tuple ( epoch seconds, dictionary with the raw values ) or None if the line cannot be parsed
+    """
+    fields = line.rstrip( "\n" ).split( "; " )
+    if len( fields ) == 7:
+        # before 03/2024, there was no alarm column
+        fields.append( SYR_ERROR_STRING )
+    elif len( fields ) != 8 + APP_LOGCONDUCTIVITY + APP_LOGTEMPERATURE + APP_LOGPROFILE:
+        return None
+    try:
+        epoch = LogLineEpoch( line )
+    except ( ValueError, OverflowError ):
+        return None
+    return ( epoch, dict( zip( GetLogCommands(), fields[2:] ) ) )
+
+
+#############################################################################################################
+## ReplayLogFile
+#############################################################################################################
+SYR_REPLAY_DEVICE = "replay"        # the device "--replay" records come from, for the sinks and the exporter
+
+def ReplayLogFile( fileName, speed = 0, ipaddr = SYR_REPLAY_DEVICE, serial = None, watch = None, polls = 0 ):
+    """Feed a text log file (compressed or not, "--changeonly" or not) through the output pipeline, as if
+    its polls were just made: each line becomes a SyrRecord_class with the time it was logged at and goes
+    to the history, the exporter and the sinks, like the polls of the main loop. "# GAP", "# ALARM", ...
+    lines are passed on as they are, "# RUN" lines are expanded.
+
+    speed : 1 = real time, n = n times faster, 0 = as fast as possible; the time between files is skipped
+    serial: serial number of the device, for the database; the log files do not have it
+    watch : a SyrAlarmWatch_class that is not started; it gets the alarm and valve state of each poll and
+            fires the transitions and the hooks. The file's own "# ALARM" and "# VALVE" lines are dropped then.
+    polls : records replayed before, for the exporter's poll counter
+
+    Returns: a tuple ( polls replayed, other lines replayed, lines skipped, seconds of log time )
+    """
+    history = GetHistory( ipaddr )
+    records = markers = skipped = 0
+    first   = last = None
+    with OpenLogFile( fileName ) as fin:
+        for line in ExpandLogLines( fin ):
+            if APP_STOP:
+                break
+            if line.startswith( "#" ):
+                if watch is not None and line.startswith( ( "# ALARM", "# VALVE" ) ):
+                    continue
+                kind    = SyrRecord_class.NOTE if line.startswith( "# STATS" ) else SyrRecord_class.MARKER
+                markers += 1
+                _syrSinks.Put( SyrRecord_class( kind, ipaddr, line = line, serial = serial, now = last ),
+                               urgent = kind == SyrRecord_class.MARKER )
+                continue
+            if ( parsed := LogLineToData( line ) ) is None:
+                skipped += 1
+                continue
+            epoch, data = parsed
+
+            # the wall clock follows the log's clock, from the first poll of the file on
+            if first is None:
+                first = ( epoch, time.monotonic() )
+            elif speed > 0 and ( wait := first[1] + ( epoch - first[0] ) / speed - time.monotonic() ) > 0:
+                if _syrStopEvent.wait( wait ):
+                    break
+            last = epoch
+
+            record = SyrRecord_class( SyrRecord_class.POLL, ipaddr, serial = serial, now = epoch )
+            record.Parse( data )
+            records += 1
+            if watch is not None:
+                watch.Update( { command: data[ command ] for command in SYR_ALARMWATCH_COMMANDS }, epoch )
+            if APP_HTTPPORT is not None:
+                _syrMetrics.Update( ipaddr, data, polls + records, 0, True, serial )
+            if history is not None:
+                history.Append( record.sample )
+            _syrSinks.Put( record, urgent = data[ SYR_CMD_ALARM ] not in ( "FF", SYR_ERROR_STRING ) )
+    return ( records, markers, skipped, 0 if first is None else last - first[0] )
+
+
+#############################################################################################################
+## BinLogName
+#############################################################################################################
+def BinLogName( fileName ):
+    """Returns: the name of the binary file for a text log file; ".bin" instead of ".log[.gz|.xz]"
+    """
+    return re.sub( r"(\.log)?(\.gz|\.xz)?$", "", fileName, count = 1 ) + ".bin"
+
+
+#############################################################################################################
+## ConvertLogFile
+#############################################################################################################
+def ConvertLogFile( fileName, binName = None ):
+    """Convert a text log file (compressed or not, "--changeonly" or not) into a binary one.
+    "# RUN" lines are expanded, a "# GAP" sets SYR_BIN_GAP in the next record, other "#" lines are dropped.
+
+    binName: name of the binary file; None = fileName with ".bin" instead of ".log[.gz|.xz]"
+
+    Returns: a tuple ( name of the binary file, records written, lines skipped )
+    """
+    if binName is None:
+        binName = BinLogName( fileName )
+    records = skipped = 0
+    flags   = 0
+    with OpenLogFile( fileName ) as fin, open( binName + ".tmp", "wb" ) as fout:
+        fout.write( SYR_BIN_HEADER.pack( SYR_BIN_MAGIC, SYR_BIN_VERSION, SYR_BIN_RECORD.size ) )
+        batch = []
+        for line in ExpandLogLines( fin ):
+            if line.startswith( "#" ):
+                if line.startswith( "# GAP" ):
+                    flags = SYR_BIN_GAP
+                continue
+            if ( record := LogLineToRecord( line, flags ) ) is None:
+                skipped += 1
+                continue
+            batch.append( SYR_BIN_RECORD.pack( *record ) )
+            flags = 0
+            if len( batch ) >= 10000:
+                fout.write( b"".join( batch ) )
+                records += len( batch )
+                batch    = []
+        fout.write( b"".join( batch ) )
+        records += len( batch )
+    os.replace( binName + ".tmp", binName )
+    return ( binName, records, skipped )
+
+
+#############################################################################################################
+## SyrBinLog_class
+#############################################################################################################
+class SyrBinLog_class:
+    # Read-only access to a binary log file (see ConvertLogFile()), memory-mapped; nothing is read
+    # until it is accessed, and the OS caches it. With numpy, Records() is a structured array right on
+    # the mapped file, so Column( "flow" ) is a view, without copying; without numpy, records are
+    # unpacked one by one, straight from the map.
+    #   with SyrBinLog_class( "x.bin" ) as log:
+    #       print( len( log ), log[-1], log.Column( "pressure" ).mean() )
+    def __init__( self, fileName ) -> None:
+        import mmap
+        self.fileName = fileName
+        self.file     = open( fileName, "rb" )
+        try:
+            self.map = mmap.mmap( self.file.fileno(), 0, access = mmap.ACCESS_READ )
+        except ( ValueError, OSError ):
+            self.file.close()
+            raise ValueError( fileName + ": not a binary log file" )
+        if len( self.map ) < SYR_BIN_HEADER.size or SYR_BIN_HEADER.unpack_from( self.map ) != ( SYR_BIN_MAGIC, SYR_BIN_VERSION, SYR_BIN_RECORD.size ):
+            self.Close()
+            raise ValueError( fileName + ": not a binary log file, or a different version" )
+        self.count   = ( len( self.map ) - SYR_BIN_HEADER.size ) // SYR_BIN_RECORD.size
+        self.records = None
+
+    def __len__( self ):
+        return self.count
+
+    def __getitem__( self, index ):
+        """Returns: a single record as tuple, in the order of SYR_BIN_FIELDS
+        """
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError( "record index out of range" )
+        return SYR_BIN_RECORD.unpack_from( self.map, SYR_BIN_HEADER.size + index * SYR_BIN_RECORD.size )
+
+    def __iter__( self ):
+        view = memoryview( self.map )[ SYR_BIN_HEADER.size : SYR_BIN_HEADER.size + self.count * SYR_BIN_RECORD.size ]
+        try:
+            yield from SYR_BIN_RECORD.iter_unpack( view )
+        finally:
+            view.release()
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, *args ):
+        self.Close()
+
+    def Records( self ):
+        """Returns: all records as numpy structured array, a view on the mapped file; None without numpy
+        """
+        if self.records is None:
+            try:
+                import numpy
+            except ImportError:
+                return None
+            dtype = numpy.dtype( [ ( name, "<" + code ) for name, code in SYR_BIN_FIELDS ] )
+            self.records = numpy.frombuffer( self.map, dtype, self.count, SYR_BIN_HEADER.size )
+        return self.records
+
+    def Column( self, name ):
+        """Returns: a single column (see SYR_BIN_FIELDS); a numpy view if available, a list otherwise
+        """
+        if ( records := self.Records() ) is not None:
+            return records[ name ]
+        index = [ field for field, code in SYR_BIN_FIELDS ].index( name )
+        return [ record[ index ] for record in self ]
+
+    def Close( self ):
+        # numpy views keep the map alive; it is then closed when the last one is gone
+        self.records = None
+        try:
+            self.map.close()
+        except ( BufferError, AttributeError ):
+            pass
+        self.file.close()
+
+
+#############################################################################################################
+## Log file index
+#############################################################################################################
+# "--query" needs not read a whole log file to find an hour in it. A sparse index, next to the log file
+# in "<file>.idx", maps times to byte offsets: an entry for the first line after every SYR_INDEX_STEP bytes.
+# Log files only grow, so an index that is older than its log file is just extended. Compressed files
+# cannot seek; they are read from the start, but only up to the end of the queried range.
+SYR_INDEX_MAGIC = b"SYRIDX\0\0"
+SYR_INDEX_STEP  = 65536
+SYR_INDEX_HEADER = struct.Struct( "<8sIQ" )        # magic, step, bytes of the log file indexed so far
+SYR_INDEX_ENTRY  = struct.Struct( "<qQ" )          # epoch, offset of the line
+
+
+#############################################################################################################
+## LoadLogIndex
+#############################################################################################################
+def LoadLogIndex( fileName ):
+    """Load the index of an uncompressed log file; create or extend it, if required.
+    If the index file cannot be written, the index is only used in memory.
+
+    Returns: a list of tuples ( epoch, offset ), sorted by offset
+    """
+    indexName = fileName + ".idx"
+    entries   = []
+    indexed   = 0
+    try:
+        with open( indexName, "rb" ) as fin:
+            data = fin.read()
+        magic, step, indexed = SYR_INDEX_HEADER.unpack_from( data )
+        if magic != SYR_INDEX_MAGIC or step != SYR_INDEX_STEP or indexed > os.path.getsize( fileName ):
+            raise ValueError
+        entries = list( SYR_INDEX_ENTRY.iter_unpack( data[ SYR_INDEX_HEADER.size: ] ) )
+    except ( OSError, ValueError, struct.error ):
+        entries = []
+        indexed = 0
+
+    with open( fileName, "rb" ) as fin:
+        # the log file might have been replaced by a new one with the same name
+        if entries:
+            fin.seek( entries[0][1] )
+            try:
+                if LogLineEpoch( fin.readline().decode( "utf-8", "replace" ) ) != entries[0][0]:
+                    raise ValueError
+            except ValueError:
+                entries = []
+                indexed = 0
+        if indexed == os.fstat( fin.fileno() ).st_size:
+            return entries
+
+        # continue after the last complete line that was indexed
+        offset = entries[-1][1] if entries else 0
+        fin.seek( offset )
+        nextEntry = offset if not entries else offset + SYR_INDEX_STEP
+        for line in fin:
+            if not line.endswith( b"\n" ):
+                break
+            if offset >= nextEntry and not line.startswith( b"#" ):
+                try:
+                    entries.append( ( LogLineEpoch( line.decode( "utf-8", "replace" ) ), offset ) )
+                    nextEntry = offset + SYR_INDEX_STEP
+                except ValueError:
+                    pass
+            offset += len( line )
+        indexed = offset
+
+    try:
+        with open( indexName + ".tmp", "wb" ) as fout:
+            fout.write( SYR_INDEX_HEADER.pack( SYR_INDEX_MAGIC, SYR_INDEX_STEP, indexed ) )
+            fout.write( b"".join( SYR_INDEX_ENTRY.pack( *entry ) for entry in entries ) )
+        os.replace( indexName + ".tmp", indexName )
+    except OSError:
+        pass
+    return entries
+
+
+#############################################################################################################
+## ReadLogRange
+#############################################################################################################
+def ReadLogRange( fileName, tFrom = None, tTo = None ):
+    """Read the lines of a log file that might lie in [tFrom, tTo); a bit more, to be sure.
+    Uncompressed files seek to the start of the range, via LoadLogIndex(); reading stops after its end.
+    "# RUN" lines are expanded.
+
+    tFrom, tTo: epoch seconds; None = from the start, up to the end
+
+    Returns: a generator with the lines, without "\n"
+    """
+    if fileName[-3:] in SYR_LOG_COMPRESSED:
+        fin = OpenLogFile( fileName )
+    else:
+        offset = 0
+        if tFrom is not None:
+            # the last entry before tFrom; times might jump back, e.g. at the end of DST
+            for epoch, entryOffset in LoadLogIndex( fileName ):
+                if epoch >= tFrom:
+                    break
+                offset = entryOffset
+        fin = open( fileName, "rt" )
+        fin.seek( offset )
+    with fin:
+        for line in ExpandLogLines( fin ):
+            if tTo is not None and not line.startswith( "#" ):
+                try:
+                    # a minute of slack, for clocks that were set back
+                    if LogLineEpoch( line ) >= tTo + 60:
+                        return
+                except ValueError:
+                    pass
+            yield line
+
+
+#############################################################################################################
+## QueryLogLines
+#############################################################################################################
+def QueryLogLines( lines, tFrom = None, tTo = None, alarms = None, valves = None, minFlow = None ):
+    """Filter the lines of a log file; all conditions must be met. "#" lines are dropped.
+
+    tFrom, tTo: epoch seconds; lines in [tFrom, tTo); None = any
+    alarms    : list of alarm codes, e.g. [ "A3", "A4" ]; [ "any" ] = all but "FF"; None = any
+    valves    : list of valve states, e.g. [ "10", "11" ]; None = any
+    minFlow   : minimum flow in L/h; None = any
+
+    Returns: a generator with tuples ( epoch, list of the line's fields, without the time )
+    """
+    for line in lines:
+        if line.startswith( "#" ):
+            continue
+        fields = line.split( "; " )
+        try:
+            epoch = LogLineEpoch( line )
+        except ValueError:
+            continue
+        if len( fields ) < 8:
+            continue
+        if ( tFrom is not None and epoch < tFrom ) or ( tTo is not None and epoch >= tTo ):
+            continue
+        if valves is not None and fields[2] not in valves:
+            continue
+        if alarms is not None and fields[7] not in alarms and not ( "any" in alarms and fields[7] not in ( "FF", SYR_ERROR_STRING ) ):
+            continue
+        if minFlow is not None:
+            try:
+                if int( RemoveUnits( fields[4] ) ) < minFlow:
+                    continue
+            except ValueError:
+                continue
+        yield ( epoch, fields[2:] )
+
+
+#############################################################################################################
+## PrintQuery
+#############################################################################################################
+def PrintQuery( results, form = None ):
+    """Print the results of QueryLogLines() as they come, as log file lines, CSV or JSON.
+
+    form: None for log file lines, "csv" or "json"
+
+    Returns: the number of lines
+    """
+    names = [ "valve", "pressure", "flow", "volume", "lastvolume", "alarm" ]
+    names += [ name for name, logged in [ ( "conductivity", APP_LOGCONDUCTIVITY ), ( "temperature", APP_LOGTEMPERATURE ),
+                                          ( "profile", APP_LOGPROFILE ) ] if logged ]
+    count = 0
+    if form == "json":
+        print( "[" )
+    for epoch, fields in results:
+        stamp = time.strftime( "%Y-%m-%d %H:%M:%S", time.localtime( epoch ) )
+        # columns the options do not know about are just numbered
+        columns = names + [ "column" + str( num ) for num in range( len( names ) + 3, len( fields ) + 3 ) ]
+        if form == "csv":
+            if count == 0:
+                print( "time,epoch," + ",".join( columns ) )
+            print( stamp + "," + str( epoch ) + "," + ",".join( fields ) )
+        elif form == "json":
+            record = { "time": stamp, "epoch": epoch }
+            for name, value in zip( columns, fields ):
+                record[ name ] = int( value ) if re.fullmatch( r"-?\d+", value ) else value
+            print( ( ",\n" if count > 0 else "" ) + "  " + json.dumps( record ), end = "" )
+        else:
+            print( time.strftime( "%Y;%m;%d; %H;%M;%S", time.localtime( epoch ) ) + "; " + "; ".join( fields ) )
+        count += 1
+    if form == "csv" and count == 0:
+        print( "time,epoch," + ",".join( names ) )
+    elif form == "json":
+        print( "\n]" if count > 0 else "]" )
+    return count
+
+
+#############################################################################################################
+## SyrDevice_class
+#############################################################################################################
+class SyrDevice_class:
+    # One Syr SafeTech in multi-device mode, with its own rate, log file and error state.
+    def __init__( self, ipaddr, delay = None, fileName = None ) -> None:
+        self.ipaddr     = ipaddr                             # IP address, optionally with ":port"
+        self.delay      = SYR_DELAY if delay is None else delay
+        self.fileName   = fileName                           # None = default name, with date, time and IP address
+        self.commands   = GetLogCommands()
+        self.scheduler  = SyrScheduler_class( self.delay )
+        self.fieldCache = SyrFieldCache_class() if APP_TIERED else None
+        if APP_IDLEDELAY is not None:
+            self.adaptive = SyrAdaptiveRate_class( self.delay, max( self.delay, APP_IDLEDELAY ) )
+        else:
+            self.adaptive = None
+        self.polls      = 0                                  # number of polls so far
+        self.failed     = 0                                  # number of polls without a single answer
+        self.errors     = 0                                  # number of failed polls in a row; 0 = device is fine
+        self.lastError  = None                               # time of the last failed poll, human readable
+        self.nextStats  = None                               # time.monotonic() of the next "# STATS" line
+        self.gap        = SyrGap_class( ipaddr )
+        self.serial     = None                               # serial number, for the database and exporter; read once
+        self.history    = GetHistory( ipaddr, self.delay )   # recent polls, in memory; None if APP_HISTORY is 0
+        self.alarmWatch = None                               # SyrAlarmWatch_class, with "--alarmwatch"; see Open()
+        self.pollCommands = [ command for command in self.commands if command not in SYR_ALARMWATCH_COMMANDS ]
+
+    def Open( self ):
+        """Add the device's log file to the sinks, unless APP_NOFILE is set, and start its alarm watcher.
+        """
+        if APP_NOFILE is False:
+            if self.fileName is None:
+                self.fileName = time.strftime("%Y%m%d%H%M%S") + "_" + self.ipaddr.replace( ":", "_" ) + "_SyrSafeTech.log"
+            _syrSinks.Add( SyrLogWriter_class( self.fileName ), self.ipaddr )
+        if APP_ALARMWATCH is not None:
+            self.alarmWatch = SyrAlarmWatch_class( self.ipaddr )
+            self.alarmWatch.Start()
+
+
+#############################################################################################################
+## LoadDeviceList
+#############################################################################################################
+def LoadDeviceList( fileName ):
+    """Read a list of devices from a text file. One device per line:
+
+        ipaddr[:port] [delay] [logfile]
+
+    e.g. "192.168.1.123 5 cellar.log". Empty lines and lines starting with "#" are ignored.
+
+    Returns: a list of SyrDevice_class objects; raises ValueError with a message if something's wrong
+    """
+    devices = []
+    with open( fileName, "rt" ) as fin:
+        for num, line in enumerate( fin, 1 ):
+            fields = line.split()
+            if not fields or fields[0].startswith( "#" ):
+                continue
+            if CheckDeviceAddr( fields[0] ) is False or len( fields ) > 3:
+                raise ValueError( fileName + ", line " + str( num ) + ": invalid device entry" )
+            try:
+                delay = abs( float( fields[1] ) ) if len( fields ) > 1 else None
+            except ValueError:
+                raise ValueError( fileName + ", line " + str( num ) + ": invalid delay" )
+            devices.append( SyrDevice_class( fields[0], delay, fields[2] if len( fields ) > 2 else None ) )
+    return devices
+
+
+#############################################################################################################
+## PollDeviceAsync
+#############################################################################################################
+async def PollDeviceAsync( device, executor, maxpolls = -1, duration = None, stop = None ):
+    """Poll a single device until 'maxpolls' or 'duration' is reached; forever if neither is given.
+    The requests run in 'executor', so a hanging device only blocks its own coroutine.
+    While a device is down, its requests fail at once, except for a probe now and then; see SyrLink_class.
+    If 'stop' (an asyncio.Event) is set, it stops after the current poll.
+    """
+    import asyncio
+
+    loop     = asyncio.get_running_loop()
+    inflight = asyncio.Semaphore( APP_INFLIGHT if APP_PARALLEL else 1 )
+    deadline = None if duration is None else time.monotonic() + duration
+
+    async def Fetch( command ):
+        async with inflight:
+            return await loop.run_in_executor( executor, GetDataRaw, command, None, device.ipaddr )
+
+    # the schedule starts now, not when the device was set up
+    device.scheduler.next = time.monotonic()
+    if APP_STATSINTERVAL is not None:
+        device.nextStats = device.scheduler.next + APP_STATSINTERVAL
+
+    while ( maxpolls < 0 or device.polls < maxpolls ) and APP_STOP is False:
+        record = SyrRecord_class( SyrRecord_class.POLL, device.ipaddr )
+        now    = time.monotonic()
+
+        # with "--alarmwatch", alarm and valve come from there, once it has read them
+        watched  = device.alarmWatch.Latest() if device.alarmWatch is not None else None
+        commands = device.commands if watched is None else device.pollCommands
+        if device.fieldCache is not None:
+            commands = device.fieldCache.Due( commands, now, device.scheduler.period / 2 )
+        fetched = dict( zip( commands, await asyncio.gather( *[ Fetch( command ) for command in commands ] ) ) )
+        if device.fieldCache is not None:
+            device.fieldCache.Update( fetched, now )
+            data = device.fieldCache.Get( device.commands )
+        else:
+            data = fetched
+        if watched is not None:
+            fetched.update( watched )
+            data.update( watched )
+
+        device.polls += 1
+        if commands and all( value == SYR_ERROR_STRING for value in data.values() ):
+            device.failed   += 1
+            device.errors   += 1
+            device.lastError = record.timeHuman
+            if device.errors == 1:
+                print( "ERROR: no response from " + device.ipaddr, file=sys.stderr, flush=True )
+        elif device.errors > 0:
+            print( "INFO: " + device.ipaddr + " is back after " + str( device.errors ) + " failed poll(s)", file=sys.stderr, flush=True )
+            device.errors = 0
+        if APP_HTTPPORT is not None:
+            _syrMetrics.Update( device.ipaddr, data, device.polls, device.failed, device.errors == 0, device.serial )
+
+        marker, logData = device.gap.Update( fetched, record.timeHuman )
+        if marker is not None:
+            _syrSinks.Put( SyrRecord_class( SyrRecord_class.MARKER, device.ipaddr, line = marker ), urgent = True )
+
+        if logData:
+            if device.serial is None and ( APP_DBFILE is not None or APP_HTTPPORT is not None or APP_HOOKS ) and \
+               ( serial := await Fetch( SYR_CMD_SERIAL ) ) != SYR_ERROR_STRING:
+                device.serial = serial
+                if device.alarmWatch is not None:
+                    device.alarmWatch.serial = serial
+            record.Parse( data )
+            record.serial = device.serial
+            if device.history is not None:
+                device.history.Append( record.sample )
+            _syrSinks.Put( record, urgent = data.get( SYR_CMD_ALARM, "FF" ) not in ( "FF", SYR_ERROR_STRING ) )
+
+        if APP_STATSINTERVAL is not None and time.monotonic() >= device.nextStats:
+            device.nextStats = time.monotonic() + APP_STATSINTERVAL
+            _syrSinks.Put( SyrRecord_class( SyrRecord_class.NOTE, device.ipaddr, line = _syrStats.Line( device.ipaddr ) ) )
+
+        # no need to back off here if the device is not there; its SyrLink_class only probes it now and then
+        period = device.adaptive.Update( data ) if device.adaptive is not None else device.delay
+        device.scheduler.period = period
+
+        if APP_FIXEDRATE:
+            device.scheduler.Advance()
+            wakeUp = device.scheduler.next
+        else:
+            wakeUp = time.monotonic() + period
+        if deadline is not None and wakeUp >= deadline:
+            break
+        if stop is None:
+            await asyncio.sleep( max( 0.0, wakeUp - time.monotonic() ) )
+        else:
+            try:
+                await asyncio.wait_for( stop.wait(), max( 0.0, wakeUp - time.monotonic() ) )
+            except asyncio.TimeoutError:
+                pass
+
+
+#############################################################################################################
+## RunDevices
+#############################################################################################################
+def RunDevices( devices, maxpolls = -1, duration = None ):
+    """Poll several devices from a single process, each at its own rate, with one asyncio scheduler.
+
+    devices : list of SyrDevice_class objects
+    maxpolls: stop each device after this many polls; -1 = infinite
+    duration: stop after this many seconds; None = infinite
+    """
+    global SYR_POOLDEVICES
+    import asyncio
+    import concurrent.futures
+
+    SYR_POOLDEVICES = max( SYR_POOLDEVICES, len( devices ) )
+
+    inflight = APP_INFLIGHT if APP_PARALLEL else 1
+    executor = concurrent.futures.ThreadPoolExecutor( max_workers = min( 256, len( devices ) * inflight ), thread_name_prefix = "syrdev" )
+
+    async def RunAll():
+        # stop cleanly on CTRL-C and "kill"; the log files' ends are written and flushed
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in [ signal.SIGTERM, signal.SIGINT ]:
+            try:
+                loop.add_signal_handler( signum, lambda: ( StopHandler(), stop.set() ) )
+            except ( NotImplementedError, RuntimeError, ValueError ):
+                # Windows, or not in the main thread
+                pass
+        # the "# STATS" lines are per device, the stats file is one for all of them
+        saver = None
+        if APP_STATSINTERVAL is not None and APP_STATSFILE is not None:
+            saver = asyncio.create_task( SaveStats( stop ) )
+        try:
+            await asyncio.gather( *[ PollDeviceAsync( device, executor, maxpolls, duration, stop ) for device in devices ] )
+        finally:
+            if saver is not None:
+                saver.cancel()
+
+    async def SaveStats( stop ):
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for( stop.wait(), APP_STATSINTERVAL )
+            except asyncio.TimeoutError:
+                _syrStats.Save( APP_STATSFILE )
+
+    if APP_NOSTDOUT is False:
+        _syrSinks.Add( SyrStdoutSink_class( prefix = True ) )
+    if APP_DBFILE is not None:
+        _syrSinks.Add( SyrDbWriter_class( APP_DBFILE ) )
+    for device in devices:
+        device.Open()
+    try:
+        asyncio.run( RunAll() )
+    finally:
+        executor.shutdown( wait = False, cancel_futures = True )
+        for device in devices:
+            if device.alarmWatch is not None:
+                device.alarmWatch.Close()
+        _syrSinks.Close()
+
+
+#############################################################################################################
+## CollectProfiles
+#############################################################################################################
+def CollectProfiles():
+    """Read the number of available and configured profiles in the Syr; all requests at once.
+
+    Returns: a dictionary with
+      "count"    : number of profiles, raw value
+      "selected" : number of the active profile, raw value
+      "avail"    : list with the raw availability (PA1..PA8) of all 8 profiles; "1" = available
+      "available": list with the numbers of the available profiles (1..8), e.g. [ 1, 2, 3 ]
+    """
+    commands = [ SYR_CMD_PROFILENUMS, SYR_CMD_PROFILE ] + [ SYR_CMD_PROFILE_X_AVAIL + str(i) for i in range( 1, 9 ) ]
+    data = GetDataMulti( commands, parallel = True )
+
+    avail = [ data[ SYR_CMD_PROFILE_X_AVAIL + str(i) ] for i in range( 1, 9 ) ]
+    return { "count"    : data[ SYR_CMD_PROFILENUMS ],
+             "selected" : data[ SYR_CMD_PROFILE ],
+             "avail"    : avail,
+             "available": [ i + 1 for i, ret in enumerate( avail ) if ret == "1" ] }
+
+
+#############################################################################################################
+## ProfileXCommands
+#############################################################################################################
+def ProfileXCommands( profNum ):
+    """Returns: a list with all commands to read the settings of profile number 'profNum' (1..8)
+    """
+    profNum = str( profNum )
+    return [ cmd + profNum for cmd in SYR_PROFILE_FIELDS.values() ] + [ SYR_CMD_PROFILE_X_AVAIL + profNum ]
+
+
+#############################################################################################################
+## CollectProfileX
+#############################################################################################################
+def CollectProfileX( profNum, data = None ):
+    """Read the settings of profile number 'profNum'; all requests at once.
+
+    profNum: profile number (1..8), as integer or string
+    data   : dictionary with the values of ProfileXCommands(), if they were already read in a bigger batch
+
+    Returns: a dictionary with the profile's raw values, keyed like SYR_PROFILE_FIELDS, plus
+    "number" and "available" ("1" = configured)
+    """
+    profNum = str( profNum )
+    if data is None:
+        data = GetDataMulti( ProfileXCommands( profNum ), parallel = True )
+
+    profile = { "number": profNum, "available": data[ SYR_CMD_PROFILE_X_AVAIL + profNum ] }
+    for key, cmd in SYR_PROFILE_FIELDS.items():
+        profile[ key ] = data[ cmd + profNum ]
+
+    return profile
+
+
+#############################################################################################################
+## CollectStatus
+#############################################################################################################
+# the values of the status report, read in admin mode; key -> command
+SYR_STATUS_ADMIN_CMDS = {
+    "leakagetempdisable" : SYR_CMD_TMP,
+    "buzzer"             : SYR_CMD_BUZZER,
+    "conductivitylimit"  : SYR_CMD_CONDUCT_LIMIT,
+    "conductivityfactor" : SYR_CMD_CONDUCT_FACTOR,
+    "leakagewarning"     : SYR_CMD_LEAKAGE_WARNING,
+    "floorsensor"        : SYR_CMD_FLOOR_SENSOR,
+    "nextmaintenance"    : SYR_CMD_NEXT_MAINTENANCE,
+    "battery"            : SYR_CMD_BATTERY,
+    "voltage"            : SYR_CMD_VOLTAGE,
+    "rtc"                : SYR_CMD_RTC,
+    "alarm"              : SYR_CMD_ALARM,
+    "alarmmemory"        : SYR_CMD_ALARM_MEMORY,
+    "lastvolume"         : SYR_CMD_VOLUME_LAST,
+    "totalvolume"        : SYR_CMD_VOLUME_TOTAL
+}
+
+def CollectStatus():
+    """Read (almost) all settings of the Syr SafeTech. Nothing is printed.
+
+    The requests are sent in parallel (max. APP_INFLIGHT at once), in three steps:
+      1. profiles and the selected profile number
+      2. admin mode on; then the active profile and all values of SYR_STATUS_ADMIN_CMDS
+      3. admin mode off
+    so all reads that need admin mode happen within one single admin window.
+
+    Returns: a dictionary with the raw values; "profiles" from CollectProfiles(), "profile" from CollectProfileX()
+    """
+    status = {}
+
+    status[ "profiles" ] = CollectProfiles()
+    selected = status[ "profiles" ][ "selected" ]
+
+    # set admin mode to read some of the data (power supply voltage, alarm history)
+    status[ "enteradmin" ] = SetDataRaw( SYR_CMD_ADMIN, "(1)" )
+
+    data = GetDataMulti( ProfileXCommands( selected ) + list( SYR_STATUS_ADMIN_CMDS.values() ), parallel = True )
+    status[ "profile" ] = CollectProfileX( selected, data )
+    for key, cmd in SYR_STATUS_ADMIN_CMDS.items():
+        status[ key ] = data[ cmd ]
+
+    # reset admin mode
+    status[ "leaveadmin" ] = ClrDataRaw( SYR_CMD_ADMIN )
+
+    return status
+
+
+#############################################################################################################
+## PrintProfiles
+#############################################################################################################
+def PrintProfiles( profiles ):
+    """Print the number of available and configured profiles, as returned by CollectProfiles().
+    """
+    print( "  Profiles available ....... " + profiles[ "count" ] )
+    print( "  Profile numbers .......... ", end = "" )
+    for i, ret in enumerate( profiles[ "avail" ], 1 ):
+        if ret != SYR_ERROR_STRING:
+            if ret == "1":
+                print( str(i), end = " " )
+        else:
+            # not nice :-/
+            print( SYR_ERROR_STRING, end = " " )
+    print()
+
+
+#############################################################################################################
+## PrintProfileX
+#############################################################################################################
+def PrintProfileX( profile, warnIfNotAvailable = False ):
+    """Print the settings of a profile, as returned by CollectProfileX().
+    """
+    profNum = profile[ "number" ]
+
+    if warnIfNotAvailable:
+        if profile[ "available" ] != "1":
+            print( "  Profile " + profNum + " ................ WARNING, NOT CONFIGURED, NOT AVAILABLE!" )
+
+    print( "  Profile " + profNum + " name ........... " + profile[ "name"           ]         )
+    print( "  Profile " + profNum + " volume level ... " + profile[ "volume"         ] + "L"   )
+    print( "  Profile " + profNum + " time level ..... " + profile[ "time"           ] + "s"   )
+    print( "  Profile " + profNum + " flow level ..... " + profile[ "flow"           ] + "L/h" )
+    print( "  Profile " + profNum + " microleakage ... " + ("on" if profile[ "microleakage"   ] == "1" else "off"))
+    print( "  Profile " + profNum + " return time .... " + profile[ "returntime"     ] + "h"   )
+    print( "  Profile " + profNum + " buzzer ......... " + ("on" if profile[ "buzzer"         ] == "1" else "off"))
+    print( "  Profile " + profNum + " leakage warning. " + ("on" if profile[ "leakagewarning" ] == "1" else "off"))
+
+
+#############################################################################################################
+## PrintStatus
+#############################################################################################################
+def PrintStatus( status ):
+    """Print the status report, as returned by CollectStatus().
+    """
+    PrintProfiles( status[ "profiles" ] )
+    print( "  Profile selected ......... " + status[ "profiles" ][ "selected" ] )
+    PrintProfileX( status[ "profile" ] )
+
+    print( "  Enter admin mode ......... " + str( status[ "enteradmin" ] ) )
+
+    print( "  Leakage temp disable ..... " + status[ "leakagetempdisable" ]                    )
+    print( "  Buzzer ................... " + ("on" if status[ "buzzer" ] == "1" else "off"))
+    print( "  Conductivity limit ....... " + status[ "conductivitylimit" ]         + "uS/cm" )
+    print( "  Conductivity factor ...... " + status[ "conductivityfactor" ]                  )
+    print( "  Leakage warning .......... " + status[ "leakagewarning" ]            + "%"     )
+    # not supported yet
+    # print( "  Language ................. " + SYR_LANGUAGES.get( GetDataRaw( SYR_CMD_LANGUAGE), "UNKNOWN LANGUAGE" ) )
+    print( "  Floor sensor ............. " + ("on" if status[ "floorsensor" ] == "1" else "off"))
+    print( "  Next maintenance ......... " + status[ "nextmaintenance" ]                     )
+    print( "  Battery voltage .......... " + status[ "battery" ]                   + "V"     )
+    print( "  Power supply voltage ..... " + status[ "voltage" ]                   + "V"     )
+    print( "  RTC ...................... " + (strRTC:=status[ "rtc" ])                      )
+    try:
+        intRTC = int( strRTC )
+    except:
+        intRTC = -1
+    print( "  RTC converted............. " + ( str(datetime.datetime.fromtimestamp( intRTC )) if intRTC > 0 else "ERROR" ) )
+    print( "  Ongoing alarm ............ " + SYR_ALARM_CODES.get( status[ "alarm" ], "UNKNOWN STATE") )
+    print( "  Alarm memory ............. " + status[ "alarmmemory" ] )
+    print( "  Last volume consumed ..... " + status[ "lastvolume" ]                + "L"    )
+    print( "  Total volume consumed .... " + RemoveUnits( status[ "totalvolume" ] ) + "L"    )
+
+    # reset admin mode
+    print( "  Leave admin mode ......... " + str( status[ "leaveadmin" ] ) )
+
+
+#############################################################################################################
+## PrintJSON
+#############################################################################################################
+def PrintJSON( data ):
+    """Print a snapshot (from CollectStatus(), CollectProfiles(), ...) as JSON to stdout, for other tools.
+    """
+    print( json.dumps( data, indent = 2 ) )
+
+
+#############################################################################################################
+if __name__ == "__main__":
+
+    maxpolls = -1  # -1 = infinite (default); can be overridden by command line option "--maxpolls=<n>"
+
+    # -------------------------------------------------------------------------------------------------------
+    # minimal command line options
+    for args in sys.argv:
+        # ------------------------------
+        if args == sys.argv[0]:
+            continue
+        # ------------------------------
+        if args == "--help" or args == "-h" or args == "-?" or args == "/?":
+            PrintUsage()
+            sys.exit( APP_ERROR_NONE )
+        # ------------------------------
+        elif args == "--nofile":
+            APP_NOFILE = True
+        # ------------------------------
         elif args == "--nostdout":
             APP_NOSTDOUT = True
         # ------------------------------
         elif args == "--raw":
             APP_RAW = True
         # ------------------------------
+        elif args == "--nokeepalive":
+            SYR_KEEPALIVE = False
+        # ------------------------------
+        elif "--transport=" in args:
+            if ( SYR_TRANSPORT := args[12:] ) not in ( "requests", "stdlib" ):
+                print( "ERROR: invalid value for --transport", file=sys.stderr, flush=True )
+                PrintUsage()
+                sys.exit( APP_ERROR_ARGS )
+        # ------------------------------
+        elif args == "--parallel":
+            APP_PARALLEL = True
+        # ------------------------------
+        elif args == "--nofixedrate":
+            APP_FIXEDRATE = False
+        # ------------------------------
+        elif args == "--json":
+            APP_JSON = True
+        # ------------------------------
+        elif "--cachettl=" in args:
+            try:
+                SYR_CACHE_TTL = abs( float( args[11:] ) )
+            except:
+                print( "ERROR: invalid value for --cachettl", file=sys.stderr, flush=True )
+                PrintUsage()
+                sys.exit( APP_ERROR_ARGS )
+        # ------------------------------
+        elif "--cachefile=" in args:
+            SYR_CACHE_FILE = args[12:]
+        # ------------------------------
+        elif args == "--refresh":
+            APP_REFRESH = True
+        # ------------------------------
+        elif args == "--tiered":
+            APP_TIERED = True
+        # ------------------------------
+        elif "--timeout=" in args:
+            try:
+                SYR_TIMEOUT_MAX = float( args[10:] )
+                if SYR_TIMEOUT_MAX <= 0:
+                    raise ValueError
+            except:
+                print( "ERROR: invalid value for --timeout", file=sys.stderr, flush=True )
+                PrintUsage()
+                sys.exit( APP_ERROR_ARGS )
+            SYR_TIMEOUT_MIN = min( SYR_TIMEOUT_MIN, SYR_TIMEOUT_MAX )
+        # ------------------------------
+        elif "--flushlines=" in args:
+            try:
+                APP_FLUSHLINES = int( args[13:] )
+                if APP_FLUSHLINES < 1:
+                    raise ValueError
+            except:
+                print( "ERROR: invalid value for --flushlines", file=sys.stderr, flush=True )
+                PrintUsage()
+                sys.exit( APP_ERROR_ARGS )
+        # ------------------------------
+        elif "--flushsecs=" in args:
+            try:
+                APP_FLUSHSECS = float( args[12:] )
+                if APP_FLUSHSECS <= 0:
+                    raise ValueError
+            except:
+                print( "ERROR: invalid value for --flushsecs", file=sys.stderr, flush=True )
+                PrintUsage()
+                sys.exit( APP_ERROR_ARGS )
+        # ------------------------------
+        elif args == "--fsync":
+            APP_FSYNC = True
+        # ------------------------------
+        elif "--rotatesize=" in args:
+            try:
+                APP_ROTATESIZE = ParseSize( args[13:] )
+                if APP_ROTATESIZE < 1:
+                    raise ValueError
+            except:
+                print( "ERROR: invalid value for --rotatesize", file=sys.stderr, flush=True )
+                PrintUsage()
+                sys.exit( APP_ERROR_ARGS )
+        # ------------------------------
+        elif args == "--rotatedaily":
+            APP_ROTATEDAILY = True
+        # ------------------------------
+        elif "--compress=" in args:
+            if args[11:] not in [ "gz", "xz", "none" ]:
+                print( "ERROR: invalid value for --compress", file=sys.stderr, flush=True )
+                PrintUsage()
+                sys.exit( APP_ERROR_ARGS )
+            APP_COMPRESS = None if args[11:] == "none" else args[11:]
+        # ------------------------------
+        elif "--keep=" in args:
+            try:
+                APP_KEEP = int( args[7:] )
+                if APP_KEEP < 0:
+                    raise ValueError
+            except:
+                print( "ERROR: invalid value for --keep", file=sys.stderr, flush=True )
+                PrintUsage()
+                sys.exit( APP_ERROR_ARGS )
+        # ------------------------------
+        elif "--keepdays=" in args:
+            try:
+                APP_KEEPDAYS = float( args[11:] )
+                if APP_KEEPDAYS <= 0:
+                    raise ValueError
+            except:
+                print( "ERROR: invalid value for --keepdays", file=sys.stderr, flush=True )
+                PrintUsage()
+                sys.exit( APP_ERROR_ARGS )
+        # ------------------------------
+        elif "--history=" in args:
+            try:
+                APP_HISTORY = float( args[10:] )
+                if APP_HISTORY < 0:
+                    raise ValueError
+            except:
+                print( "ERROR: invalid value for --history", file=sys.stderr, flush=True )
+                PrintUsage()
+                sys.exit( APP_ERROR_ARGS )
+        # ------------------------------
+        elif "--sinkqueue=" in args:
+            try:
+                APP_WRITERQUEUE = int( args[12:] )
+                if APP_WRITERQUEUE < 1:
+                    raise ValueError
+            except:
+                print( "ERROR: invalid value for --sinkqueue", file=sys.stderr, flush=True )
+                PrintUsage()
+                sys.exit( APP_ERROR_ARGS )
+        # ------------------------------
+        elif "--alarmwatch=" in args:
+            try:
+                APP_ALARMWATCH = float( args[13:] )
+                if APP_ALARMWATCH <= 0:
+                    raise ValueError
+            except:
+                print( "ERROR: invalid value for --alarmwatch", file=sys.stderr, flush=True )
+                PrintUsage()
+                sys.exit( APP_ERROR_ARGS )
+        # ------------------------------
+        elif "--onalarm=" in args:
+            if not args[10:]:
+                print( "ERROR: invalid value for --onalarm", file=sys.stderr, flush=True )
+                PrintUsage()
+                sys.exit( APP_ERROR_ARGS )
+            APP_HOOKS.append( args[10:] )
+        # ------------------------------
+        elif "--mqtt=" in args:
+            try:
+                host, _, port = args[7:].partition( ":" )
+                if not host or ( port and not 0 < int( port ) < 65536 ):
+                    raise ValueError
+            except:
+                print( "ERROR: invalid value for --mqtt", file=sys.stderr, flush=True )
+                PrintUsage()
+                sys.exit( APP_ERROR_ARGS )
+            APP_MQTT = args[7:]
+        # ------------------------------
+        elif "--mqtttopic=" in args:
+            if not ( APP_MQTTTOPIC := args[12:] ):
+                print( "ERROR: invalid value for --mqtttopic", file=sys.stderr, flush=True )
+                PrintUsage()
+                sys.exit( APP_ERROR_ARGS )
+        # ------------------------------
+        elif "--sinkpolicy=" in args:
+            if ( APP_SINKPOLICY := args[13:] ) not in ( "drop", "block" ):
+                print( "ERROR: invalid value for --sinkpolicy", file=sys.stderr, flush=True )
+                PrintUsage()
+                sys.exit( APP_ERROR_ARGS )
+        # ------------------------------
+        elif args == "--changeonly":
+            APP_CHANGEONLY = True
+        # ------------------------------
+        elif "--heartbeat=" in args:
+            try:
+                APP_HEARTBEAT = float( args[12:] )
+                if APP_HEARTBEAT <= 0:
+                    raise ValueError
+            except:
+                print( "ERROR: invalid value for --heartbeat", file=sys.stderr, flush=True )
+                PrintUsage()
+                sys.exit( APP_ERROR_ARGS )
+        # ------------------------------
+        elif "--pressureband=" in args:
+            try:
+                APP_PRESSUREBAND = int( args[15:] )
+                if APP_PRESSUREBAND < 0:
+                    raise ValueError
+            except:
+                print( "ERROR: invalid value for --pressureband", file=sys.stderr, flush=True )
+                PrintUsage()
+                sys.exit( APP_ERROR_ARGS )
+        # ------------------------------
+        elif "--expand=" in args:
+            APP_EXPANDFILE = args[9:]
+        # ------------------------------
+        elif "--convert=" in args:
+            APP_CONVERTFILES.append( args[10:] )
+        # ------------------------------
+        elif "--query=" in args:
+            APP_QUERYFILES.extend( sorted( glob.glob( args[8:] ) ) or [ args[8:] ] )
+        # ------------------------------
+        elif "--from=" in args or "--to=" in args:
+            try:
+                epoch = time.mktime( datetime.datetime.fromisoformat( args.split( "=", 1 )[1] ).timetuple() )
+            except ValueError:
+                print( "ERROR: invalid time for " + args.split( "=" )[0] + "; e.g. \"2026-10-26 02:00\"", file=sys.stderr, flush=True )
+                PrintUsage()
+                sys.exit( APP_ERROR_ARGS )
+            if "--from=" in args:
+                APP_QUERYFROM = epoch
+            else:
+                APP_QUERYTO   = epoch
+        # ------------------------------
+        elif "--alarm=" in args:
+            APP_QUERYALARMS = [ code.strip().upper() if code.strip().lower() != "any" else "any" for code in args[8:].split( "," ) ]
+        # ------------------------------
+        elif "--valve=" in args:
+            APP_QUERYVALVES = [ state.strip() for state in args[8:].split( "," ) ]
+        # ------------------------------
+        elif "--minflow=" in args:
+            try:
+                APP_QUERYMINFLOW = float( args[10:] )
+            except ValueError:
+                print( "ERROR: invalid value for --minflow", file=sys.stderr, flush=True )
+                PrintUsage()
+                sys.exit( APP_ERROR_ARGS )
+        # ------------------------------
+        elif args == "--csv":
+            APP_CSV = True
+        # ------------------------------
+        elif "--db=" in args:
+            APP_DBFILE = args[5:]
+        # ------------------------------
+        elif "--dbimport=" in args:
+            APP_DBIMPORTS.extend( sorted( glob.glob( args[11:] ) ) or [ args[11:] ] )
+        # ------------------------------
+        elif "--serial=" in args:
+            APP_SERIAL = args[9:]
+        # ------------------------------
+        elif "--replay=" in args:
+            APP_REPLAYFILES.extend( sorted( glob.glob( args[9:] ) ) or [ args[9:] ] )
+        # ------------------------------
+        elif "--speed=" in args:
+            try:
+                APP_REPLAYSPEED = float( args[8:] )
+                if APP_REPLAYSPEED < 0:
+                    raise ValueError
+            except:
+                print( "ERROR: invalid value for --speed", file=sys.stderr, flush=True )
+                PrintUsage()
+                sys.exit( APP_ERROR_ARGS )
+        # ------------------------------
+        elif args == "--stats":
+            APP_STATS = True
+        # ------------------------------
+        elif "--statsinterval=" in args:
+            try:
+                APP_STATSINTERVAL = float( args[16:] )
+                if APP_STATSINTERVAL <= 0:
+                    raise ValueError
+            except:
+                print( "ERROR: invalid value for --statsinterval", file=sys.stderr, flush=True )
+                PrintUsage()
+                sys.exit( APP_ERROR_ARGS )
+        # ------------------------------
+        elif "--statsfile=" in args:
+            APP_STATSFILE = args[12:]
+        # ------------------------------
+        elif "--httpport=" in args:
+            try:
+                APP_HTTPPORT = int( args[11:] )
+                if APP_HTTPPORT < 0 or APP_HTTPPORT > 65535:
+                    raise ValueError
+            except:
+                print( "ERROR: invalid value for --httpport", file=sys.stderr, flush=True )
+                PrintUsage()
+                sys.exit( APP_ERROR_ARGS )
+        # ------------------------------
+        elif "--httphost=" in args:
+            APP_HTTPHOST = args[11:]
+        # ------------------------------
+        elif "--idledelay=" in args:
+            try:
+                APP_IDLEDELAY = abs( float( args[12:] ) )
+            except:
+                print( "ERROR: invalid value for --idledelay", file=sys.stderr, flush=True )
+                PrintUsage()
+                sys.exit( APP_ERROR_ARGS )
+        # ------------------------------
+        elif "--inflight=" in args:
+            try:
+                APP_INFLIGHT = int( args[11:] )
+                if APP_INFLIGHT < 1:
+                    raise ValueError
+            except:
+                print( "ERROR: invalid value for --inflight", file=sys.stderr, flush=True )
+                PrintUsage()
+                sys.exit( APP_ERROR_ARGS )
+            # no point in more requests than pooled connections
+            SYR_POOLSIZE = max( SYR_POOLSIZE, APP_INFLIGHT )
+        # ------------------------------
         elif args == "--henlo":
             # only accept the first command
             if APP_COMMAND is None:
@@ -513,11 +4247,17 @@ if __name__ == "__main__":
                 SYR_DELAY = 0
         # ------------------------------
         elif "--ipaddr=" in args:
-            SYR_IPADDR = args[9:]
-            if CheckIPv4( SYR_IPADDR ) is False:
+            if CheckDeviceAddr( args[9:] ) is False:
                 print( "ERROR: invalid IP address", file=sys.stderr, flush=True )
                 PrintUsage()
                 sys.exit( APP_ERROR_ARGS )
+            # the first one is used for everything; more than one only for logging
+            if not APP_DEVICES:
+                SYR_IPADDR = args[9:]
+            APP_DEVICES.append( args[9:] )
+        # ------------------------------
+        elif "--devices=" in args:
+            APP_DEVICEFILE = args[10:]
         # ------------------------------
         elif args == "--profile":
             # only accept the first command
@@ -575,30 +4315,238 @@ if __name__ == "__main__":
                 APP_COMMAND = APP_CMD_SHOWPROFILE
         # ------------------------------
         else:
-            if args == "--maxpolls" or args == "--delay" or args == "--ipaddr":
+            if args == "--maxpolls" or args == "--delay" or args == "--ipaddr" or args == "--inflight" or \
+               args == "--devices" or \
+               args == "--idledelay" or args == "--cachettl" or args == "--cachefile" or \
+               args == "--statsinterval" or args == "--statsfile" or args == "--timeout" or \
+               args == "--flushlines" or args == "--flushsecs" or args == "--rotatesize" or args == "--compress" or \
+               args == "--keep" or args == "--keepdays" or args == "--heartbeat" or args == "--expand" or \
+               args == "--pressureband" or \
+               args == "--convert" or args == "--query" or args == "--from" or args == "--to" or \
+               args == "--alarm" or args == "--valve" or args == "--minflow" or \
+               args == "--db" or args == "--dbimport" or args == "--serial" or \
+               args == "--httpport" or args == "--httphost" or args == "--sinkqueue" or args == "--sinkpolicy" or \
+               args == "--history" or args == "--alarmwatch" or args == "--onalarm" or args == "--mqtt" or \
+               args == "--mqtttopic" or args == "--transport" or args == "--replay" or args == "--speed":
                 print( "ERROR: missing value for " + args, file=sys.stderr, flush=True)
             else:
                 print( "ERROR: unknown option: " + args, file=sys.stderr, flush=True )
             PrintUsage()
             sys.exit( APP_ERROR_ARGS )
 
-    if APP_NOFILE and APP_NOSTDOUT:
+    if APP_NOFILE and APP_NOSTDOUT and APP_DBFILE is None and APP_HTTPPORT is None and not APP_HOOKS and not APP_REPLAYFILES:
         print( "ERROR: --nofile and --nostdout together does not make sense at all", file=sys.stderr, flush=True )
         sys.exit( APP_ERROR_ARGS )
 
-    if SYR_IPADDR == "0.0.0.0":
-        print( "ERROR: missing IP address", file=sys.stderr, flush=True )
-        PrintUsage()
+    # the hooks are looked up once, here, so a typo does not show up with the first alarm
+    try:
+        APP_HOOKS = [ MakeHook( action ) for action in APP_HOOKS ]
+    except ( ValueError, ImportError ) as e:
+        print( "ERROR: invalid value for --onalarm: " + str( e ), file=sys.stderr, flush=True )
         sys.exit( APP_ERROR_ARGS )
+    if APP_HOOKS and APP_ALARMWATCH is None:
+        APP_ALARMWATCH = 0.5
 
     # -------------------------------------------------------------------------------------------------------
-    # print a list with alarm codes
+    # print a list with alarm codes; needs no device, so it does not even import anything for the network
     if APP_COMMAND == APP_CMD_ALARMCODES:
         print( "Alarm codes:" )
         for key, value in SYR_ALARM_CODES.items():
             print( "  " + key + ": " + value )
         sys.exit( APP_ERROR_NONE )
 
+    # one-shot commands are mostly startup, and http.client imports much faster than requests
+    if SYR_TRANSPORT is None:
+        if APP_COMMAND is not None:
+            SYR_TRANSPORT = "stdlib"
+        else:
+            SYR_TRANSPORT = "requests" if importlib.util.find_spec( "requests" ) is not None else "stdlib"
+
+    # -------------------------------------------------------------------------------------------------------
+    # expand a "--changeonly" log file; works offline, so before the IP address is checked
+    if APP_EXPANDFILE is not None:
+        try:
+            with OpenLogFile( APP_EXPANDFILE ) as fin:
+                for line in ExpandLogLines( fin ):
+                    print( line )
+        except BrokenPipeError:
+            pass
+        except ( OSError, EOFError, *ModuleErrors( "lzma.LZMAError" ) ) as e:
+            print( "ERROR: cannot read " + APP_EXPANDFILE + ": " + str( e ), file=sys.stderr, flush=True )
+            sys.exit( APP_ERROR_ARGS )
+        sys.exit( APP_ERROR_NONE )
+
+    # -------------------------------------------------------------------------------------------------------
+    # convert text log files into binary ones; offline too
+    if APP_CONVERTFILES:
+        errors = 0
+        for fileName in APP_CONVERTFILES:
+            try:
+                binName, records, skipped = ConvertLogFile( fileName )
+            except ( OSError, EOFError, *ModuleErrors( "lzma.LZMAError" ) ) as e:
+                print( "ERROR: cannot convert " + fileName + ": " + str( e ), file=sys.stderr, flush=True )
+                errors += 1
+                continue
+            print( fileName + " -> " + binName + ": " + str( records ) + " record(s), " + str( skipped ) + " line(s) skipped" )
+            if skipped > 0 and records == 0:
+                print( "WARNING: nothing converted; wrong --logcond, --logtemp or --logprofile?", file=sys.stderr, flush=True )
+        sys.exit( APP_ERROR_ARGS if errors > 0 else APP_ERROR_NONE )
+
+    # -------------------------------------------------------------------------------------------------------
+    # search log files; offline too
+    if APP_QUERYFILES:
+        def QueryLines():
+            for fileName in APP_QUERYFILES:
+                try:
+                    yield from ReadLogRange( fileName, APP_QUERYFROM, APP_QUERYTO )
+                except ( OSError, EOFError, *ModuleErrors( "lzma.LZMAError" ) ) as e:
+                    print( "ERROR: cannot read " + fileName + ": " + str( e ), file=sys.stderr, flush=True )
+        try:
+            PrintQuery( QueryLogLines( QueryLines(), APP_QUERYFROM, APP_QUERYTO, APP_QUERYALARMS, APP_QUERYVALVES, APP_QUERYMINFLOW ),
+                        "csv" if APP_CSV else "json" if APP_JSON else None )
+        except BrokenPipeError:
+            pass
+        sys.exit( APP_ERROR_NONE )
+
+    # -------------------------------------------------------------------------------------------------------
+    # import log files into the database; offline too
+    if APP_DBIMPORTS:
+        if APP_DBFILE is None:
+            print( "ERROR: --dbimport needs --db", file=sys.stderr, flush=True )
+            sys.exit( APP_ERROR_ARGS )
+        errors = 0
+        try:
+            db = OpenDatabase( APP_DBFILE )
+        except ModuleErrors( "sqlite3.Error" ) as e:
+            print( "ERROR: database " + APP_DBFILE + ": " + str( e ), file=sys.stderr, flush=True )
+            sys.exit( APP_ERROR_ARGS )
+        for fileName in APP_DBIMPORTS:
+            try:
+                if ( result := ImportLogFile( db, fileName, APP_SERIAL ) ) is None:
+                    print( fileName + ": imported before, skipped" )
+                else:
+                    print( fileName + ": " + str( result[0] ) + " row(s), " + str( result[1] ) + " line(s) skipped" )
+            except ( OSError, EOFError, *ModuleErrors( "lzma.LZMAError", "sqlite3.Error" ) ) as e:
+                print( "ERROR: cannot import " + fileName + ": " + str( e ), file=sys.stderr, flush=True )
+                errors += 1
+        db.close()
+        sys.exit( APP_ERROR_ARGS if errors > 0 else APP_ERROR_NONE )
+
+    if SYR_IPADDR == "0.0.0.0" and APP_DEVICEFILE is None and not APP_REPLAYFILES:
+        print( "ERROR: missing IP address", file=sys.stderr, flush=True )
+        PrintUsage()
+        sys.exit( APP_ERROR_ARGS )
+
+    # -------------------------------------------------------------------------------------------------------
+    # cache for configuration values; saved on exit if "--cachefile" was given
+    _syrConfigCache = SyrConfigCache_class( SYR_CACHE_TTL, SYR_CACHE_FILE )
+    _syrConfigCache.refresh = APP_REFRESH
+    atexit.register( _syrConfigCache.Save )
+
+    # request statistics; only collected if any of them is wanted
+    if APP_STATS or APP_STATSINTERVAL is not None or APP_STATSFILE is not None or APP_HTTPPORT is not None:
+        _syrStats.enabled = True
+        _syrStats.started = time.time()
+    if APP_STATSFILE is not None:
+        atexit.register( _syrStats.Save, APP_STATSFILE )
+    if APP_STATS:
+        atexit.register( PrintAlarmWatches )
+        atexit.register( _syrSinks.Print )
+        atexit.register( _syrStats.Print )
+
+    # -------------------------------------------------------------------------------------------------------
+    # the HTTP exporter; only serves what the loggers below store in _syrMetrics
+    if APP_HTTPPORT is not None and APP_COMMAND is None:
+        try:
+            StartExporter( APP_HTTPPORT, APP_HTTPHOST )
+        except OSError as e:
+            print( "ERROR: cannot serve --httpport " + str( APP_HTTPPORT ) + ": " + str( e ), file=sys.stderr, flush=True )
+            sys.exit( APP_ERROR_ARGS )
+
+    # -------------------------------------------------------------------------------------------------------
+    # replay log files through the sinks; no device, but everything after the polls, so also a benchmark of that
+    if APP_REPLAYFILES:
+        if APP_COMMAND is not None:
+            print( "ERROR: --replay is only supported for logging", file=sys.stderr, flush=True )
+            sys.exit( APP_ERROR_ARGS )
+        # nothing may get lost; a sink that is too slow slows the replay down instead
+        if APP_SINKPOLICY is None:
+            APP_SINKPOLICY = "block"
+        if APP_NOSTDOUT is False:
+            _syrSinks.Add( SyrStdoutSink_class() )
+        if APP_NOFILE is False:
+            _syrSinks.Add( SyrLogWriter_class( time.strftime("%Y%m%d%H%M%S") + "_SyrSafeTech.log" ) )
+        if APP_DBFILE is not None:
+            try:
+                _syrSinks.Add( SyrDbWriter_class( APP_DBFILE ) )
+            except ModuleErrors( "sqlite3.Error" ) as e:
+                print( "ERROR: database " + APP_DBFILE + ": " + str( e ), file=sys.stderr, flush=True )
+                sys.exit( APP_ERROR_ARGS )
+
+        # the alarm logic gets the replayed alarm and valve states instead of reading them from a device
+        if APP_ALARMWATCH is not None:
+            watch = _syrAlarmWatches[ SYR_REPLAY_DEVICE ] = SyrAlarmWatch_class( SYR_REPLAY_DEVICE, serial = APP_SERIAL )
+        else:
+            watch = None
+
+        signal.signal( signal.SIGTERM, StopHandler )
+        signal.signal( signal.SIGINT,  StopHandler )
+
+        errors  = 0
+        totals  = [ 0, 0, 0, 0 ]
+        tStart  = time.perf_counter()
+        for fileName in APP_REPLAYFILES:
+            if APP_STOP:
+                break
+            try:
+                result = ReplayLogFile( fileName, APP_REPLAYSPEED, serial = APP_SERIAL, watch = watch, polls = totals[0] )
+            except ( OSError, EOFError, *ModuleErrors( "lzma.LZMAError" ) ) as e:
+                print( "ERROR: cannot replay " + fileName + ": " + str( e ), file=sys.stderr, flush=True )
+                errors += 1
+                continue
+            totals = [ total + value for total, value in zip( totals, result ) ]
+        # the records only count once all sinks wrote them
+        _syrSinks.Close()
+        seconds = max( 1e-9, time.perf_counter() - tStart )
+
+        records, markers, skipped, logSeconds = totals
+        print( "Replay: " + str( records ) + " poll(s), " + str( markers ) + " other line(s), " + str( skipped ) +
+               " line(s) skipped, " + "{:.1f}h".format( logSeconds / 3600 ) + " of logs in " + "{:.2f}s".format( seconds ) +
+               ": " + "{:.0f}".format( records / seconds ) + " records/s, " + "{:.0f}x".format( logSeconds / seconds ) +
+               " real time", file=sys.stderr, flush=True )
+        if skipped > 0 and records == 0:
+            print( "WARNING: nothing replayed; wrong --logcond, --logtemp or --logprofile?", file=sys.stderr, flush=True )
+        sys.exit( APP_ERROR_ARGS if errors > 0 else APP_ERROR_NONE )
+
+    # -------------------------------------------------------------------------------------------------------
+    # log several devices at once; an unreachable one must not stop the others, so no presence check here
+    if len( APP_DEVICES ) > 1 or APP_DEVICEFILE is not None:
+        if APP_COMMAND is not None:
+            print( "ERROR: several devices are only supported for logging", file=sys.stderr, flush=True )
+            sys.exit( APP_ERROR_ARGS )
+        if APP_MQTT is not None:
+            print( "ERROR: --mqtt is only supported for a single device", file=sys.stderr, flush=True )
+            sys.exit( APP_ERROR_ARGS )
+        devices = [ SyrDevice_class( ipaddr ) for ipaddr in APP_DEVICES ]
+        if APP_DEVICEFILE is not None:
+            try:
+                devices += LoadDeviceList( APP_DEVICEFILE )
+            except ( OSError, ValueError ) as e:
+                print( "ERROR: " + str( e ), file=sys.stderr, flush=True )
+                sys.exit( APP_ERROR_ARGS )
+        try:
+            RunDevices( devices, maxpolls )
+        except KeyboardInterrupt:
+            pass
+        except ModuleErrors( "sqlite3.Error" ) as e:
+            print( "ERROR: database " + APP_DBFILE + ": " + str( e ), file=sys.stderr, flush=True )
+            sys.exit( APP_ERROR_ARGS )
+        for device in devices:
+            if device.failed > 0:
+                print( "WARNING: " + device.ipaddr + ": " + str( device.failed ) + " of " + str( device.polls ) +
+                       " poll(s) failed, last at " + device.lastError, file=sys.stderr, flush=True )
+        sys.exit( APP_ERROR_NONE )
+
     # -------------------------------------------------------------------------------------------------------
     # always: check if the device is there and alive
     if ( syrVersion := GetDataRaw( SYR_CMD_VERSION ) ) == SYR_ERROR_STRING:
@@ -624,25 +4572,42 @@ if __name__ == "__main__":
     # -------------------------------------------------------------------------------------------------------
     # a short "henlo" or a more detailed status
     if APP_COMMAND == APP_CMD_HENLO or APP_COMMAND == APP_CMD_STATUS:
+        status = { "serial": syrSerial, "version": syrVersion }
+        if APP_COMMAND == APP_CMD_STATUS:
+            status.update( CollectStatus() )
+        if APP_JSON:
+            PrintJSON( status )
+            sys.exit( APP_ERROR_NONE )
         print( "Found device:" )
         print( "  Serial ................... " + syrSerial )
         print( "  Version .................. " + syrVersion )
         if APP_COMMAND == APP_CMD_STATUS:
-            GetAndPrintStatus()
+            PrintStatus( status )
         sys.exit( APP_ERROR_NONE )
 
     # -------------------------------------------------------------------------------------------------------
     # show all available profiles
     if APP_COMMAND == APP_CMD_SHOWPROFILES:
-        for profNum in GetAndPrintProfiles():
+        profiles = CollectProfiles()
+        data = GetDataMulti( [ cmd for profNum in profiles[ "available" ] for cmd in ProfileXCommands( profNum ) ], parallel = True )
+        profiles[ "profiles" ] = [ CollectProfileX( profNum, data ) for profNum in profiles[ "available" ] ]
+        if APP_JSON:
+            PrintJSON( profiles )
+            sys.exit( APP_ERROR_NONE )
+        PrintProfiles( profiles )
+        for profile in profiles[ "profiles" ]:
             print()
-            GetAndPrintProfileX( profNum )
+            PrintProfileX( profile )
         sys.exit( APP_ERROR_NONE )
 
     # -------------------------------------------------------------------------------------------------------
     # show a single profile, even if it's not "available", aka configured
     if APP_COMMAND == APP_CMD_SHOWPROFILE:
-        GetAndPrintProfileX( profNum, warnIfNotAvailable=True )
+        profile = CollectProfileX( profNum )
+        if APP_JSON:
+            PrintJSON( profile )
+            sys.exit( APP_ERROR_NONE )
+        PrintProfileX( profile, warnIfNotAvailable=True )
         sys.exit( APP_ERROR_NONE )
 
     # -------------------------------------------------------------------------------------------------------
@@ -663,66 +4628,166 @@ if __name__ == "__main__":
 
     # -------------------------------------------------------------------------------------------------------
     # preparations for the main "logger" loop
+    # the loop only fetches; stdout, the log file and the database are written by the sinks, see SyrPipeline_class
+
+    # with "--mqtt", most values are pushed by the device; see SyrMqttSource_class
+    if APP_MQTT is not None:
+        mqttSource = SyrMqttSource_class( APP_MQTT )
+        try:
+            mqttSource.Start()
+        except ImportError:
+            print( "ERROR: --mqtt needs the paho-mqtt package: pip install paho-mqtt", file=sys.stderr, flush=True )
+            sys.exit( APP_ERROR_ARGS )
+    else:
+        mqttSource = None
+
+    if APP_NOSTDOUT is False:
+        _syrSinks.Add( SyrStdoutSink_class() )
+
     if APP_NOFILE is False:
-        fout = open( time.strftime("%Y%m%d%H%M%S") + "_SyrSafeTech.log", "w+t" )
+        _syrSinks.Add( SyrLogWriter_class( time.strftime("%Y%m%d%H%M%S") + "_SyrSafeTech.log" ) )
+
+    if APP_DBFILE is not None:
+        try:
+            _syrSinks.Add( SyrDbWriter_class( APP_DBFILE ) )
+        except ModuleErrors( "sqlite3.Error" ) as e:
+            print( "ERROR: database " + APP_DBFILE + ": " + str( e ), file=sys.stderr, flush=True )
+            sys.exit( APP_ERROR_ARGS )
+
+    # the commands of a single poll; in the order of the log file's columns
+    logCommands = GetLogCommands()
+
+    scheduler = SyrScheduler_class( SYR_DELAY )
+
+    if APP_IDLEDELAY is not None:
+        adaptive = SyrAdaptiveRate_class( SYR_DELAY, max( SYR_DELAY, APP_IDLEDELAY ) )
+    else:
+        adaptive = None
+
+    fieldCache = SyrFieldCache_class() if APP_TIERED else None
+
+    gap = SyrGap_class()
+
+    history = GetHistory( SYR_IPADDR, SYR_DELAY )
+
+    # alarm and valve are read more often, apart from the polls; see SyrAlarmWatch_class
+    if APP_ALARMWATCH is not None:
+        alarmWatch = SyrAlarmWatch_class( serial = syrSerial )
+        alarmWatch.Start()
+        pollCommands = [ command for command in logCommands if command not in SYR_ALARMWATCH_COMMANDS ]
     else:
-        fout = None
+        alarmWatch   = None
+
+    # for the HTTP exporter
+    polls  = 0
+    failed = 0
+
+    if APP_STATSINTERVAL is not None:
+        nextStats = time.monotonic() + APP_STATSINTERVAL
+
+    # with "--mqtt", the values of the last poll, for the lines of pushed values in between
+    polled = {}
+
+    # stop cleanly on CTRL-C and "kill"; the log file's end is written and flushed
+    signal.signal( signal.SIGTERM, StopHandler )
+    signal.signal( signal.SIGINT,  StopHandler )
 
     # -------------------------------------------------------------------------------------------------------
     # the main "logger" loop
-    while True:
-        timeHuman   = time.asctime()
-        timeMachine = time.strftime("%Y;%m;%d; %H;%M;%S")
-
-        # get the valve state as a number and in human readable form for stdout
-        valveStateCode = GetDataRaw( SYR_CMD_VALVE )
-        valveStateStr  = SYR_VALVE_STATES.get( valveStateCode, "UNKNOWN STATE" )
+    while APP_STOP is False:
+        record = SyrRecord_class( SyrRecord_class.POLL, SYR_IPADDR, serial = syrSerial )
 
-        # log everything in its raw form for now
-        dataLine = GetDataRaw( SYR_CMD_PRESSURE )    + "; " + \
-                   GetDataRaw( SYR_CMD_FLOW )        + "; " + \
-                   GetDataRaw( SYR_CMD_VOLUME )      + "; " + \
-                   GetDataRaw( SYR_CMD_VOLUME_LAST )
-        
-        # get thealarm state as a number and in human readable form for stdout
-        errorCode = GetDataRaw( SYR_CMD_ALARM )
-        errorStr  = SYR_ALARM_CODES.get( errorCode, "UNKNOWN ERROR" )
+        # with "--alarmwatch", alarm and valve come from there, once it has read them
+        watched  = alarmWatch.Latest() if alarmWatch is not None else None
+        commands = logCommands if watched is None else pollCommands
 
-        dataLine2 = ""
+        # with "--mqtt", a message may wake the loop up before the next poll is due; then nothing is polled
+        pushed = mqttSource.Latest() if mqttSource is not None else {}
+        poll   = mqttSource is None or time.monotonic() >= scheduler.next
+        if pushed:
+            commands = [ command for command in commands if command not in pushed ]
 
-        if APP_LOGCONDUCTIVITY:
-            dataLine2 =  "; " + GetDataRaw( SYR_CMD_CONDUCTIVITY )
-        
-        if APP_LOGTEMPERATURE:
-            dataLine2 += "; " + GetDataRaw( SYR_CMD_TEMP )
-        
-        if APP_LOGPROFILE:
-            dataLine2 += "; " + GetDataRaw( SYR_CMD_PROFILE )
+        if not poll:
+            fetched = {}
+            data    = dict( polled )
+        elif fieldCache is not None:
+            now = time.monotonic()
+            fetched = GetDataMulti( fieldCache.Due( commands, now, scheduler.period / 2 ), parallel = APP_PARALLEL )
+            fieldCache.Update( fetched, now )
+            data = fieldCache.Get( logCommands )
+        else:
+            data = fetched = GetDataMulti( commands, parallel = APP_PARALLEL )
+        if mqttSource is not None and poll:
+            polled = dict( data )
 
+        if watched is not None:
+            fetched.update( watched )
+            data.update( watched )
+        if pushed:
+            fetched.update( pushed )
+            data.update( { command: value for command, value in pushed.items() if command in logCommands } )
 
-        if APP_RAW is False:
-            for strReplace in SYR_UNITS_REPL:
-                dataLine = dataLine.replace( strReplace, "" )
+        # a line of pushed values only is not a poll; neither for the counters nor for "--maxpolls"
+        up = not fetched or any( value != SYR_ERROR_STRING for value in fetched.values() )
+        if poll:
+            polls += 1
+            if not up:
+                failed += 1
+        if APP_HTTPPORT is not None:
+            _syrMetrics.Update( SYR_IPADDR, data, polls, failed, up, syrSerial, syrVersion )
 
+        # no line full of "ERROR"s while the device is down; a "# GAP" line at the start and end instead
+        marker, logData = gap.Update( fetched, record.timeHuman )
+        if marker is not None:
+            _syrSinks.Put( SyrRecord_class( SyrRecord_class.MARKER, SYR_IPADDR, line = marker ), urgent = True )
 
-        if APP_NOSTDOUT is False:
-            print( timeHuman + "; " + valveStateStr + "; " + dataLine + "; " + errorStr + dataLine2 )
+        if logData:
+            record.Parse( data )
+            if history is not None:
+                history.Append( record.sample )
+            # alarms are written to disk right away
+            _syrSinks.Put( record, urgent = data.get( SYR_CMD_ALARM, "FF" ) not in ( "FF", SYR_ERROR_STRING ) )
 
-        if APP_NOFILE is False:
-            fout.write( timeMachine + "; " + valveStateCode + "; " + dataLine + "; " + errorCode + dataLine2 + "\n" )
-            fout.flush() 
+        if APP_STATSINTERVAL is not None and time.monotonic() >= nextStats:
+            nextStats = time.monotonic() + APP_STATSINTERVAL
+            _syrSinks.Put( SyrRecord_class( SyrRecord_class.NOTE, SYR_IPADDR, line = _syrStats.Line( SYR_IPADDR ) ) )
+            if APP_STATSFILE is not None:
+                _syrStats.Save( APP_STATSFILE )
 
 
-        if ( maxpolls > 0 ):
+        if ( maxpolls > 0 and poll ):
             if ( maxpolls := maxpolls - 1 ) <= 0:
                 break
 
-        time.sleep( SYR_DELAY )
+        if adaptive is not None:
+            scheduler.period = adaptive.Update( data )
+
+        if mqttSource is not None:
+            if poll:
+                if APP_FIXEDRATE:
+                    scheduler.Advance()
+                else:
+                    scheduler.next = time.monotonic() + scheduler.period
+            mqttSource.Wait( scheduler.next - time.monotonic() )
+        elif APP_FIXEDRATE:
+            if ( skipped := scheduler.Wait() ) > 0:
+                print( "WARNING: poll took longer than " + str( scheduler.period ) + "s, skipped " + str( skipped ) + " tick(s)",
+                       file=sys.stderr, flush=True )
+        else:
+            _syrStopEvent.wait( scheduler.period )
     # END while
 
 
-    if APP_NOFILE is False:
-        fout.close()
+    if alarmWatch is not None:
+        alarmWatch.Close()
+    if mqttSource is not None:
+        mqttSource.Close()
+
+    _syrSinks.Close()
+
+    if scheduler.overruns > 0:
+        print( "WARNING: " + str( scheduler.overruns ) + " overrun(s), " + str( scheduler.skipped ) + " tick(s) skipped in total",
+               file=sys.stderr, flush=True )
 
     sys.exit( APP_ERROR_NONE )
 
@@ -0,0 +1,591 @@
+#!/usr/bin/env python3
+#
+# Syr SafeTech Connect Simulator
+#   A local stand-in for the Syr SafeTech Connect's REST API, to exercise the logger
+#   without a device. It answers the URLs the logger sends ("/safe-tec/get/...", "set", "clr")
+#   with JSON in the form the logger parses, from a simulated water usage with profiles,
+#   leakage protection and alarms; optionally with latency, jitter, errors and dropped
+#   connections. Values and timings are simulated, not recorded; it is not a reference
+#   for how a real device behaves.
+#
+#
+# https://github.com/FMMT666/SyrSafeTechLogger
+#
+
+
+import sys
+import time
+import json
+import random
+import socket
+import threading
+import socketserver
+import http.server
+
+
+#############################################################################################################
+SIM_PORT        = 5333              # TCP port (set by "--port=n"); 0 = any free port
+SIM_LATENCY     = 0.0               # seconds to answer a request (set by "--latency=n")
+SIM_JITTER      = 0.0               # random extra seconds, 0..n, to answer a request (set by "--jitter=n")
+SIM_ACCEPTDELAY = 0.0               # seconds to accept a new connection (set by "--acceptdelay=n")
+SIM_ERRORRATE   = 0.0               # fraction of requests answered with HTTP 500 (set by "--errorrate=n")
+SIM_DROPRATE    = 0.0               # fraction of requests where the connection is closed without an answer (set by "--droprate=n")
+SIM_SPEED       = 1.0               # simulated seconds per real second (set by "--speed=n")
+SIM_USAGE       = 1.0 / 600         # mean number of water consumptions per simulated second (set by "--usage=n")
+SIM_LEAK        = 0                 # constant leakage in L/h, e.g. a dripping tap (set by "--leak=n")
+SIM_NOISE       = 100               # random error of the pressure in mbar; the real one flickers by a step (set by "--noise=n")
+SIM_SEED        = None              # random seed, for reproducible runs (set by "--seed=n")
+SIM_MQTTPORT    = None              # if set, TCP port of the built-in MQTT broker the device publishes to (set by "--mqttport=n")
+
+# what the device publishes via MQTT: command -> min. seconds between two messages; guessed, like the topics
+SIM_MQTT_CMDS   = { "VLV": 0.0, "ALA": 0.0, "FLO": 0.0, "LTV": 0.0, "AVO": 1.0, "BAR": 1.0 }
+SIM_MQTT_PERIOD = 0.1               # seconds between two checks for changed values
+SIM_MQTT_REFRESH = 10.0             # seconds after which a value is published again, even if it did not change
+
+SIM_ADMIN_CMDS  = [ "ALM", "VOL", "NET" ]       # only readable in admin mode; guessed
+
+
+#############################################################################################################
+## SyrSimDevice_class
+#############################################################################################################
+class SyrSimDevice_class:
+    # The simulated device's state. Water usage is advanced lazily, whenever a request comes in.
+    def __init__( self, seed = None ) -> None:
+        self.rand       = random.Random( seed )
+        self.lock       = threading.Lock()
+        self.simTime    = time.time()           # simulated epoch time
+        self.realTime   = time.monotonic()
+
+        self.valve      = 20                    # 10 = closed, 11 = closing, 20 = open, 21 = opening
+        self.valveUntil = 0                     # simulated time the valve motion ends
+        self.alarm      = "FF"
+        self.alarmMem   = [ "A3", "A3", "A4", "A4", "A4", "A4", "A4", "A4" ]
+        self.admin      = False
+        self.flow       = 0                     # L/h
+        self.eventFlow  = 0                     # L/h of the ongoing consumption, without leakage
+        self.eventEnd   = 0                     # simulated time the ongoing consumption ends
+        self.eventStart = 0                     # simulated time the ongoing consumption started
+        self.volume     = 0.0                   # mL of the ongoing consumption (AVO)
+        self.lastVolume = 0                     # L of the last consumption (LTV)
+        self.totalVol   = 2345.0                # L
+        self.temp       = 129                   # °C * 10
+        self.cond       = 690                   # uS/cm
+
+        self.config     = {
+            "SRN": "123456789", "VER": "Safe-Tech V4.04", "BUZ": "1", "CNL": "0", "CNF": "20", "LWT": "90",
+            "BSA": "0", "TMP": "0", "LNG": "0", "UNI": "0", "SRV": "25.01.2025", "BAT": "9,50", "NET": "11,79"
+        }
+        self.profile    = 1
+        self.profiles   = {}
+        for num in range( 1, 9 ):
+            self.profiles[ num ] = { "PA": "1" if num <= 3 else "0", "PN": [ "Present", "Absent", "Holiday" ][ num - 1 ] if num <= 3 else "",
+                                     "PV": "300", "PT": "1800", "PF": "3500", "PM": "1", "PR": "0", "PB": "1", "PW": "0" }
+        self.profiles[ 2 ].update( { "PV": "10", "PT": "60", "PF": "500" } )
+
+    # ---------------------------------------------------------------------------------------------------
+    def Advance( self ):
+        """Advance the simulation up to now, in steps of one simulated second.
+        """
+        now = time.monotonic()
+        dt  = ( now - self.realTime ) * SIM_SPEED
+        self.realTime = now
+
+        steps = int( dt )
+        rest  = dt - steps
+        for _ in range( min( steps, 86400 ) ):
+            self.Step( 1.0 )
+        if rest > 0:
+            self.Step( rest )
+
+    def Step( self, dt ):
+        """Advance the simulation by 'dt' simulated seconds.
+        """
+        self.simTime += dt
+
+        # valve motion
+        if self.valve in ( 11, 21 ) and self.simTime >= self.valveUntil:
+            self.valve = 10 if self.valve == 11 else 20
+
+        # start or end a water consumption
+        if self.eventFlow == 0 and self.rand.random() < SIM_USAGE * dt:
+            self.eventFlow  = self.rand.choice( [ 300, 420, 600, 900, 1500 ] )
+            self.eventStart = self.simTime
+            self.eventEnd   = self.simTime + self.rand.uniform( 5, 300 )
+        elif self.eventFlow > 0 and self.simTime >= self.eventEnd:
+            self.eventFlow = 0
+
+        flow = ( self.eventFlow + SIM_LEAK ) if self.valve == 20 else 0
+        if flow > 0:
+            self.volume   += flow * 1000.0 / 3600.0 * dt
+            self.totalVol += flow / 3600.0 * dt
+        elif self.volume > 0:
+            # consumption ended
+            self.lastVolume = int( round( self.volume / 1000.0 ) )
+            self.volume     = 0.0
+        self.flow = flow
+
+        # leakage protection of the active profile
+        prof = self.profiles[ self.profile ]
+        if self.alarm == "FF" and flow > 0:
+            if flow > int( prof[ "PF" ] ):
+                self.Alarm( "A5" )
+            elif self.volume / 1000.0 > int( prof[ "PV" ] ):
+                self.Alarm( "A3" )
+            elif self.eventFlow > 0 and self.simTime - self.eventStart > int( prof[ "PT" ] ):
+                self.Alarm( "A4" )
+
+        self.temp = max( 0, min( 1000, self.temp + self.rand.choice( [ -1, 0, 0, 0, 1 ] ) ) )
+        self.cond = max( 0, min( 5000, self.cond + self.rand.choice( [ -10, 0, 0, 0, 0, 0, 10 ] ) ) )
+
+    def Alarm( self, code ):
+        """Raise an alarm and close the valve.
+        """
+        self.alarm    = code
+        self.alarmMem = ( self.alarmMem + [ code ] )[ -8: ]
+        self.MoveValve( 11 )
+
+    def MoveValve( self, state ):
+        """Start closing (11) or opening (21) the valve; takes a few seconds.
+        """
+        if ( state == 11 and self.valve in ( 10, 11 ) ) or ( state == 21 and self.valve in ( 20, 21 ) ):
+            return
+        self.valve      = state
+        self.valveUntil = self.simTime + 6
+
+    # ---------------------------------------------------------------------------------------------------
+    def Get( self, command ):
+        """Returns: the raw value for a "get" command, as string, or None if the command is unknown
+        """
+        if command in SIM_ADMIN_CMDS and not self.admin:
+            return "NSC"
+        if command == "VLV":
+            return str( self.valve )
+        if command == "AB":
+            return "2" if self.valve in ( 10, 11 ) else "1"
+        if command == "BAR":
+            return str( int( round( ( 5000 - self.flow * 0.4 + self.rand.choice( [ -SIM_NOISE, 0, 0, SIM_NOISE ] ) ) / 100.0 ) ) * 100 ) + " mbar"
+        if command == "FLO":
+            return str( int( self.flow ) )
+        if command == "AVO":
+            return str( int( self.volume ) ) + "mL"
+        if command == "LTV":
+            return str( self.lastVolume )
+        if command == "VOL":
+            return "Vol[L]" + str( int( self.totalVol ) )
+        if command == "CEL":
+            return str( self.temp )
+        if command == "CND":
+            return str( self.cond )
+        if command == "ALA":
+            return self.alarm
+        if command == "ALM":
+            return "Alarms:->" + " ".join( self.alarmMem )
+        if command == "RTC":
+            return str( int( self.simTime ) )
+        if command == "PRF":
+            return str( self.profile )
+        if command == "PRN":
+            return str( sum( 1 for prof in self.profiles.values() if prof[ "PA" ] == "1" ) )
+        if command in self.config:
+            return self.config[ command ]
+        if len( command ) == 3 and command[:2] in self.profiles[1] and command[2] in "12345678":
+            return self.profiles[ int( command[2] ) ][ command[:2] ]
+        return None
+
+    def Set( self, command, parameter ):
+        """Returns: the answer for a "set" command, as string, or None if the command is unknown
+        """
+        if command == "ADM":
+            if parameter == "(1)":
+                self.admin = True
+                return "SERVICE"
+            if parameter == "(2)f":
+                self.admin = True
+                return "ADMIN"
+            return "WRONG PARAMETER"
+        if command == "PRF":
+            if parameter.isdigit() and self.profiles.get( int( parameter ), {} ).get( "PA" ) == "1":
+                self.profile = int( parameter )
+                return "OK"
+            return "WRONG PARAMETER"
+        if command == "AB":
+            self.MoveValve( 11 if parameter == "2" else 21 )
+            return "OK"
+        if command == "ALA":
+            self.Alarm( parameter )
+            return "OK"
+        if command in self.config:
+            self.config[ command ] = parameter
+            return "OK"
+        if len( command ) == 3 and command[:2] in self.profiles[1] and command[2] in "12345678":
+            self.profiles[ int( command[2] ) ][ command[:2] ] = parameter
+            return "OK"
+        return None
+
+    def Clr( self, command ):
+        """Returns: the answer for a "clr" command, as string, or None if the command is unknown
+        """
+        if command == "ADM":
+            self.admin = False
+            return "ADMIN RESET"
+        if command == "ALA":
+            # clears the ongoing alarm and opens the valve
+            self.alarm = "FF"
+            self.MoveValve( 21 )
+            return "OK"
+        if command == "ALM":
+            self.alarmMem = []
+            return "OK"
+        return None
+
+    # ---------------------------------------------------------------------------------------------------
+    def Request( self, path ):
+        """Answer a request path, e.g. "/safe-tec/get/FLO" or "/safe-tec/set/PRF/3".
+
+        Returns: the JSON answer as dictionary or None if the path is unknown (HTTP 404)
+        """
+        parts = [ part for part in path.split( "/" ) if part ]
+        if len( parts ) < 3 or parts[0] != "safe-tec":
+            return None
+        verb, command = parts[1], parts[2].upper()
+        parameter     = "/".join( parts[3:] )
+
+        with self.lock:
+            self.Advance()
+            if verb == "get":
+                value = self.Get( command )
+                return None if value is None else { "get" + command: value }
+            if verb == "set":
+                value = self.Set( command, parameter )
+                return None if value is None else { "set" + command + parameter: value }
+            if verb == "clr":
+                value = self.Clr( command )
+                return None if value is None else { "clr" + command: value }
+        return None
+
+
+#############################################################################################################
+## SyrSimHandler_class
+#############################################################################################################
+class SyrSimHandler_class( http.server.BaseHTTPRequestHandler ):
+    # Speaks HTTP/1.1, so connections are kept alive if the client wants that.
+    protocol_version = "HTTP/1.1"
+    # headers and body are sent separately; without this, Nagle + delayed ACKs add ~40ms per reply
+    disable_nagle_algorithm = True
+
+    def setup( self ):
+        # a new TCP connection; the real device is slow here
+        if SIM_ACCEPTDELAY > 0:
+            time.sleep( SIM_ACCEPTDELAY )
+        super().setup()
+
+    def do_GET( self ):
+        sim = self.server.sim
+        self.server.requests += 1
+
+        latency = self.server.latency if self.server.latency is not None else SIM_LATENCY
+        delay = latency + ( sim.rand.uniform( 0, SIM_JITTER ) if SIM_JITTER > 0 else 0 )
+        if delay > 0:
+            time.sleep( delay )
+
+        chance = sim.rand.random()
+        if chance < SIM_DROPRATE:
+            # just hang up
+            self.close_connection = True
+            return
+        if chance < SIM_DROPRATE + SIM_ERRORRATE:
+            self.SendJSON( 500, { "error": "simulated error" } )
+            return
+
+        answer = sim.Request( self.path )
+        if answer is None:
+            self.SendJSON( 404, { "error": "unknown command" } )
+        else:
+            self.SendJSON( 200, answer )
+
+    def SendJSON( self, status, data ):
+        body = json.dumps( data ).encode()
+        self.send_response( status )
+        self.send_header( "Content-Type", "application/json" )
+        self.send_header( "Content-Length", str( len( body ) ) )
+        self.end_headers()
+        self.wfile.write( body )
+
+    def log_message( self, format, *args ):
+        pass
+
+
+#############################################################################################################
+## SyrSimServer_class
+#############################################################################################################
+class SyrSimServer_class( http.server.ThreadingHTTPServer ):
+    daemon_threads = True
+
+    def shutdown( self ):
+        # the MQTT broker and the publisher, too
+        self.stopped.set()
+        if self.broker is not None:
+            self.broker.shutdown()
+            self.broker.server_close()
+        super().shutdown()
+
+    def handle_error( self, request, client_address ):
+        # clients that gave up (timeouts) are expected here
+        pass
+
+
+#############################################################################################################
+## SyrSimBroker_class
+#############################################################################################################
+# A minimal MQTT 3.1.1 broker, just enough for the simulated device and a few subscribers:
+# CONNECT, SUBSCRIBE with "+" and "#", PUBLISH, PINGREQ and DISCONNECT; everything is sent with QoS 0,
+# there are no retained messages, no sessions and no authentication. Any MQTT client can connect,
+# e.g. "mosquitto_sub -p 1883 -t 'safetec/#' -v".
+class SyrSimBrokerHandler_class( socketserver.BaseRequestHandler ):
+    def handle( self ):
+        self.request.setsockopt( socket.IPPROTO_TCP, socket.TCP_NODELAY, 1 )
+        self.filters = []
+        try:
+            while ( packet := self.Read() ) is not None:
+                kind, flags, body = packet
+                if kind == 1:                                   # CONNECT
+                    self.Send( 0x20, b"\x00\x00" )
+                elif kind == 3:                                 # PUBLISH
+                    size  = int.from_bytes( body[:2], "big" )
+                    topic = body[ 2:2 + size ].decode()
+                    start = 2 + size
+                    if flags & 0x06:
+                        # QoS 1 or 2: answered like QoS 1
+                        self.Send( 0x40, body[ start:start + 2 ] )
+                        start += 2
+                    self.server.Publish( topic, body[ start: ] )
+                elif kind == 8:                                 # SUBSCRIBE
+                    pos, granted = 2, b""
+                    while pos < len( body ):
+                        size = int.from_bytes( body[ pos:pos + 2 ], "big" )
+                        self.filters.append( body[ pos + 2:pos + 2 + size ].decode() )
+                        pos     += 3 + size
+                        granted += b"\x00"
+                    with self.server.lock:
+                        self.server.clients.add( self )
+                    self.Send( 0x90, body[:2] + granted )
+                elif kind == 12:                                # PINGREQ
+                    self.Send( 0xD0, b"" )
+                elif kind == 14:                                # DISCONNECT
+                    break
+        except OSError:
+            pass
+        finally:
+            with self.server.lock:
+                self.server.clients.discard( self )
+
+    def Read( self ):
+        """Returns: the next packet as tuple ( type, flags, body ) or None if the connection was closed
+        """
+        head = self.Receive( 1 )
+        if head is None:
+            return None
+        length, shift = 0, 0
+        while ( byte := self.Receive( 1 ) ) is not None:
+            length += ( byte[0] & 0x7F ) << shift
+            shift  += 7
+            if not byte[0] & 0x80:
+                body = self.Receive( length ) if length else b""
+                return None if body is None else ( head[0] >> 4, head[0] & 0x0F, body )
+        return None
+
+    def Receive( self, size ):
+        data = b""
+        while len( data ) < size:
+            if not ( chunk := self.request.recv( size - len( data ) ) ):
+                return None
+            data += chunk
+        return data
+
+    def Send( self, head, body ):
+        length, size = b"", len( body )
+        while True:
+            byte, size = size & 0x7F, size >> 7
+            length    += bytes( [ byte | ( 0x80 if size else 0 ) ] )
+            if not size:
+                break
+        with self.server.lock:
+            self.request.sendall( bytes( [ head ] ) + length + body )
+
+    def Matches( self, topic ):
+        """Returns: True if 'topic' matches one of the client's subscriptions
+        """
+        levels = topic.split( "/" )
+        for pattern in self.filters:
+            parts = pattern.split( "/" )
+            for num, part in enumerate( parts ):
+                if part == "#":
+                    return True
+                if num >= len( levels ) or ( part != "+" and part != levels[ num ] ):
+                    break
+            else:
+                if len( parts ) == len( levels ):
+                    return True
+        return False
+
+
+class SyrSimBroker_class( socketserver.ThreadingTCPServer ):
+    daemon_threads      = True
+    allow_reuse_address = True
+
+    def __init__( self, address ) -> None:
+        super().__init__( address, SyrSimBrokerHandler_class )
+        self.lock     = threading.RLock()
+        self.clients  = set()
+        self.messages = 0           # number of messages published
+
+    def Publish( self, topic, payload ):
+        """Send a message to all clients that subscribed to its topic; QoS 0.
+        """
+        body = len( topic.encode() ).to_bytes( 2, "big" ) + topic.encode() + payload
+        with self.lock:
+            self.messages += 1
+            clients = [ client for client in self.clients if client.Matches( topic ) ]
+        for client in clients:
+            try:
+                client.Send( 0x30, body )
+            except OSError:
+                pass
+
+
+#############################################################################################################
+## PublishValues
+#############################################################################################################
+def PublishValues( server ):
+    """Publish the device's values to its MQTT broker, like the real one does; runs in a thread.
+    Each command of SIM_MQTT_CMDS is published as soon as it changes, but not more often than given there,
+    and every SIM_MQTT_REFRESH seconds anyway, to "safetec/<serial>/<command>", with the same JSON as the REST API answers, e.g. {"getFLO": "420"}.
+    Everything else (temperature, conductivity, profile, ...) is never pushed.
+    """
+    sim    = server.sim
+    last   = {}                     # command -> ( value, time.monotonic() it was published )
+    topic  = "safetec/" + sim.config[ "SRN" ] + "/"
+    while not server.stopped.wait( SIM_MQTT_PERIOD ):
+        now = time.monotonic()
+        with sim.lock:
+            sim.Advance()
+            values = { command: sim.Get( command ) for command in SIM_MQTT_CMDS }
+        for command, value in values.items():
+            old = last.get( command )
+            if old is not None and now - old[1] < SIM_MQTT_REFRESH and \
+               ( old[0] == value or now - old[1] < SIM_MQTT_CMDS[ command ] ):
+                continue
+            last[ command ] = ( value, now )
+            server.broker.Publish( topic + command, json.dumps( { "get" + command: value } ).encode() )
+
+
+#############################################################################################################
+## StartSim
+#############################################################################################################
+def StartSim( port = 0, host = "127.0.0.1", seed = SIM_SEED, latency = None, mqttPort = None ):
+    """Start a simulated device in a background thread.
+
+    port    : TCP port; 0 = any free port
+    host    : address to listen on
+    seed    : random seed; None = random
+    latency : seconds to answer a request, for this device only; None = SIM_LATENCY
+    mqttPort: if given, start an MQTT broker on this TCP port (0 = any free one) the device publishes to
+
+    Returns: the server object; the simulated device is "server.sim", its address for the logger
+    (e.g. "--ipaddr=127.0.0.1:5333") is "server.addr", the broker's (e.g. "--mqtt=127.0.0.1:1883")
+    "server.mqttAddr", None without one; stop it with shutdown()
+    """
+    server = SyrSimServer_class( ( host, port ), SyrSimHandler_class )
+    server.sim      = SyrSimDevice_class( seed )
+    server.requests = 0
+    server.latency  = latency
+    server.addr     = host + ":" + str( server.server_address[1] )
+    server.broker   = None
+    server.mqttAddr = None
+    server.stopped  = threading.Event()
+    threading.Thread( target = server.serve_forever, daemon = True ).start()
+    if mqttPort is not None:
+        server.broker   = SyrSimBroker_class( ( host, mqttPort ) )
+        server.mqttAddr = host + ":" + str( server.broker.server_address[1] )
+        threading.Thread( target = server.broker.serve_forever, daemon = True ).start()
+        threading.Thread( target = PublishValues, args = ( server, ), daemon = True ).start()
+    return server
+
+
+#############################################################################################################
+## PrintUsage
+#############################################################################################################
+def PrintUsage():
+    """Prints the usage and command line options to stdout.
+    """
+    print( "Usage: SyrSafeTechSim.py [options]" )
+    print( "Options:" )
+    print( "  --help          : print this help" )
+    print( "  --port=n        : TCP port; default 5333" )
+    print( "  --host=addr     : address to listen on; default 127.0.0.1" )
+    print( "  --latency=n     : seconds to answer a request; default 0" )
+    print( "  --jitter=n      : random extra seconds, 0..n, to answer a request; default 0" )
+    print( "  --acceptdelay=n : seconds to accept a new connection; default 0" )
+    print( "  --errorrate=n   : fraction (0..1) of requests answered with HTTP 500; default 0" )
+    print( "  --droprate=n    : fraction (0..1) of requests where the connection is just closed; default 0" )
+    print( "  --speed=n       : simulated seconds per real second; default 1" )
+    print( "  --usage=n       : mean number of water consumptions per simulated hour; default 6" )
+    print( "  --leak=n        : constant leakage in L/h; default 0" )
+    print( "  --noise=n       : random error of the pressure in mbar; default 100, 0 = off" )
+    print( "  --seed=n        : random seed, for reproducible runs" )
+    print( "  --mqttport=n    : also run an MQTT broker on port n, e.g. 1883, the device publishes its values to;" )
+    print( "                    topics \"safetec/<serial>/<command>\"" )
+
+
+#############################################################################################################
+if __name__ == "__main__":
+
+    host = "127.0.0.1"
+
+    for args in sys.argv[1:]:
+        try:
+            if args == "--help" or args == "-h":
+                PrintUsage()
+                sys.exit( 0 )
+            elif "--port=" in args:
+                SIM_PORT = int( args[7:] )
+            elif "--host=" in args:
+                host = args[7:]
+            elif "--latency=" in args:
+                SIM_LATENCY = abs( float( args[10:] ) )
+            elif "--jitter=" in args:
+                SIM_JITTER = abs( float( args[9:] ) )
+            elif "--acceptdelay=" in args:
+                SIM_ACCEPTDELAY = abs( float( args[14:] ) )
+            elif "--errorrate=" in args:
+                SIM_ERRORRATE = abs( float( args[12:] ) )
+            elif "--droprate=" in args:
+                SIM_DROPRATE = abs( float( args[11:] ) )
+            elif "--speed=" in args:
+                SIM_SPEED = abs( float( args[8:] ) )
+            elif "--usage=" in args:
+                SIM_USAGE = abs( float( args[8:] ) ) / 3600.0
+            elif "--leak=" in args:
+                SIM_LEAK = abs( float( args[7:] ) )
+            elif "--noise=" in args:
+                SIM_NOISE = abs( int( args[8:] ) )
+            elif "--seed=" in args:
+                SIM_SEED = int( args[7:] )
+            elif "--mqttport=" in args:
+                SIM_MQTTPORT = int( args[11:] )
+            else:
+                raise ValueError
+        except ValueError:
+            print( "ERROR: invalid option: " + args, file=sys.stderr, flush=True )
+            PrintUsage()
+            sys.exit( 1 )
+
+    server = StartSim( SIM_PORT, host, SIM_SEED, mqttPort = SIM_MQTTPORT )
+    print( "Simulated Syr SafeTech Connect at " + server.addr + "; stop with CTRL-C", flush=True )
+    if server.mqttAddr is not None:
+        print( "Publishing to the MQTT broker at " + server.mqttAddr, flush=True )
+    try:
+        while True:
+            time.sleep( 1 )
+    except KeyboardInterrupt:
+        server.shutdown()